@@ -0,0 +1 @@
+"""Throughput benchmarks for loafer, run with ``python -m benchmarks``."""
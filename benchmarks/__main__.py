@@ -0,0 +1,51 @@
+import argparse
+import sys
+from typing import Any
+
+from . import cases  # noqa: F401 - registers the benchmarks
+from .runner import REGISTRY, compare, dump, load, result_key, run
+
+
+def _report(result: dict[str, Any]) -> None:
+    extra = " ".join(f"{key}={value}" for key, value in result["extra"].items())
+    print(f"{result_key(result):<60} {result['rate']:>14,.1f} {result['unit']}/s  {extra}", flush=True)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run the loafer benchmarks.")
+    parser.add_argument("-k", dest="selected", action="append", default=[], help="only run benchmarks matching NAME")
+    parser.add_argument("--list", action="store_true", help="list the benchmarks and exit")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark, the best one is kept")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier of the number of messages")
+    parser.add_argument("--eager-tasks", action="store_true", help="use eager tasks (Python 3.12+)")
+    parser.add_argument("--quick", action="store_true", help="same as --repeat 1 --scale 0.1")
+    parser.add_argument("--output", help="write the results (and environment) to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare the results with a previous JSON file")
+    parser.add_argument("--threshold", type=float, default=0.1, help="rate drop reported as a regression")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for bench in REGISTRY:
+            print(bench.name)
+        return 0
+
+    if args.quick:
+        args.repeat, args.scale = 1, 0.1
+
+    results = run(
+        selected=args.selected, repeat=args.repeat, scale=args.scale, eager_tasks=args.eager_tasks, report=_report
+    )
+    if args.output:
+        dump(results, args.output)
+
+    if args.compare:
+        lines, regressed = compare(load(args.compare), results, args.threshold)
+        print(f"\ncompared with {args.compare}:")
+        print("\n".join(lines))
+        return 1 if regressed else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
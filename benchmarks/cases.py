@@ -0,0 +1,221 @@
+import asyncio
+import itertools
+import json
+import os
+import time
+from collections.abc import AsyncIterator, Callable, Sequence
+from contextlib import asynccontextmanager, suppress
+from typing import Any
+
+from loafer.dispatchers import LoaferDispatcher
+from loafer.ext.aws import bases
+from loafer.ext.aws.handlers import SNSHandler, SQSHandler
+from loafer.ext.aws.message_translators import SNSMessageTranslator, SQSMessageTranslator
+from loafer.ext.aws.routes import SQSRoute
+from loafer.routes import Route
+from loafer.types import Message
+
+from .fakes import InMemoryProvider, StubAWSEndpoint
+from .runner import Measurement, benchmark
+
+PAYLOAD_SIZES = (256, 4 * 1024, 64 * 1024, 256 * 1024)
+
+
+def payload(size: int) -> str:
+    """A JSON document of about ``size`` bytes, made of small records."""
+    record = {"id": 0, "name": "benchmark", "tags": ["a", "b"], "value": 1.5}
+    records = max(size // (len(json.dumps(record)) + 2), 1)
+    return json.dumps({"records": [{**record, "id": i} for i in range(records)]})
+
+
+def sqs_messages(count: int, body: str = '{"id": 1}') -> list[Message]:
+    return [{"MessageId": str(i), "ReceiptHandle": f"receipt-{i}", "Body": body} for i in range(count)]
+
+
+async def _dispatch(routes: Sequence[Route], done: Callable[[], Any], **dispatcher_options: Any) -> float:
+    """Run the dispatcher until ``done`` returns, then close it; return the elapsed time."""
+    dispatcher = LoaferDispatcher(routes, **dispatcher_options)
+    started_at = time.perf_counter()
+    task = asyncio.create_task(dispatcher.dispatch_providers())
+    await done()
+    task.cancel()
+    with suppress(asyncio.CancelledError):
+        await task
+    dispatcher.stop()
+    await dispatcher.close()
+    return time.perf_counter() - started_at
+
+
+@asynccontextmanager
+async def stub_endpoint(*, latency: float = 0) -> AsyncIterator[StubAWSEndpoint]:
+    async with StubAWSEndpoint(latency=latency) as endpoint:
+        bases.open_default_client_pool()
+        # the STS client doesn't use the endpoint_url of the SNS client
+        sts_endpoint = os.environ.get("AWS_ENDPOINT_URL_STS")
+        os.environ["AWS_ENDPOINT_URL_STS"] = endpoint.url
+        try:
+            yield endpoint
+        finally:
+            if sts_endpoint is None:
+                del os.environ["AWS_ENDPOINT_URL_STS"]
+            else:
+                os.environ["AWS_ENDPOINT_URL_STS"] = sts_endpoint
+            # pooled clients belong to this event loop
+            await bases.close_default_client_pool()
+
+
+# dispatcher
+
+
+async def _noop_async(message: Any, metadata: Any) -> bool:  # noqa: ARG001
+    return True
+
+
+def _noop_sync(message: Any, metadata: Any) -> bool:  # noqa: ARG001
+    return True
+
+
+@benchmark("dispatcher.handler", [{"handler": "async"}, {"handler": "sync"}])
+async def dispatcher_handler(*, scale: float, handler: str) -> Measurement:
+    count = int(20_000 * scale)
+    provider = InMemoryProvider(sqs_messages(count))
+    route = Route(
+        provider,
+        handler=_noop_async if handler == "async" else _noop_sync,
+        message_translator=SQSMessageTranslator(),
+        name="benchmark",
+    )
+    seconds = await _dispatch([route], provider.done.wait, workers=50, queue_size=100)
+    return Measurement(provider.confirmed, seconds)
+
+
+async def _sleep_handler(message: Any, metadata: Any) -> bool:  # noqa: ARG001
+    await asyncio.sleep(0.001)
+    return True
+
+
+@benchmark(
+    "dispatcher.sweep",
+    [{"workers": w, "queue_size": q} for w, q in itertools.product((1, 10, 100), (10, 100, 1000))],
+)
+async def dispatcher_sweep(*, scale: float, workers: int, queue_size: int) -> Measurement:
+    # an I/O bound handler (1ms), the throughput depends on how many messages run concurrently
+    count = int(2_000 * scale)
+    provider = InMemoryProvider(sqs_messages(count))
+    route = Route(provider, handler=_sleep_handler, message_translator=SQSMessageTranslator(), name="benchmark")
+    seconds = await _dispatch([route], provider.done.wait, workers=workers, queue_size=queue_size)
+    return Measurement(provider.confirmed, seconds)
+
+
+# message translators
+
+
+def _time_translations(translate: Callable[[Message], Any], message: Message, scale: float) -> Measurement:
+    min_time = 0.2 * scale
+    operations = 0
+    started_at = time.perf_counter()
+    while (elapsed := time.perf_counter() - started_at) < min_time or operations < 10:  # noqa: PLR2004
+        for _ in range(10):
+            translate(message)
+        operations += 10
+    return Measurement(operations, elapsed, {"bytes": len(message["Body"])})
+
+
+@benchmark("translator.sqs", [{"size": size} for size in PAYLOAD_SIZES], unit="translations")
+async def translator_sqs(*, scale: float, size: int) -> Measurement:
+    translator = SQSMessageTranslator()
+    return _time_translations(translator.translate, {"MessageId": "1", "Body": payload(size)}, scale)
+
+
+@benchmark("translator.sns", [{"size": size} for size in PAYLOAD_SIZES], unit="translations")
+async def translator_sns(*, scale: float, size: int) -> Measurement:
+    translator = SNSMessageTranslator()
+    body = json.dumps({"Type": "Notification", "MessageId": "1", "Message": payload(size)})
+    return _time_translations(translator.translate, {"MessageId": "1", "Body": body}, scale)
+
+
+# SQS provider and handlers, against the stub endpoint
+
+
+@benchmark("sqs.consume", [{"ack_max_delay": 0}, {"ack_max_delay": 0.1}])
+async def sqs_consume(*, scale: float, ack_max_delay: float) -> Measurement:
+    count = int(5_000 * scale)
+    handled = 0
+    finished = asyncio.Event()
+
+    async def handler(message: Any, metadata: Any) -> bool:  # noqa: ARG001
+        nonlocal handled
+        handled += 1
+        if handled >= count:
+            finished.set()
+        return True
+
+    async with stub_endpoint() as endpoint:
+        endpoint.add_messages("benchmark", itertools.repeat('{"id": 1}', count))
+        route = SQSRoute(
+            "benchmark",
+            {"options": {"WaitTimeSeconds": 0}, "ack_max_delay": ack_max_delay, **endpoint.client_options()},  # type: ignore[arg-type]
+            handler=handler,
+            name="benchmark",
+        )
+        seconds = await _dispatch([route], finished.wait, workers=50, queue_size=100)
+
+    deletes = endpoint.requests["sqs.DeleteMessageBatch"]
+    return Measurement(
+        handled,
+        seconds,
+        {"receive_requests": endpoint.requests["sqs.ReceiveMessage"], "delete_requests": deletes},
+    )
+
+
+async def _publish(handler: SQSHandler | SNSHandler, count: int) -> float:
+    started_at = time.perf_counter()
+    await asyncio.gather(*(handler.publish({"id": i}) for i in range(count)))
+    await handler.close()
+    return time.perf_counter() - started_at
+
+
+@benchmark("sqs.publish", [{"batch_size": None}, {"batch_size": 10}])
+async def sqs_publish(*, scale: float, batch_size: int | None) -> Measurement:
+    count = int(2_000 * scale)
+    async with stub_endpoint() as endpoint:
+        handler = SQSHandler("benchmark", batch_size=batch_size, **endpoint.client_options())
+        seconds = await _publish(handler, count)
+
+    requests = endpoint.requests["sqs.SendMessage"] + endpoint.requests["sqs.SendMessageBatch"]
+    return Measurement(count, seconds, {"requests": requests})
+
+
+@benchmark("sns.publish", [{"batch_size": None}, {"batch_size": 10}])
+async def sns_publish(*, scale: float, batch_size: int | None) -> Measurement:
+    count = int(2_000 * scale)
+    async with stub_endpoint() as endpoint:
+        handler = SNSHandler("benchmark", batch_size=batch_size, **endpoint.client_options())
+        seconds = await _publish(handler, count)
+
+    requests = endpoint.requests["sns.Publish"] + endpoint.requests["sns.PublishBatch"]
+    return Measurement(count, seconds, {"requests": requests})
+
+
+@benchmark("startup.warmup", [{"routes": 10}, {"routes": 50}], unit="routes")
+async def startup_warmup(*, scale: float, routes: int) -> Measurement:  # noqa: ARG001
+    # every route has its own queue and publishes to its own topic, AWS answers in 10ms
+    async with stub_endpoint(latency=0.01) as endpoint:
+        dispatcher = LoaferDispatcher(
+            [
+                SQSRoute(
+                    f"queue-{i}",
+                    endpoint.client_options(),  # type: ignore[arg-type]
+                    handler=SNSHandler(f"topic-{i}", **endpoint.client_options()),
+                    name=f"route-{i}",
+                )
+                for i in range(routes)
+            ]
+        )
+        started_at = time.perf_counter()
+        await dispatcher.warmup()
+        seconds = time.perf_counter() - started_at
+        await dispatcher.close()
+
+    requests = endpoint.requests["sqs.GetQueueUrl"] + endpoint.requests["sts.GetCallerIdentity"]
+    return Measurement(routes, seconds, {"requests": requests})
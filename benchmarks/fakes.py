@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import json
+import uuid
+from collections import Counter, deque
+from collections.abc import Iterable
+from typing import Any, Self
+from urllib.parse import parse_qs
+from xml.sax.saxutils import escape
+
+from aiohttp import web
+
+from loafer.ext.aws.bases import ClientOptions
+from loafer.providers import AbstractProvider
+from loafer.types import Message
+
+ACCOUNT_ID = "123456789012"
+REGION = "us-east-1"
+QUERY_NAMESPACES = {
+    "sns": "http://sns.amazonaws.com/doc/2010-03-31/",
+    "sts": "https://sts.amazonaws.com/doc/2011-06-15/",
+}
+
+
+class InMemoryProvider(AbstractProvider):
+    """Serve a fixed list of messages, ``done`` is set once every message was confirmed or rejected."""
+
+    def __init__(self, messages: Iterable[Message]) -> None:
+        self._messages: deque[Message] = deque(messages)
+        self.total: int = len(self._messages)
+        self.confirmed: int = 0
+        self.not_processed: int = 0
+        self.done = asyncio.Event()
+        if not self.total:
+            self.done.set()
+
+    async def fetch_messages(self, max_messages: int | None = None) -> list[Message]:
+        count = min(max_messages or 10, 10, len(self._messages))
+        return [self._messages.popleft() for _ in range(count)]
+
+    def _processed(self) -> None:
+        if self.confirmed + self.not_processed >= self.total:
+            self.done.set()
+
+    async def confirm_message(self, message: Message) -> None:  # noqa: ARG002
+        self.confirmed += 1
+        self._processed()
+
+    async def message_not_processed(self, message: Message) -> None:  # noqa: ARG002
+        self.not_processed += 1
+        self._processed()
+
+
+def _md5(text: str) -> str:
+    return hashlib.md5(text.encode()).hexdigest()  # noqa: S324
+
+
+class StubAWSEndpoint:
+    """A local HTTP endpoint answering the SQS, SNS and STS calls made by loafer.
+
+    Requests go through the whole aiobotocore stack (serialization, signing, HTTP and
+    parsing), only the AWS side is replaced. Queues are kept in memory and every
+    request is counted by operation name in ``requests``. ``latency`` adds a delay,
+    in seconds, to every response.
+    """
+
+    def __init__(self, *, latency: float = 0) -> None:
+        self.latency: float = latency
+        self.queues: dict[str, deque[Message]] = {}
+        self.requests: Counter[str] = Counter()
+        self.url: str = ""
+        self._runner: web.AppRunner | None = None
+
+    def client_options(self) -> ClientOptions:
+        return {
+            "endpoint_url": self.url,
+            "region_name": REGION,
+            "aws_access_key_id": "benchmark",
+            "aws_secret_access_key": "benchmark",
+            "use_ssl": False,
+        }
+
+    def add_messages(self, queue_name: str, bodies: Iterable[str]) -> None:
+        queue = self.queues.setdefault(queue_name, deque())
+        for body in bodies:
+            queue.append(self._message(body))
+
+    @staticmethod
+    def _message(body: str) -> Message:
+        message_id = str(uuid.uuid4())
+        return {
+            "MessageId": message_id,
+            "ReceiptHandle": f"receipt-{message_id}",
+            "MD5OfBody": _md5(body),
+            "Body": body,
+            "Attributes": {"ApproximateReceiveCount": "1"},
+        }
+
+    async def start(self) -> str:
+        app = web.Application(client_max_size=4 * 1024 * 1024)
+        app.router.add_post("/{tail:.*}", self._dispatch)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> Self:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.close()
+
+    async def _dispatch(self, request: web.Request) -> web.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        target = request.headers.get("X-Amz-Target", "")
+        if target.startswith("AmazonSQS."):
+            operation = target.removeprefix("AmazonSQS.")
+            self.requests[f"sqs.{operation}"] += 1
+            payload = json.loads(await request.read() or b"{}")
+            result = getattr(self, f"_sqs_{operation}")(payload)
+            return web.json_response(result, content_type="application/x-amz-json-1.0")
+
+        form = {key: values[0] for key, values in parse_qs((await request.read()).decode()).items()}
+        operation = form.get("Action", "")
+        service = "sts" if operation == "GetCallerIdentity" else "sns"
+        self.requests[f"{service}.{operation}"] += 1
+        body = getattr(self, f"_{service}_{operation}")(form)
+        xml = (
+            f'<{operation}Response xmlns="{QUERY_NAMESPACES[service]}"><{operation}Result>{body}</{operation}Result>'
+            f"<ResponseMetadata><RequestId>{uuid.uuid4()}</RequestId></ResponseMetadata></{operation}Response>"
+        )
+        return web.Response(text=xml, content_type="text/xml")
+
+    # SQS (JSON protocol)
+
+    def _sqs_GetQueueUrl(self, payload: dict[str, Any]) -> dict[str, Any]:  # noqa: N802
+        name = payload["QueueName"]
+        self.queues.setdefault(name, deque())
+        return {"QueueUrl": f"{self.url}/{ACCOUNT_ID}/{name}"}
+
+    def _queue(self, payload: dict[str, Any]) -> deque[Message]:
+        return self.queues.setdefault(payload["QueueUrl"].rsplit("/", 1)[-1], deque())
+
+    def _sqs_ReceiveMessage(self, payload: dict[str, Any]) -> dict[str, Any]:  # noqa: N802
+        queue = self._queue(payload)
+        count = min(payload.get("MaxNumberOfMessages", 1), len(queue))
+        if not count:
+            return {}
+        return {"Messages": [queue.popleft() for _ in range(count)]}
+
+    @staticmethod
+    def _all_successful(payload: dict[str, Any]) -> dict[str, Any]:
+        return {"Successful": [{"Id": entry["Id"]} for entry in payload["Entries"]], "Failed": []}
+
+    def _sqs_DeleteMessageBatch(self, payload: dict[str, Any]) -> dict[str, Any]:  # noqa: N802
+        return self._all_successful(payload)
+
+    def _sqs_ChangeMessageVisibilityBatch(self, payload: dict[str, Any]) -> dict[str, Any]:  # noqa: N802
+        return self._all_successful(payload)
+
+    def _sqs_SendMessage(self, payload: dict[str, Any]) -> dict[str, Any]:  # noqa: N802
+        message = self._message(payload["MessageBody"])
+        self._queue(payload).append(message)
+        return {"MessageId": message["MessageId"], "MD5OfMessageBody": message["MD5OfBody"]}
+
+    def _sqs_SendMessageBatch(self, payload: dict[str, Any]) -> dict[str, Any]:  # noqa: N802
+        queue = self._queue(payload)
+        successful = []
+        for entry in payload["Entries"]:
+            message = self._message(entry["MessageBody"])
+            queue.append(message)
+            successful.append(
+                {"Id": entry["Id"], "MessageId": message["MessageId"], "MD5OfMessageBody": message["MD5OfBody"]}
+            )
+        return {"Successful": successful, "Failed": []}
+
+    # SNS (query protocol)
+
+    def _sns_Publish(self, form: dict[str, str]) -> str:  # noqa: N802, ARG002
+        return f"<MessageId>{uuid.uuid4()}</MessageId>"
+
+    def _sns_PublishBatch(self, form: dict[str, str]) -> str:  # noqa: N802
+        ids = [
+            value
+            for key, value in form.items()
+            if key.startswith("PublishBatchRequestEntries.member.") and key.endswith(".Id")
+        ]
+        members = "".join(
+            f"<member><Id>{escape(entry_id)}</Id><MessageId>{uuid.uuid4()}</MessageId></member>" for entry_id in ids
+        )
+        return f"<Successful>{members}</Successful><Failed/>"
+
+    # STS (query protocol)
+
+    def _sts_GetCallerIdentity(self, form: dict[str, str]) -> str:  # noqa: N802, ARG002
+        return (
+            f"<UserId>benchmark</UserId><Account>{ACCOUNT_ID}</Account>"
+            f"<Arn>arn:aws:iam::{ACCOUNT_ID}:user/benchmark</Arn>"
+        )
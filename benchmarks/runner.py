@@ -0,0 +1,191 @@
+import asyncio
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from collections.abc import Callable, Coroutine, Iterable, Mapping
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from importlib import metadata
+from typing import Any
+
+from loafer._compat import eager_task_factory, json_backend, loop_backend, new_event_loop
+
+Params = Mapping[str, Any]
+
+
+@dataclass
+class Measurement:
+    """What a single benchmark run reports: ``operations`` done in ``seconds``, plus counters."""
+
+    operations: int
+    seconds: float
+    extra: dict[str, float] = field(default_factory=dict)
+
+
+BenchmarkFunc = Callable[..., Coroutine[Any, Any, Measurement]]
+
+
+@dataclass
+class Benchmark:
+    name: str
+    func: BenchmarkFunc
+    params: list[Params]
+    unit: str
+
+
+REGISTRY: list[Benchmark] = []
+
+
+def benchmark(
+    name: str, params: Iterable[Params] = ({},), unit: str = "messages"
+) -> Callable[[BenchmarkFunc], BenchmarkFunc]:
+    """Register a benchmark, run once per set of ``params`` (passed as keyword arguments, along with ``scale``)."""
+
+    def register(func: BenchmarkFunc) -> BenchmarkFunc:
+        REGISTRY.append(Benchmark(name, func, list(params), unit))
+        return func
+
+    return register
+
+
+def result_key(result: Mapping[str, Any]) -> str:
+    params = ",".join(f"{key}={value}" for key, value in sorted(result["params"].items()))
+    return f"{result['name']}[{params}]" if params else result["name"]
+
+
+def _version(distribution: str) -> str:
+    try:
+        return metadata.version(distribution)
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def _git_revision() -> str | None:
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],  # noqa: S607
+            capture_output=True,
+            check=True,
+            text=True,
+            cwd=os.path.dirname(__file__),
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def environment() -> dict[str, Any]:
+    """Describe where the benchmarks ran, results are only comparable on the same environment."""
+    return {
+        "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "loafer": _version("olist-loafer"),
+        "aiobotocore": _version("aiobotocore"),
+        "botocore": _version("botocore"),
+        "json_backend": json_backend,
+        "loop_backend": loop_backend,
+        "git_revision": _git_revision(),
+    }
+
+
+def run(
+    *,
+    selected: Iterable[str] = (),
+    repeat: int = 3,
+    scale: float = 1.0,
+    eager_tasks: bool = False,
+    report: Callable[[dict[str, Any]], None] | None = None,
+) -> dict[str, Any]:
+    """Run the registered benchmarks (the ones whose name contains any of ``selected``).
+
+    Every benchmark runs ``repeat`` times, each one in a new event loop (like the one
+    of ``LoaferRunner``); the best run is reported, along with the median rate.
+    """
+    selected = list(selected)
+    results: list[dict[str, Any]] = []
+    eager_tasks = eager_tasks and eager_task_factory is not None
+
+    def loop_factory() -> asyncio.AbstractEventLoop:
+        loop = new_event_loop()
+        if eager_tasks:
+            loop.set_task_factory(eager_task_factory)
+        return loop
+
+    for bench in REGISTRY:
+        if selected and not any(pattern in bench.name for pattern in selected):
+            continue
+
+        for params in bench.params:
+            runs: list[Measurement] = []
+            for _ in range(repeat):
+                gc.collect()
+                with asyncio.Runner(loop_factory=loop_factory) as runner:
+                    runs.append(runner.run(bench.func(scale=scale, **params)))
+
+            best = max(runs, key=lambda measurement: measurement.operations / measurement.seconds)
+            result = {
+                "name": bench.name,
+                "params": dict(params),
+                "unit": bench.unit,
+                "operations": best.operations,
+                "seconds": best.seconds,
+                "rate": best.operations / best.seconds,
+                "median_rate": statistics.median(m.operations / m.seconds for m in runs),
+                "extra": best.extra,
+            }
+            results.append(result)
+            if report is not None:
+                report(result)
+
+    return {
+        "environment": environment(),
+        "settings": {"repeat": repeat, "scale": scale, "eager_tasks": eager_tasks},
+        "results": results,
+    }
+
+
+def compare(baseline: Mapping[str, Any], current: Mapping[str, Any], threshold: float) -> tuple[list[str], bool]:
+    """Compare the rates of two result files, a drop greater than ``threshold`` (a fraction) is a regression."""
+    previous = {result_key(result): result for result in baseline["results"]}
+    before, after = baseline["environment"], current["environment"]
+    lines = [
+        f"environment differs, {key}: {before[key]} -> {after.get(key)}"
+        for key in sorted(before)
+        if key != "timestamp" and before[key] != after.get(key)
+    ]
+    regressed = False
+
+    for result in current["results"]:
+        key = result_key(result)
+        if key not in previous:
+            lines.append(f"{key:<60} {result['rate']:>14,.1f} {result['unit']}/s (new)")
+            continue
+
+        change = result["rate"] / previous[key]["rate"] - 1
+        flag = ""
+        if change < -threshold:
+            flag = "  REGRESSION"
+            regressed = True
+        lines.append(f"{key:<60} {result['rate']:>14,.1f} {result['unit']}/s {change:+8.1%}{flag}")
+
+    return lines, regressed
+
+
+def load(path: str) -> dict[str, Any]:
+    with open(path) as file:
+        data: dict[str, Any] = json.load(file)
+    return data
+
+
+def dump(data: Mapping[str, Any], path: str) -> None:
+    with open(path, "w") as file:
+        json.dump(data, file, indent=2)
+        file.write("\n")
@@ -1,10 +1,13 @@
 import asyncio
+import contextvars
 import inspect
+import json
 import logging
 import sys
 from collections.abc import Awaitable, Callable
+from concurrent.futures import Executor, ThreadPoolExecutor
 from functools import partial
-from typing import ParamSpec, TypeVar, overload
+from typing import Any, ParamSpec, TypeVar, overload
 
 logger: logging.Logger = logging.getLogger(__name__)
 
@@ -14,20 +17,103 @@ _P = ParamSpec("_P")
 
 
 @overload
-def ensure_coroutinefunction(func: Callable[_P, _R]) -> Callable[_P, Awaitable[_R]]: ...
+def ensure_coroutinefunction(
+    func: Callable[_P, _R], executor: Executor | None = None
+) -> Callable[_P, Awaitable[_R]]: ...
 
 
 @overload
-def ensure_coroutinefunction(func: Callable[_P, Awaitable[_R]]) -> Callable[_P, Awaitable[_R]]: ...
+def ensure_coroutinefunction(
+    func: Callable[_P, Awaitable[_R]], executor: Executor | None = None
+) -> Callable[_P, Awaitable[_R]]: ...
 
 
-def ensure_coroutinefunction(func: Callable[_P, _R] | Callable[_P, Awaitable[_R]]) -> Callable[_P, Awaitable[_R]]:
+def ensure_coroutinefunction(
+    func: Callable[_P, _R] | Callable[_P, Awaitable[_R]], executor: Executor | None = None
+) -> Callable[_P, Awaitable[_R]]:
     if inspect.iscoroutinefunction(func):
         logger.debug("handler is coroutine! %r", func)
         return func
 
-    logger.debug("handler will run in a separate thread: %r", func)
-    return partial(asyncio.to_thread, func)  # type: ignore[return-value]
+    if executor is None:
+        logger.debug("handler will run in a separate thread: %r", func)
+        return partial(asyncio.to_thread, func)  # type: ignore[return-value]
+
+    logger.debug("handler will run in %r: %r", executor, func)
+    return partial(run_in_executor, executor, func)  # type: ignore[return-value]
+
+
+async def run_in_executor(executor: Executor, func: Callable[..., _R], *args: object) -> _R:
+    # run_in_executor does not take keyword arguments, and partial objects are picklable
+    # (as long as func and args are), which is required by process pools
+    call = partial(func, *args)
+    if isinstance(executor, ThreadPoolExecutor):
+        # like asyncio.to_thread, the context variables of the caller are visible in the thread
+        # (contexts are not picklable, process pools don't get them)
+        call = partial(contextvars.copy_context().run, func, *args)
+    return await asyncio.get_running_loop().run_in_executor(executor, call)
+
+
+# json documents are decoded like json.loads does, by msgspec when installed (faster) or by the
+# standard library
+JSONDecoder = Callable[[str | bytes], Any]
+
+try:
+    import msgspec.json  # type: ignore[import-not-found, unused-ignore]
+except ImportError:  # pragma: no cover
+    msgspec = None  # type: ignore[assignment, unused-ignore]
+
+
+def _msgspec_loads(data: str | bytes) -> Any:
+    try:
+        return _msgspec_decode(data)
+    except msgspec.DecodeError:
+        # values msgspec rejects but json.loads accepts (NaN, Infinity, lone surrogates, ...);
+        # invalid documents raise json.JSONDecodeError
+        return json.loads(data)
+
+
+_json_backends: dict[str, JSONDecoder] = {"json": json.loads}
+JSONDecodeError: tuple[type[Exception], ...] = (json.JSONDecodeError,)
+if msgspec is not None:
+    _msgspec_decode = msgspec.json.Decoder().decode
+    _json_backends["msgspec"] = _msgspec_loads
+    # raised by decoders with a schema
+    JSONDecodeError = (json.JSONDecodeError, msgspec.DecodeError)
+
+json_backend: str = "msgspec" if msgspec is not None else "json"
+json_loads: JSONDecoder = _json_backends[json_backend]
+
+
+def json_decoder(schema: type[Any] | None = None) -> JSONDecoder:
+    """Return a function that decodes json documents, into instances of ``schema`` when given.
+
+    ``schema`` may be any type supported by msgspec (structs, dataclasses, typed dicts, ...),
+    which is required to use it; the payload is validated while it is decoded.
+    """
+    if schema is None:
+        return json_loads
+
+    if msgspec is None:
+        msg = f"msgspec is required to decode json into a schema: {schema!r}"
+        raise ImportError(msg)
+
+    return msgspec.json.Decoder(schema).decode  # type: ignore[no-any-return, unused-ignore]
+
+
+# uvloop, when installed, is the default event loop of the runner
+LoopFactory = Callable[[], asyncio.AbstractEventLoop]
+
+try:
+    import uvloop  # type: ignore[import-not-found, unused-ignore]
+except ImportError:  # pragma: no cover
+    uvloop = None  # type: ignore[assignment, unused-ignore]
+
+loop_backend: str = "uvloop" if uvloop is not None else "asyncio"
+new_event_loop: LoopFactory = uvloop.new_event_loop if uvloop is not None else asyncio.new_event_loop
+
+# tasks that run synchronously until their first suspension, Python 3.12+ (None otherwise)
+eager_task_factory: Any = getattr(asyncio, "eager_task_factory", None)
 
 
 if sys.version_info >= (3, 12):
@@ -43,6 +129,15 @@ else:
 
 __all__ = [
     "deprecated",
+    "JSONDecodeError",
+    "LoopFactory",
+    "eager_task_factory",
     "ensure_coroutinefunction",
+    "json_backend",
+    "json_decoder",
+    "json_loads",
+    "loop_backend",
+    "new_event_loop",
     "override",
+    "run_in_executor",
 ]
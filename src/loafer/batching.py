@@ -0,0 +1,147 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Sequence
+from typing import Generic, TypeAlias, TypeVar
+
+from .exceptions import BatchEntryError
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+BatchSender: TypeAlias = Callable[[list[_T]], Awaitable[Sequence[_R | BaseException]]]
+
+
+def is_retryable(exc: BaseException) -> bool:
+    return isinstance(exc, BatchEntryError) and exc.retryable
+
+
+class Batcher(Generic[_T, _R]):
+    """Coalesce items submitted concurrently into batch requests.
+
+    Pending items are sent when the batch reaches ``max_size`` items or ``max_delay``
+    seconds after the first item was submitted, whichever comes first. With ``max_bytes``,
+    a batch is also sent before the total ``size`` of its items would exceed that limit.
+
+    ``send`` receives the list of items and must return one result per item, in
+    the same order. A result that is an exception instance marks the item as failed;
+    failed items are sent again (up to ``max_attempts`` times) if ``retryable``
+    returns ``True`` for its exception.
+
+    With ``drop_cancelled``, items whose submitter was cancelled before the batch
+    was sent are left out of it.
+    """
+
+    def __init__(
+        self,
+        send: BatchSender[_T, _R],
+        *,
+        max_size: int = 10,
+        max_delay: float = 0.1,
+        max_attempts: int = 3,
+        retry_delay: float = 0.1,
+        retryable: Callable[[BaseException], bool] = is_retryable,
+        drop_cancelled: bool = False,
+        max_bytes: int | None = None,
+        size: Callable[[_T], int] = len,  # type: ignore[assignment]
+    ) -> None:
+        self._send = send
+        self.max_size: int = max_size
+        self.max_delay: float = max_delay
+        self.max_attempts: int = max_attempts
+        self.retry_delay: float = retry_delay
+        self._retryable = retryable
+        self.drop_cancelled: bool = drop_cancelled
+        self.max_bytes: int | None = max_bytes
+        self._size = size
+        self._pending_bytes: int = 0
+
+        self._pending: list[tuple[_T, asyncio.Future[_R]]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def submit(self, item: _T) -> _R:
+        return await self.submit_nowait(item)
+
+    def submit_nowait(self, item: _T) -> "asyncio.Future[_R]":
+        """Add ``item`` to the pending batch and return the future of its result, without waiting for it."""
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[_R] = loop.create_future()
+
+        item_bytes = 0
+        if self.max_bytes is not None:
+            item_bytes = self._size(item)
+            if self._pending and self._pending_bytes + item_bytes > self.max_bytes:
+                self._send_pending()
+
+        self._pending.append((item, future))
+        self._pending_bytes += item_bytes
+
+        if len(self._pending) >= self.max_size or (
+            self.max_bytes is not None and self._pending_bytes >= self.max_bytes
+        ):
+            self._send_pending()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._send_pending)
+
+        return future
+
+    async def flush(self) -> None:
+        """Send all pending items right away and wait for every in-flight batch."""
+        self._send_pending()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _send_pending(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._pending_bytes = 0
+
+        if self.drop_cancelled:
+            self._pending = [(item, future) for item, future in self._pending if not future.cancelled()]
+
+        while self._pending:
+            batch, self._pending = self._pending[: self.max_size], self._pending[self.max_size :]
+            task = asyncio.get_running_loop().create_task(self._send_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send_batch(self, batch: list[tuple[_T, asyncio.Future[_R]]]) -> None:
+        attempt = 1
+        while True:
+            try:
+                results = await self._send([item for item, _ in batch])
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    future.cancel()
+                raise
+            except Exception as exc:  # noqa: BLE001
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                return
+
+            retry: list[tuple[_T, asyncio.Future[_R]]] = []
+            for (item, future), result in zip(batch, results, strict=True):
+                if isinstance(result, BaseException) and attempt < self.max_attempts and self._retryable(result):
+                    retry.append((item, future))
+                elif future.done():
+                    # the submitter was cancelled, there is nobody waiting for the result
+                    continue
+                elif isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+            if not retry:
+                return
+
+            logger.debug("retrying %d failed batch entries, attempt=%d", len(retry), attempt)
+            await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+            batch = retry
+            attempt += 1
@@ -0,0 +1,154 @@
+import abc
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+_R = TypeVar("_R")
+
+
+class DeduplicationStore(abc.ABC):
+    """Remember the keys of the messages already processed, for a while."""
+
+    @abc.abstractmethod
+    async def contains(self, key: str) -> bool:
+        """Return whether a message with this key was processed (and the key did not expire)."""
+
+    @abc.abstractmethod
+    async def add(self, key: str) -> None:
+        """Remember that a message with this key was processed."""
+
+    async def close(self) -> None:
+        """Release the store resources, it may be called more than once."""
+
+
+def _check_limits(max_size: int | None, ttl: float) -> None:
+    if max_size is not None and max_size < 1:
+        msg = f"max_size must be a positive integer: {max_size!r}"
+        raise ValueError(msg)
+
+    if ttl <= 0:
+        msg = f"ttl must be a positive number: {ttl!r}"
+        raise ValueError(msg)
+
+
+class MemoryDeduplicationStore(DeduplicationStore):
+    """Keep up to ``max_size`` keys in memory, for ``ttl`` seconds.
+
+    When full, the least recently seen keys are evicted first.
+    """
+
+    def __init__(self, max_size: int = 100_000, ttl: float = 3600) -> None:
+        _check_limits(max_size, ttl)
+        self.max_size: int = max_size
+        self.ttl: float = ttl
+        # keys, in least recently seen order, with the time they expire
+        self._keys: OrderedDict[str, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    async def contains(self, key: str) -> bool:
+        expires_at = self._keys.get(key)
+        if expires_at is None:
+            return False
+
+        if expires_at <= time.monotonic():
+            del self._keys[key]
+            return False
+
+        self._keys.move_to_end(key)
+        return True
+
+    async def add(self, key: str) -> None:
+        self._keys[key] = time.monotonic() + self.ttl
+        self._keys.move_to_end(key)
+        while len(self._keys) > self.max_size:
+            self._keys.popitem(last=False)
+
+
+class SQLiteDeduplicationStore(DeduplicationStore):
+    """Keep the keys in a SQLite database file, for ``ttl`` seconds, so they survive restarts.
+
+    Queries run in a thread of their own (every process using the store gets one), so
+    waiting for the database lock, held by another process, does not block the event loop.
+    Expired keys are deleted every ``purge_interval`` additions.
+    """
+
+    def __init__(self, path: str | os.PathLike[str], ttl: float = 3600, *, purge_interval: int = 1000) -> None:
+        _check_limits(None, ttl)
+        if purge_interval < 1:
+            msg = f"purge_interval must be a positive integer: {purge_interval!r}"
+            raise ValueError(msg)
+
+        self.path: str | os.PathLike[str] = path
+        self.ttl: float = ttl
+        self.purge_interval: int = purge_interval
+        self._additions: int = 0
+        # created on first use, in the process that uses them: worker processes must not share
+        # a connection, and threads do not survive a fork
+        self._executor: ThreadPoolExecutor | None = None
+        self._pid: int | None = None
+        self._connection: sqlite3.Connection | None = None
+
+    async def _run(self, func: Callable[..., _R], *args: Any) -> _R:
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="loafer-deduplication")
+            self._pid = os.getpid()
+            self._connection = None
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS loafer_keys (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+            )
+            self._connection = connection
+
+        return self._connection
+
+    def _contains(self, key: str) -> bool:
+        cursor = self._connect().execute(
+            "SELECT 1 FROM loafer_keys WHERE key = ? AND expires_at > ?", (key, time.time())
+        )
+        return cursor.fetchone() is not None
+
+    def _add(self, key: str) -> None:
+        connection = self._connect()
+        now = time.time()
+        connection.execute("INSERT OR REPLACE INTO loafer_keys VALUES (?, ?)", (key, now + self.ttl))
+
+        self._additions += 1
+        if self._additions % self.purge_interval == 0:
+            deleted = connection.execute("DELETE FROM loafer_keys WHERE expires_at <= ?", (now,)).rowcount
+            logger.debug("deleted %d expired deduplication key(s) from %s", deleted, self.path)
+
+    def _close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    async def contains(self, key: str) -> bool:
+        return await self._run(self._contains, key)
+
+    async def add(self, key: str) -> None:
+        await self._run(self._add, key)
+
+    async def close(self) -> None:
+        if self._executor is None or self._pid != os.getpid():
+            return
+
+        await self._run(self._close)
+        self._executor.shutdown()
+        self._executor = None
@@ -1,11 +1,18 @@
 import asyncio
+import inspect
 import logging
 import sys
+import time
+from collections import deque
 from collections.abc import Iterable, Sequence
-from typing import TYPE_CHECKING, Any, TypeAlias
+from functools import partial
+from typing import TYPE_CHECKING, Any
 
 from .exceptions import DeleteMessage, TerminateTaskGroup
+from .logs import get_message_logger
+from .metrics import get_default_metrics
 from .routes import Route
+from .tracing import MessageTrace, current_trace
 from .types import ExcInfo, Message
 
 if TYPE_CHECKING:
@@ -13,10 +20,115 @@ if TYPE_CHECKING:
 
 logger: logging.Logger = logging.getLogger(__name__)
 
-ProcessingQueue: TypeAlias = asyncio.Queue[tuple[Route, Message]]
+
+def _accepts_max_messages(provider: "AbstractProvider") -> bool:
+    try:
+        parameters = inspect.signature(provider.fetch_messages).parameters.values()
+    except (TypeError, ValueError):
+        return False
+
+    return any(param.name == "max_messages" or param.kind is param.VAR_KEYWORD for param in parameters)
+
+
+class ProcessingQueue:
+    """Per-route queues of received messages, served in weighted round-robin order.
+
+    Every route has its own bounded queue, so a backlog in one route does not take
+    the place of the others' messages. On each round, a route hands out up to
+    `route.weight` messages in a row, and never more than `route.max_concurrency`
+    messages are being processed (taken but not marked as done) at the same time.
+    """
+
+    def __init__(self, routes: Sequence[Route], maxsize: int) -> None:
+        self._routes: list[Route] = list(routes)
+        self.maxsize: int = maxsize
+        # messages are queued with the time they were put, to measure how long they waited
+        self._queues: dict[Route, deque[tuple[Message, float]]] = {route: deque() for route in self._routes}
+        self._in_flight: dict[Route, int] = dict.fromkeys(self._routes, 0)
+        self._space: dict[Route, asyncio.Event] = {route: asyncio.Event() for route in self._routes}
+        self._changed = asyncio.Event()
+        self._finished = asyncio.Event()
+        self._finished.set()
+        self._unfinished = 0
+        self._index = 0
+        self._credit = self._routes[0].weight if self._routes else 0
+
+    def qsize(self, route: Route) -> int:
+        return len(self._queues[route])
+
+    def free_slots(self, route: Route) -> int:
+        return self.maxsize - len(self._queues[route])
+
+    async def wait_for_space(self, route: Route) -> None:
+        while not self.free_slots(route):
+            self._space[route].clear()
+            await self._space[route].wait()
+
+    async def put(self, message: Message, route: Route) -> None:
+        await self.wait_for_space(route)
+        self._queues[route].append((message, time.perf_counter()))
+        self._unfinished += 1
+        self._finished.clear()
+        self._changed.set()
+
+    async def get(self) -> tuple[Message, Route]:
+        message, route, _ = await self.get_with_wait()
+        return message, route
+
+    async def get_with_wait(self) -> tuple[Message, Route, float]:
+        """Like :meth:`get`, also returning how long (in seconds) the message was queued."""
+        while (item := self._next()) is None:
+            self._changed.clear()
+            await self._changed.wait()
+
+        message, route, queued_at = item
+        return message, route, time.perf_counter() - queued_at
+
+    def task_done(self, route: Route) -> None:
+        self._in_flight[route] -= 1
+        self._unfinished -= 1
+        if not self._unfinished:
+            self._finished.set()
+        self._changed.set()
+
+    async def join(self) -> None:
+        await self._finished.wait()
+
+    def pop_all(self) -> list[tuple[Message, Route]]:
+        """Remove every queued message (not taken yet), returning them along with their routes."""
+        items = [(message, route) for route, queue in self._queues.items() for message, _ in queue]
+        for route, queue in self._queues.items():
+            queue.clear()
+            self._space[route].set()
+
+        self._unfinished -= len(items)
+        if not self._unfinished:
+            self._finished.set()
+        return items
+
+    def _next(self) -> tuple[Message, Route, float] | None:
+        # check the current route and then every other route once, in order
+        for _ in range(len(self._routes) + 1):
+            route = self._routes[self._index]
+            queue = self._queues[route]
+            if self._credit and queue and (not route.max_concurrency or self._in_flight[route] < route.max_concurrency):
+                self._credit -= 1
+                self._in_flight[route] += 1
+                self._space[route].set()
+                message, queued_at = queue.popleft()
+                return message, route, queued_at
+
+            self._index = (self._index + 1) % len(self._routes)
+            self._credit = self._routes[self._index].weight
+
+        return None
 
 
 class LoaferDispatcher:
+    # delays, in seconds, between fetches that return no messages right away
+    fetch_backoff_min: float = 0.05
+    fetch_backoff_max: float = 1.0
+
     def __init__(
         self,
         routes: Sequence[Route],
@@ -25,10 +137,30 @@ class LoaferDispatcher:
     ) -> None:
         self.routes: Sequence[Route] = routes
         self.queue_size: int = queue_size if queue_size is not None else len(routes) * 10
+        # maximum number of messages processed at the same time, across all routes
         self.workers: int = workers if workers is not None else max(len(routes), 5)
+        for route in routes:
+            # messages of a batch hold their workers until the batch handler returns
+            if route.batch_size is not None and route.batch_size > self.workers:
+                logger.warning(
+                    "route=%s has batch_size=%d but there are only %d workers, batches will not be larger than that",
+                    route.name,
+                    route.batch_size,
+                    self.workers,
+                )
+        self._pollers: dict[Route, int] = {}
+        # messages being processed at the moment, across all routes
+        self.in_flight: int = 0
+        self._processing_queue: ProcessingQueue | None = None
+        self._poller_tasks: set[asyncio.Task[None]] = set()
+        self._consumer_task: asyncio.Task[None] | None = None
+        self._message_tasks: set[asyncio.Task[bool]] = set()
+        # messages received by pollers that were cancelled before queueing them
+        self._unqueued: list[tuple[Message, Route]] = []
 
     async def dispatch_message(self, message: Message, route: Route) -> bool:
-        logger.debug("dispatching message to route=%s", route)
+        message_logger = get_message_logger()
+        message_logger.log(logger, logging.DEBUG, "dispatching message", route.name)
         confirm_message: bool = False
         if not message:
             logger.warning("message will be ignored:\n%r\n", message)
@@ -37,26 +169,62 @@ class LoaferDispatcher:
         try:
             confirm_message = await route.deliver(message)
         except DeleteMessage:
-            logger.info("explicit message deletion\n%s\n", message)
+            message_logger.log(logger, logging.INFO, "explicit message deletion", route.name, message)
             confirm_message = True
         except asyncio.CancelledError:
-            msg: str = '"{!r}" was cancelled, the message will not be acknowledged:\n{}\n'
-            logger.warning(msg.format(route.handler, message))
+            logger.warning(
+                "%r was cancelled, the message will not be acknowledged, route=%s", route.handler, route.name
+            )
             raise
         except Exception as exc:
             logger.exception("%r", exc)  # noqa: TRY401
+            metrics = get_default_metrics()
+            if metrics.enabled:
+                metrics.increment("messages.errors", tags=route.labels)
             exc_info: ExcInfo = sys.exc_info()
             confirm_message = await route.error_handler(exc_info, message)
 
         return confirm_message
 
-    async def _process_message(self, message: Any, route: Route) -> bool:
-        confirmation: bool = await self.dispatch_message(message, route)
-        provider: AbstractProvider = route.provider
-        if confirmation:
-            await provider.confirm_message(message)
-        else:
-            await provider.message_not_processed(message)
+    async def _process_message(self, message: Any, route: Route, wait: float = 0) -> bool:
+        # every message is processed in its own task, the trace is only seen by this message
+        trace = MessageTrace(wait)
+        token = current_trace.set(trace)
+        try:
+            confirmation: bool = await self.dispatch_message(message, route)
+            acknowledged_at = time.perf_counter()
+            provider: AbstractProvider = route.provider
+            if confirmation:
+                await provider.confirm_message(message)
+            else:
+                await provider.message_not_processed(message)
+        finally:
+            current_trace.reset(token)
+
+        finished_at = time.perf_counter()
+        trace.ack = finished_at - acknowledged_at
+        trace.total = wait + finished_at - trace.started_at
+        route.latency.record(trace)
+
+        metrics = get_default_metrics()
+        if metrics.enabled:
+            tags = route.labels
+            metrics.increment("messages.confirmed" if confirmation else "messages.not_processed", tags=tags)
+            metrics.timing("message.wait", wait, tags=tags)
+            metrics.timing("message.ack", trace.ack, tags=tags)
+            metrics.timing("message.duration", finished_at - trace.started_at, tags=tags)
+
+        if route.slow_message_threshold is not None and trace.total >= route.slow_message_threshold:
+            logger.warning(
+                "slow message route=%s, message_id=%s, total=%.3fs, wait=%.3fs, translate=%.3fs, handle=%.3fs, ack=%.3fs",
+                route.name,
+                route.provider.message_id(message),
+                trace.total,
+                trace.wait,
+                trace.translate,
+                trace.handle,
+                trace.ack,
+            )
         return confirmation
 
     async def _fetch_messages(
@@ -65,35 +233,152 @@ class LoaferDispatcher:
         route: Route,
         *,
         forever: bool = True,
+        tg: asyncio.TaskGroup | None = None,
     ) -> None:
+        loop = asyncio.get_running_loop()
+        provider: AbstractProvider = route.provider
+        accepts_max_messages: bool = _accepts_max_messages(provider)
+        backoff: float = 0
+        metrics = get_default_metrics()
+
         while True:
-            messages: Iterable[Any] = await route.provider.fetch_messages()
-            for message in messages:
-                await processing_queue.put((message, route))
+            # only receive messages when the route has room for them, so they don't
+            # wait in memory while their visibility timeout is running
+            await processing_queue.wait_for_space(route)
+
+            started_at = loop.time()
+            fetched: Iterable[Any]
+            if accepts_max_messages:
+                fetched = await provider.fetch_messages(max_messages=processing_queue.free_slots(route))  # type: ignore[call-arg]
+            else:
+                fetched = await provider.fetch_messages()
+            fetched_at = loop.time()
+
+            messages = list(fetched)
+            received = 0
+            try:
+                for message in messages:
+                    await processing_queue.put(message, route)
+                    received += 1
+            except asyncio.CancelledError:
+                # the provider handed these messages over, they are released when draining
+                self._unqueued.extend((message, route) for message in messages[received:])
+                raise
+
+            if metrics.enabled:
+                tags = route.labels
+                metrics.timing("receive.duration", fetched_at - started_at, tags=tags)
+                metrics.increment("messages.received", received, tags=tags)
+                if not received:
+                    metrics.increment("receive.empty", tags=tags)
+                metrics.gauge("queue.depth", processing_queue.qsize(route), tags=tags)
 
             if not forever:
                 break
 
+            if tg is not None:
+                pollers = self._pollers[route]
+                if received and pollers < route.max_pollers and processing_queue.free_slots(route):
+                    # the provider has messages and there is room for them: one more poller
+                    self._start_poller(tg, processing_queue, route)
+                elif not received and pollers > route.pollers:
+                    logger.debug("stopping extra poller, route=%s, pollers=%d", route, pollers - 1)
+                    return
+
+            if received or loop.time() - started_at >= self.fetch_backoff_max:
+                # got messages, or an empty response after waiting on the provider side (long polling)
+                backoff = 0
+                continue
+
+            backoff = min(max(backoff * 2, self.fetch_backoff_min), self.fetch_backoff_max)
+            logger.debug("no messages from %s, next fetch in %.2fs", provider, backoff)
+            await asyncio.sleep(backoff)
+
+    def _start_poller(
+        self,
+        tg: asyncio.TaskGroup,
+        processing_queue: ProcessingQueue,
+        route: Route,
+        *,
+        forever: bool = True,
+    ) -> asyncio.Task[None]:
+        async def poller() -> None:
+            try:
+                await self._fetch_messages(processing_queue, route, forever=forever, tg=tg)
+            finally:
+                self._pollers[route] -= 1
+
+        self._pollers[route] = self._pollers.get(route, 0) + 1
+        task = tg.create_task(poller())
+        self._poller_tasks.add(task)
+        task.add_done_callback(self._poller_tasks.discard)
+        return task
+
     async def _consume_messages(self, processing_queue: ProcessingQueue, tg: asyncio.TaskGroup) -> None:
+        # a single consumer keeps up to `workers` messages being processed concurrently
+        semaphore = asyncio.Semaphore(self.workers)
+
+        metrics = get_default_metrics()
+
+        def on_processed(route: Route, task: asyncio.Task[bool]) -> None:
+            self._message_tasks.discard(task)
+            semaphore.release()
+            processing_queue.task_done(route)
+            self.in_flight -= 1
+            if metrics.enabled:
+                metrics.gauge("dispatcher.in_flight", self.in_flight)
+
         while True:
-            message, route = await processing_queue.get()
+            await semaphore.acquire()
+            message, route, wait = await processing_queue.get_with_wait()
+
+            task = tg.create_task(self._process_message(message, route, wait))
+            self._message_tasks.add(task)
+            task.add_done_callback(partial(on_processed, route))
+            self.in_flight += 1
+            if metrics.enabled:
+                metrics.gauge("dispatcher.in_flight", self.in_flight)
+
+    async def warmup(self) -> None:
+        """Warm up every route concurrently, before messages are fetched.
+
+        Failures of all routes are logged and raised together, as an ``ExceptionGroup``.
+        """
+        started_at = time.perf_counter()
+        results = await asyncio.gather(*(route.warmup() for route in self.routes), return_exceptions=True)
 
-            task = tg.create_task(self._process_message(message, route))
-            await task
-            processing_queue.task_done()
+        errors: list[Exception] = []
+        for route, result in zip(self.routes, results, strict=True):
+            if isinstance(result, BaseException):
+                logger.error("warmup failed, route=%s: %r", route.name, result)
+                if not isinstance(result, Exception):
+                    raise result
+                errors.append(result)
+
+        if errors:
+            msg = f"warmup failed for {len(errors)} route(s)"
+            raise ExceptionGroup(msg, errors)
+
+        elapsed = time.perf_counter() - started_at
+        logger.info("warmup done in %.3fs, routes=%d", elapsed, len(self.routes))
+        metrics = get_default_metrics()
+        if metrics.enabled:
+            metrics.timing("dispatcher.warmup_duration", elapsed)
 
     async def dispatch_providers(self, *, forever: bool = True) -> None:
-        processing_queue: ProcessingQueue = ProcessingQueue(self.queue_size)
+        # every route gets its share of the queue size
+        processing_queue = ProcessingQueue(self.routes, max(self.queue_size // max(len(self.routes), 1), 1))
+        self._processing_queue = processing_queue
 
         try:
             async with asyncio.TaskGroup() as tg:
                 provider_tasks: list[asyncio.Task[None]] = [
-                    tg.create_task(self._fetch_messages(processing_queue, route, forever=forever))
+                    self._start_poller(tg, processing_queue, route, forever=forever)
                     for route in self.routes
+                    for _ in range(route.pollers)
                 ]
 
-                for _ in range(self.workers):
-                    tg.create_task(self._consume_messages(processing_queue, tg))
+                self._consumer_task = tg.create_task(self._consume_messages(processing_queue, tg))
 
                 async def join() -> None:
                     await asyncio.wait(provider_tasks)
@@ -101,10 +386,54 @@ class LoaferDispatcher:
 
                     raise TerminateTaskGroup  # noqa: TRY301
 
-                tg.create_task(join())
+                # pollers only finish on their own when fetching once (extra pollers may stop at any time)
+                if not forever:
+                    tg.create_task(join())
         except* TerminateTaskGroup:
             pass
 
+    async def drain(self, max_wait: float) -> None:
+        """Stop receiving messages and wait, up to ``max_wait`` seconds, for the ones being processed.
+
+        Messages received but not being processed yet are released to their providers right away.
+        """
+        receiving = [*self._poller_tasks, *([self._consumer_task] if self._consumer_task is not None else [])]
+        logger.info("draining dispatcher, in_flight=%d, max_wait=%.1fs", self.in_flight, max_wait)
+        for task in receiving:
+            task.cancel()
+        await asyncio.gather(*receiving, return_exceptions=True)
+
+        await self._release_messages()
+
+        if self._message_tasks:
+            _, pending = await asyncio.wait(self._message_tasks, timeout=max_wait)
+            if pending:
+                logger.warning("%d message(s) still being processed after the drain timeout", len(pending))
+
+    async def _release_messages(self) -> None:
+        unstarted = self._unqueued
+        self._unqueued = []
+        if self._processing_queue is not None:
+            unstarted.extend(self._processing_queue.pop_all())
+        if not unstarted:
+            return
+
+        logger.info("releasing %d received message(s) not processed yet", len(unstarted))
+        results = await asyncio.gather(
+            *(route.provider.release_message(message) for message, route in unstarted),
+            return_exceptions=True,
+        )
+
+        metrics = get_default_metrics()
+        for (_, route), result in zip(unstarted, results, strict=True):
+            if isinstance(result, Exception):
+                logger.error("error releasing message, route=%s: %r", route.name, result)
+            elif metrics.enabled:
+                metrics.increment("messages.released", tags=route.labels)
+
     def stop(self) -> None:
         for route in self.routes:
             route.stop()
+
+    async def close(self) -> None:
+        await asyncio.gather(*(route.close() for route in self.routes))
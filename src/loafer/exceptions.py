@@ -2,6 +2,15 @@ class ProviderError(Exception):
     pass
 
 
+class BatchEntryError(Exception):
+    """Exception raised when a single entry of a batch request fails."""
+
+    def __init__(self, message: str, *, code: str = "", retryable: bool = False) -> None:
+        super().__init__(message)
+        self.code: str = code
+        self.retryable: bool = retryable
+
+
 class DeleteMessage(BaseException):  # technically not an Exception
     pass
 
@@ -0,0 +1,132 @@
+import logging
+import os
+import threading
+from collections.abc import Callable
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Literal, ParamSpec, TypeAlias, TypeVar
+
+from .metrics import Tags, get_default_metrics
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+ExecutorOption: TypeAlias = Literal["thread", "process"] | Executor
+
+_R = TypeVar("_R")
+_P = ParamSpec("_P")
+
+# size of the process pools created by routes, every route (in every worker process) has its own
+DEFAULT_MAX_PROCESSES = min(os.cpu_count() or 1, 4)
+
+
+class RouteThreadPoolExecutor(ThreadPoolExecutor):
+    """A thread pool that keeps track of how many calls are waiting for a thread.
+
+    When metrics are enabled, both numbers are reported as the ``route.executor.queue_depth``
+    and ``route.executor.active`` gauges, with ``tags``.
+    """
+
+    def __init__(self, max_workers: int | None = None, thread_name_prefix: str = "", tags: Tags | None = None) -> None:
+        super().__init__(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self.tags: Tags | None = tags
+        self._stats_lock = threading.Lock()
+        self._submitted = 0
+        self._started = 0
+        self._completed = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Calls submitted but not started yet."""
+        return self._submitted - self._started
+
+    @property
+    def active(self) -> int:
+        """Calls running at the moment."""
+        return self._started - self._completed
+
+    def submit(self, fn: Callable[_P, _R], /, *args: _P.args, **kwargs: _P.kwargs) -> Future[_R]:
+        with self._stats_lock:
+            self._submitted += 1
+            self._report()
+        return super().submit(self._run, fn, *args, **kwargs)
+
+    def _run(self, fn: Callable[_P, _R], /, *args: _P.args, **kwargs: _P.kwargs) -> _R:
+        with self._stats_lock:
+            self._started += 1
+            self._report()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._stats_lock:
+                self._completed += 1
+                self._report()
+
+    def _report(self) -> None:
+        # called with the stats lock held, so gauges are not set to stale values by other threads
+        metrics = get_default_metrics()
+        if metrics.enabled:
+            metrics.gauge("route.executor.queue_depth", self.queue_depth, tags=self.tags)
+            metrics.gauge("route.executor.active", self.active, tags=self.tags)
+
+
+class RouteProcessPoolExecutor(Executor):
+    """A process pool created on first use, in the process that uses it.
+
+    Routes are created before the worker processes are forked, and a process pool
+    can't be shared with forked processes: every process gets a pool of its own.
+    """
+
+    def __init__(self, max_workers: int | None = None) -> None:
+        self.max_workers: int = max_workers or DEFAULT_MAX_PROCESSES
+        self._pool: ProcessPoolExecutor | None = None
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                # a pool inherited from the parent process belongs to it, it is left alone
+                logger.debug("creating process pool executor, pid=%d, max_workers=%d", os.getpid(), self.max_workers)
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+                self._pid = os.getpid()
+            return self._pool
+
+    def submit(self, fn: Callable[_P, _R], /, *args: _P.args, **kwargs: _P.kwargs) -> Future[_R]:
+        return self._get_pool().submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:  # noqa: FBT001, FBT002
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None and self._pid == os.getpid():
+            pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+def create_executor(
+    option: ExecutorOption | None, *, max_threads: int | None = None, name: str = "", tags: Tags | None = None
+) -> Executor | None:
+    """Return the executor for the sync handlers of a route.
+
+    ``None`` (or ``"thread"``) means the event loop default executor, unless
+    ``max_threads`` is given: then the route gets its own thread pool with that size.
+    ``"process"`` means a new process pool (created on first use, with up to
+    ``DEFAULT_MAX_PROCESSES`` processes), and an ``Executor`` instance is used as is.
+    Thread pools report their metrics with ``tags``.
+    """
+    if max_threads is not None and (max_threads < 1 or option not in {None, "thread"}):
+        msg = f"max_threads must be a positive integer and only applies to thread executors: {max_threads!r}"
+        raise ValueError(msg)
+
+    if option is None or option == "thread":
+        if max_threads is None:
+            return None
+
+        logger.debug("creating thread pool executor, name=%s, max_threads=%d", name, max_threads)
+        return RouteThreadPoolExecutor(max_workers=max_threads, thread_name_prefix=f"loafer-{name}", tags=tags)
+
+    if option == "process":
+        return RouteProcessPoolExecutor()
+
+    if isinstance(option, Executor):
+        return option
+
+    msg = f"executor must be 'thread', 'process' or an Executor instance: {option!r}"
+    raise TypeError(msg)
@@ -1,16 +1,28 @@
-from contextlib import AbstractAsyncContextManager, nullcontext
-from typing import TYPE_CHECKING, Any, Generic, Literal, NotRequired, TypedDict, TypeVar, Unpack, cast, overload
+import asyncio
+import logging
+from collections.abc import Mapping
+from contextlib import AbstractAsyncContextManager, AsyncExitStack, nullcontext
+from types import TracebackType
+from typing import TYPE_CHECKING, Any, Generic, Literal, NotRequired, TypedDict, TypeVar, Unpack, overload
 
+import botocore.exceptions
+from aiobotocore.config import AioConfig
 from aiobotocore.session import AioSession, get_session
 from types_aiobotocore_sns import Client as SNSClient
 from types_aiobotocore_sqs import Client as SQSClient
 
+from loafer.exceptions import BatchEntryError
+
 if TYPE_CHECKING:
+    from types_aiobotocore_sns.type_defs import ListTopicsResponseTypeDef
     from types_aiobotocore_sqs.type_defs import GetQueueUrlResultTypeDef
 
+logger = logging.getLogger(__name__)
+
 ClientT = TypeVar("ClientT", SNSClient, SQSClient)
 
 DEFAULT_SESSION = None
+DEFAULT_CLIENT_POOL = None
 
 
 def _setup_default_session() -> None:
@@ -26,6 +38,195 @@ def get_default_session() -> AioSession:
     return DEFAULT_SESSION
 
 
+def batch_results(response: Mapping[str, Any], size: int) -> list[Any]:
+    """Map a ``*Batch`` API response to one result per request entry.
+
+    Entries are expected to be sent with their position as ``Id``; failed entries
+    are reported as :class:`~loafer.exceptions.BatchEntryError` instances.
+    """
+    results: list[Any] = [None] * size
+    for entry in response.get("Successful", []):
+        results[int(entry["Id"])] = entry
+
+    for entry in response.get("Failed", []):
+        results[int(entry["Id"])] = BatchEntryError(
+            entry.get("Message") or entry["Code"],
+            code=entry["Code"],
+            retryable=not entry.get("SenderFault", False),
+        )
+
+    return results
+
+
+_PoolKey = tuple[str, bool, tuple[tuple[str, Any], ...]]
+
+
+class ClientPool:
+    """Long-lived clients shared by every loafer client with the same service and options.
+
+    While the pool is open (by the manager, see :meth:`open`), clients are created on first
+    use and kept open until :meth:`close` is called. Otherwise, like in code that uses
+    handlers on its own, every call gets a client of its own, closed right after it.
+    Receive (long polling) requests use their own clients, so they can't take all the
+    connections of the other requests; their connection pool is sized with :meth:`reserve`.
+    """
+
+    def __init__(self) -> None:
+        self._clients: dict[_PoolKey, Any] = {}
+        self._connections: dict[_PoolKey, int] = {}
+        self._accounts: dict[_PoolKey, tuple[str, str]] = {}
+        self._exit_stack = AsyncExitStack()
+        self._lock = asyncio.Lock()
+        # clients belong to the event loop that created them
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # accounts are looked up with the pool open or not, the lock follows the running loop
+        self._accounts_lock: tuple[asyncio.AbstractEventLoop, asyncio.Lock] | None = None
+
+    @staticmethod
+    def _key(service_name: str, client_options: "ClientOptions", *, receive: bool) -> _PoolKey:
+        return (service_name, receive, tuple(sorted(client_options.items())))
+
+    def reserve(self, service_name: str, client_options: "ClientOptions", connections: int) -> None:
+        """Add ``connections`` to the connection pool of the receive client, created afterwards."""
+        key = self._key(service_name, client_options, receive=True)
+        self._connections[key] = self._connections.get(key, 0) + connections
+
+    def open(self) -> None:
+        """Keep the clients open, in the running event loop, until :meth:`close` is called."""
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+
+        if self._clients:
+            # the loop of these clients is gone without closing the pool, they can't be closed anymore
+            logger.warning("dropping %d pooled client(s) of another event loop", len(self._clients))
+        self._reset()
+        self._loop = loop
+
+    def is_open(self) -> bool:
+        return self._loop is not None and self._loop is asyncio.get_running_loop()
+
+    def _reset(self) -> AsyncExitStack:
+        self._clients.clear()
+        exit_stack, self._exit_stack = self._exit_stack, AsyncExitStack()
+        # the lock binds to the event loop that uses it
+        self._lock = asyncio.Lock()
+        return exit_stack
+
+    def create_client(
+        self, service_name: str, client_options: "ClientOptions", *, receive: bool = False
+    ) -> AbstractAsyncContextManager[Any, Any]:
+        """Return a new client (not pooled), in a context manager that closes it."""
+        options = client_options.copy()
+        connections = self._connections.get(self._key(service_name, client_options, receive=receive))
+        if connections is not None:
+            # at least botocore's default, options given by the user take precedence
+            config = AioConfig(max_pool_connections=max(connections, 10))
+            user_config = options.get("config")
+            options["config"] = config.merge(user_config) if user_config is not None else config
+
+        return get_default_session().create_client(service_name, **options)  # type: ignore[call-overload, no-any-return]
+
+    def client(
+        self, service_name: str, client_options: "ClientOptions", *, receive: bool = False
+    ) -> AbstractAsyncContextManager[Any, Any]:
+        """Return a client in a context manager: the pooled one if the pool is open, a new one otherwise."""
+        return _PooledClient(self, service_name, client_options, receive=receive)
+
+    async def get_client(self, service_name: str, client_options: "ClientOptions", *, receive: bool = False) -> Any:
+        """Return the pooled client, the pool must be open."""
+        if not self.is_open():
+            msg = "the client pool is not open in this event loop"
+            raise RuntimeError(msg)
+
+        key = self._key(service_name, client_options, receive=receive)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        async with self._lock:
+            # another coroutine may have created the client while we were waiting for the lock
+            if key not in self._clients:
+                logger.debug("creating %s client, receive=%s, options=%r", service_name, receive, key[2])
+                self._clients[key] = await self._exit_stack.enter_async_context(
+                    self.create_client(service_name, client_options, receive=receive)
+                )
+
+        return self._clients[key]
+
+    async def get_account(self, client_options: "ClientOptions") -> tuple[str, str]:
+        """Return the partition and the account id of the credentials of ``client_options``.
+
+        Looked up once, with STS ``GetCallerIdentity`` (which requires no permission), and kept
+        after :meth:`close`.
+        """
+        key = self._key("sts", client_options, receive=False)
+        if key not in self._accounts:
+            loop = asyncio.get_running_loop()
+            if self._accounts_lock is None or self._accounts_lock[0] is not loop:
+                self._accounts_lock = (loop, asyncio.Lock())
+            async with self._accounts_lock[1]:
+                if key not in self._accounts:
+                    async with self.client("sts", client_options) as client:
+                        response = await client.get_caller_identity()
+                    self._accounts[key] = (response["Arn"].split(":")[1], response["Account"])
+
+        return self._accounts[key]
+
+    async def close(self) -> None:
+        logger.debug("closing %d pooled client(s)", len(self._clients))
+        # clients are not pooled until the pool is opened again, by this loop or another one
+        self._loop = None
+        await self._reset().aclose()
+
+
+def get_default_client_pool() -> ClientPool:
+    global DEFAULT_CLIENT_POOL  # noqa: PLW0603
+    if DEFAULT_CLIENT_POOL is None:
+        DEFAULT_CLIENT_POOL = ClientPool()
+
+    return DEFAULT_CLIENT_POOL
+
+
+def open_default_client_pool() -> None:
+    get_default_client_pool().open()
+
+
+async def close_default_client_pool() -> None:
+    if DEFAULT_CLIENT_POOL is not None:
+        await DEFAULT_CLIENT_POOL.close()
+
+
+class _PooledClient:
+    def __init__(
+        self, pool: ClientPool, service_name: str, client_options: "ClientOptions", *, receive: bool = False
+    ) -> None:
+        self._pool = pool
+        self._service_name = service_name
+        self._client_options = client_options
+        self._receive = receive
+        self._context: AbstractAsyncContextManager[Any, Any] | None = None
+
+    async def __aenter__(self) -> Any:
+        if self._pool.is_open():
+            return await self._pool.get_client(self._service_name, self._client_options, receive=self._receive)
+
+        # nothing keeps the pool open: a client for this call only
+        self._context = self._pool.create_client(self._service_name, self._client_options, receive=self._receive)
+        return await self._context.__aenter__()
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        # pooled clients are closed by ClientPool.close
+        if self._context is not None:
+            context, self._context = self._context, None
+            await context.__aexit__(exc_type, exc_val, exc_tb)
+
+
 class ClientOptions(TypedDict):
     api_version: NotRequired[str | None]
     aws_access_key_id: NotRequired[str | None]
@@ -35,6 +236,7 @@ class ClientOptions(TypedDict):
     region_name: NotRequired[str | None]
     use_ssl: NotRequired[bool]
     verify: NotRequired[str | bool | None]
+    config: NotRequired[AioConfig | None]
 
 
 class _BotoClient(Generic[ClientT]):
@@ -59,16 +261,15 @@ class _BotoClient(Generic[ClientT]):
                 "region_name": client_options.get("region_name"),
                 "use_ssl": client_options.get("use_ssl", True),
                 "verify": client_options.get("verify"),
+                "config": client_options.get("config"),
             }
 
-    def get_client(self) -> AbstractAsyncContextManager[ClientT, None]:
+    def get_client(self, *, receive: bool = False) -> AbstractAsyncContextManager[ClientT, None]:
+        """Return the client, in a context manager; ``receive`` is for long polling requests."""
         if hasattr(self, "_client"):
             return nullcontext(self._client)
 
-        return cast(
-            AbstractAsyncContextManager[ClientT, None],
-            get_default_session().create_client(self.boto_service_name, **self._client_options),
-        )
+        return get_default_client_pool().client(self.boto_service_name, self._client_options, receive=receive)
 
 
 class BaseSQSClient(_BotoClient[SQSClient]):
@@ -83,6 +284,8 @@ class BaseSQSClient(_BotoClient[SQSClient]):
     def __init__(self, **kwargs: Any):
         super().__init__(**kwargs)
         self._cached_queue_urls: dict[str, str] = {}
+        # concurrent callers (like publishers) wait for a single GetQueueUrl request
+        self._resolve_lock = asyncio.Lock()
 
     async def get_queue_url(self, queue: str) -> str:
         if queue and (queue.startswith(("http://", "https://"))):
@@ -91,9 +294,11 @@ class BaseSQSClient(_BotoClient[SQSClient]):
             queue = name
 
         if queue not in self._cached_queue_urls:
-            async with self.get_client() as client:
-                response: GetQueueUrlResultTypeDef = await client.get_queue_url(QueueName=queue)
-                self._cached_queue_urls[queue] = response["QueueUrl"]
+            async with self._resolve_lock:
+                if queue not in self._cached_queue_urls:
+                    async with self.get_client() as client:
+                        response: GetQueueUrlResultTypeDef = await client.get_queue_url(QueueName=queue)
+                        self._cached_queue_urls[queue] = response["QueueUrl"]
 
         return self._cached_queue_urls[queue]
 
@@ -101,8 +306,85 @@ class BaseSQSClient(_BotoClient[SQSClient]):
 class BaseSNSClient(_BotoClient[SNSClient]):
     boto_service_name: Literal["sns"] = "sns"
 
+    @overload
+    def __init__(self, *, client: SNSClient): ...
+
+    @overload
+    def __init__(self, **client_options: Unpack[ClientOptions]): ...
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._cached_topic_arns: dict[str, str] = {}
+        # concurrent callers (like publishers) wait for a single lookup
+        self._resolve_lock = asyncio.Lock()
+
     async def get_topic_arn(self, topic: str) -> str:
-        arn_prefix = "arn:aws:sns:"
-        if topic.startswith(arn_prefix):
+        """Return the ARN of a topic, given its ARN or name.
+
+        Names are expanded with the region of the client and the account of its credentials,
+        topics are listed (with ListTopics) when the account can't be looked up.
+        """
+        if topic.startswith("arn:"):
             return topic
-        return f"{arn_prefix}*:{topic}"
+
+        if topic not in self._cached_topic_arns:
+            async with self._resolve_lock:
+                if topic not in self._cached_topic_arns:
+                    await self._resolve_topic_arn(topic)
+
+        try:
+            return self._cached_topic_arns[topic]
+        except KeyError:
+            msg = f"topic not found: {topic!r}"
+            raise ValueError(msg) from None
+
+    async def _resolve_topic_arn(self, topic: str) -> None:
+        async with self.get_client() as client:
+            region = client.meta.region_name
+            account_options = await self._get_account_options(client)
+
+        if account_options is not None:
+            try:
+                partition, account = await get_default_client_pool().get_account(account_options)
+            except (botocore.exceptions.BotoCoreError, botocore.exceptions.ClientError) as exc:
+                logger.warning("unable to look up the account of the credentials, listing the topics: %s", exc)
+            else:
+                self._cached_topic_arns[topic] = f"arn:{partition}:sns:{region}:{account}:{topic}"
+                return
+
+        await self._list_topics()
+
+    async def _get_account_options(self, client: SNSClient) -> ClientOptions | None:
+        """Return the options of the STS client, for the credentials of ``client``."""
+        if not hasattr(self, "_client"):
+            options = self._client_options.copy()
+            # SNS specific, STS is reached by its own (or AWS_ENDPOINT_URL_STS) endpoint
+            options.pop("api_version", None)
+            options.pop("endpoint_url", None)
+            return options
+
+        # custom clients: the credentials their requests are signed with
+        credentials = getattr(getattr(client, "_request_signer", None), "_credentials", None)
+        if credentials is None:
+            return None
+
+        frozen = await credentials.get_frozen_credentials()
+        return {
+            "region_name": client.meta.region_name,
+            "aws_access_key_id": frozen.access_key,
+            "aws_secret_access_key": frozen.secret_key,
+            "aws_session_token": frozen.token,
+        }
+
+    async def _list_topics(self) -> None:
+        options: dict[str, str] = {}
+        async with self.get_client() as client:
+            while True:
+                response: ListTopicsResponseTypeDef = await client.list_topics(**options)
+                for entry in response.get("Topics", []):
+                    arn = entry["TopicArn"]
+                    self._cached_topic_arns[arn.rsplit(":", 1)[-1]] = arn
+
+                if not response.get("NextToken"):
+                    break
+                options["NextToken"] = response["NextToken"]
@@ -0,0 +1,61 @@
+import logging
+from collections.abc import Collection, Mapping
+from typing import Any, TypeAlias
+
+from loafer._compat import JSONDecodeError, json_loads
+from loafer.types import Message
+
+logger = logging.getLogger(__name__)
+
+_ENVELOPE_ERRORS: tuple[type[Exception], ...] = (*JSONDecodeError, KeyError, TypeError)
+
+# attribute name -> accepted value (or values)
+AttributeConditions: TypeAlias = Mapping[str, str | Collection[str]]
+
+
+class SQSAttributeFilter:
+    """Accept SQS messages whose ``MessageAttributes`` match all the given conditions.
+
+    Messages missing any of the attributes are rejected. The body is never decoded.
+    """
+
+    def __init__(self, conditions: AttributeConditions) -> None:
+        self.conditions: dict[str, frozenset[str]] = {
+            name: frozenset((value,) if isinstance(value, str) else value) for name, value in conditions.items()
+        }
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__}: {self.conditions}>"
+
+    def __call__(self, message: Message) -> bool:
+        return self._match(message.get("MessageAttributes") or {}, "StringValue")
+
+    def _match(self, attributes: Mapping[str, Any], value_key: str) -> bool:
+        for name, accepted in self.conditions.items():
+            attribute = attributes.get(name)
+            if attribute is None or attribute.get(value_key) not in accepted:
+                return False
+        return True
+
+
+class SNSAttributeFilter(SQSAttributeFilter):
+    """Accept SNS notifications whose ``MessageAttributes`` match all the given conditions.
+
+    Attributes are read from the SQS message with raw message delivery, otherwise from
+    the notification envelope: only the envelope is decoded, not the notification message.
+    """
+
+    def __call__(self, message: Message) -> bool:
+        if message.get("MessageAttributes"):
+            return self._match(message["MessageAttributes"], "StringValue")
+
+        try:
+            envelope = json_loads(message["Body"])
+        except _ENVELOPE_ERRORS:
+            # let the message translator report it
+            return True
+
+        if not isinstance(envelope, dict):
+            return True
+
+        return self._match(envelope.get("MessageAttributes") or {}, "Value")
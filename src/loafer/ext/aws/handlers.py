@@ -4,28 +4,73 @@ from collections.abc import Callable
 from typing import Any, Unpack, overload
 
 from types_aiobotocore_sns import Client as SNSClient
-from types_aiobotocore_sns.type_defs import PublishResponseTypeDef
+from types_aiobotocore_sns.type_defs import PublishBatchResultEntryTypeDef, PublishResponseTypeDef
 from types_aiobotocore_sqs import Client as SQSClient
-from types_aiobotocore_sqs.type_defs import SendMessageResultTypeDef
+from types_aiobotocore_sqs.type_defs import SendMessageBatchResultEntryTypeDef, SendMessageResultTypeDef
 
+from loafer.batching import Batcher
 from loafer.types import Message, Metadata
 
-from .bases import BaseSNSClient, BaseSQSClient, ClientOptions
+from .bases import BaseSNSClient, BaseSQSClient, ClientOptions, batch_results
 
 logger = logging.getLogger(__name__)
 
+# SendMessageBatch and PublishBatch limits
+MAX_BATCH_SIZE = 10
+MAX_BATCH_BYTES = 256 * 1024
+
+
+def _create_batcher(send: Any, batch_size: int | None, batch_max_wait: float) -> Batcher[str, Any] | None:
+    if batch_size is None:
+        return None
+
+    if not 1 <= batch_size <= MAX_BATCH_SIZE:
+        msg = f"batch_size must be between 1 and {MAX_BATCH_SIZE}: {batch_size!r}"
+        raise ValueError(msg)
+
+    return Batcher(
+        send,
+        max_size=batch_size,
+        max_delay=batch_max_wait,
+        max_bytes=MAX_BATCH_BYTES,
+        size=lambda message: len(message.encode()),
+    )
+
 
 class SQSHandler(BaseSQSClient):
     queue_name: str | None = None
 
     @overload
-    def __init__(self, queue_name: str | None = None, *, client: SQSClient): ...
+    def __init__(
+        self,
+        queue_name: str | None = None,
+        *,
+        batch_size: int | None = None,
+        batch_max_wait: float = 0.1,
+        client: SQSClient,
+    ): ...
 
     @overload
-    def __init__(self, queue_name: str | None = None, **client_options: Unpack[ClientOptions]): ...
-
-    def __init__(self, queue_name: str | None = None, **kwargs: Any):
+    def __init__(
+        self,
+        queue_name: str | None = None,
+        *,
+        batch_size: int | None = None,
+        batch_max_wait: float = 0.1,
+        **client_options: Unpack[ClientOptions],
+    ): ...
+
+    def __init__(
+        self,
+        queue_name: str | None = None,
+        *,
+        batch_size: int | None = None,
+        batch_max_wait: float = 0.1,
+        **kwargs: Any,
+    ):
         self.queue_name = queue_name or self.queue_name
+        # with batch_size, published messages are coalesced into SendMessageBatch requests
+        self._batcher: Batcher[str, Any] | None = _create_batcher(self._send_messages, batch_size, batch_max_wait)
         super().__init__(**kwargs)
 
     def __str__(self) -> str:
@@ -33,7 +78,7 @@ class SQSHandler(BaseSQSClient):
 
     async def publish(
         self, message: Message, encoder: Callable[[Message], str] | None = json.dumps
-    ) -> SendMessageResultTypeDef:
+    ) -> SendMessageResultTypeDef | SendMessageBatchResultEntryTypeDef:
         if not self.queue_name:
             msg = f"{type(self).__name__}: missing queue_name attribute"
             raise ValueError(msg)
@@ -43,25 +88,71 @@ class SQSHandler(BaseSQSClient):
 
         logger.debug("publishing, queue=%s, message=%s", self.queue_name, message)
 
+        if self._batcher is not None:
+            result: SendMessageBatchResultEntryTypeDef = await self._batcher.submit(message)
+            return result
+
         queue_url = await self.get_queue_url(self.queue_name)
         async with self.get_client() as client:
             return await client.send_message(QueueUrl=queue_url, MessageBody=message)
 
+    async def _send_messages(self, messages: list[str]) -> list[Any]:
+        queue_url = await self.get_queue_url(self.queue_name)  # type: ignore[arg-type]
+        async with self.get_client() as client:
+            response = await client.send_message_batch(
+                QueueUrl=queue_url,
+                Entries=[{"Id": str(i), "MessageBody": message} for i, message in enumerate(messages)],
+            )
+
+        return batch_results(response, len(messages))
+
     async def handle(self, message: Message, metadata: Metadata) -> bool:  # noqa: ARG002
         return bool(await self.publish(message))
 
+    async def warmup(self) -> None:
+        async with self.get_client():
+            if self.queue_name:
+                await self.get_queue_url(self.queue_name)
+
+    async def close(self) -> None:
+        if self._batcher is not None:
+            await self._batcher.flush()
+
 
 class SNSHandler(BaseSNSClient):
     topic: str | None = None
 
     @overload
-    def __init__(self, topic: str | None = None, *, client: SNSClient): ...
+    def __init__(
+        self,
+        topic: str | None = None,
+        *,
+        batch_size: int | None = None,
+        batch_max_wait: float = 0.1,
+        client: SNSClient,
+    ): ...
 
     @overload
-    def __init__(self, topic: str | None = None, **client_options: Unpack[ClientOptions]): ...
-
-    def __init__(self, topic: str | None = None, **kwargs: Any):
+    def __init__(
+        self,
+        topic: str | None = None,
+        *,
+        batch_size: int | None = None,
+        batch_max_wait: float = 0.1,
+        **client_options: Unpack[ClientOptions],
+    ): ...
+
+    def __init__(
+        self,
+        topic: str | None = None,
+        *,
+        batch_size: int | None = None,
+        batch_max_wait: float = 0.1,
+        **kwargs: Any,
+    ):
         self.topic = topic or self.topic
+        # with batch_size, published messages are coalesced into PublishBatch requests
+        self._batcher: Batcher[str, Any] | None = _create_batcher(self._publish_messages, batch_size, batch_max_wait)
         super().__init__(**kwargs)
 
     def __str__(self) -> str:
@@ -69,7 +160,7 @@ class SNSHandler(BaseSNSClient):
 
     async def publish(
         self, message: Message, encoder: Callable[[Message], str] | None = json.dumps
-    ) -> PublishResponseTypeDef:
+    ) -> PublishResponseTypeDef | PublishBatchResultEntryTypeDef:
         if not self.topic:
             msg = f"{type(self).__name__}: missing topic attribute"
             raise ValueError(msg)
@@ -81,8 +172,33 @@ class SNSHandler(BaseSNSClient):
         logger.debug("publishing, topic=%s, message=%s", topic_arn, message)
 
         msg = json.dumps({"default": message})
+        if self._batcher is not None:
+            result: PublishBatchResultEntryTypeDef = await self._batcher.submit(msg)
+            return result
+
         async with self.get_client() as client:
             return await client.publish(TopicArn=topic_arn, MessageStructure="json", Message=msg)
 
+    async def _publish_messages(self, messages: list[str]) -> list[Any]:
+        topic_arn = await self.get_topic_arn(self.topic)  # type: ignore[arg-type]
+        async with self.get_client() as client:
+            response = await client.publish_batch(
+                TopicArn=topic_arn,
+                PublishBatchRequestEntries=[
+                    {"Id": str(i), "MessageStructure": "json", "Message": message} for i, message in enumerate(messages)
+                ],
+            )
+
+        return batch_results(response, len(messages))
+
     async def handle(self, message: Message, metadata: Metadata) -> bool:  # noqa: ARG002
         return bool(await self.publish(message))
+
+    async def warmup(self) -> None:
+        async with self.get_client():
+            if self.topic:
+                await self.get_topic_arn(self.topic)
+
+    async def close(self) -> None:
+        if self._batcher is not None:
+            await self._batcher.flush()
@@ -1,14 +1,34 @@
-import json
 import logging
+from typing import Any
 
-from loafer._compat import override
+from loafer._compat import JSONDecodeError, json_decoder, json_loads, override
 from loafer.message_translators import AbstractMessageTranslator
 from loafer.types import Message, TranslatedMessage
 
 logger = logging.getLogger(__name__)
 
+_DECODE_ERRORS: tuple[type[Exception], ...] = (*JSONDecodeError, TypeError)
 
-class SQSMessageTranslator(AbstractMessageTranslator):
+
+class _BodyMessageTranslator(AbstractMessageTranslator):
+    def __init__(self, schema: type[Any] | None = None) -> None:
+        # the message payload is decoded into an instance of `schema`, when given
+        self.schema: type[Any] | None = schema
+        self._decode = json_decoder(schema)
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # decoders are not always picklable, translators are sent to process pools
+        return (type(self), (self.schema,))
+
+    @override
+    def message_size(self, message: Message) -> int | None:
+        try:
+            return len(message["Body"])
+        except (KeyError, TypeError):
+            return None
+
+
+class SQSMessageTranslator(_BodyMessageTranslator):
     @override
     def translate(self, message: Message) -> TranslatedMessage:
         translated: TranslatedMessage = {"content": None, "metadata": {}}
@@ -19,22 +39,21 @@ class SQSMessageTranslator(AbstractMessageTranslator):
             return translated
 
         try:
-            translated["content"] = json.loads(body)
-        except json.decoder.JSONDecodeError as exc:
+            translated["content"] = self._decode(body)
+        except _DECODE_ERRORS as exc:
             logger.exception("error=%r, message=%r", exc, message)  # noqa: TRY401
             return translated
 
-        message.pop("Body")
-        translated["metadata"].update(message)
+        translated["metadata"] = {key: value for key, value in message.items() if key != "Body"}
         return translated
 
 
-class SNSMessageTranslator(AbstractMessageTranslator):
+class SNSMessageTranslator(_BodyMessageTranslator):
     @override
     def translate(self, message: Message) -> TranslatedMessage:
         translated: TranslatedMessage = {"content": None, "metadata": {}}
         try:
-            body = json.loads(message["Body"])
+            body = json_loads(message["Body"])
             message_body = body.pop("Message")
         except (KeyError, TypeError):
             logger.exception(
@@ -42,14 +61,15 @@ class SNSMessageTranslator(AbstractMessageTranslator):
             )
             return translated
 
-        translated["metadata"].update(message)
-        translated["metadata"].pop("Body")
+        metadata = {key: value for key, value in message.items() if key != "Body"}
+        translated["metadata"] = metadata
 
         try:
-            translated["content"] = json.loads(message_body)
-        except (json.decoder.JSONDecodeError, TypeError) as exc:
+            translated["content"] = self._decode(message_body)
+        except _DECODE_ERRORS as exc:
             logger.exception("error=%r, message=%r", exc, message)  # noqa: TRY401
             return translated
 
-        translated["metadata"].update(body)
+        # notification attributes take precedence over the SQS message ones
+        metadata.update(body)
         return translated
@@ -1,5 +1,8 @@
+import asyncio
 import logging
+import time
 from collections.abc import Iterable
+from functools import partial
 from typing import Any, Unpack, overload
 
 import botocore.exceptions
@@ -10,14 +13,21 @@ from types_aiobotocore_sqs.type_defs import (
 )
 
 from loafer._compat import override
-from loafer.exceptions import ProviderError
+from loafer.batching import Batcher
+from loafer.exceptions import BatchEntryError, ProviderError
+from loafer.logs import get_message_logger
+from loafer.metrics import Tags, get_default_metrics
 from loafer.providers import AbstractProvider
+from loafer.retries import RetryPolicy
 from loafer.types import Message
 
-from .bases import BaseSQSClient, ClientOptions
+from .bases import BaseSQSClient, ClientOptions, batch_results, get_default_client_pool
 
 logger = logging.getLogger(__name__)
 
+# the longest visibility timeout allowed by SQS, in seconds (12 hours)
+MAX_VISIBILITY_TIMEOUT = 43200
+
 
 class SQSProvider(AbstractProvider, BaseSQSClient):
     @overload
@@ -26,6 +36,10 @@ class SQSProvider(AbstractProvider, BaseSQSClient):
         queue_name: str,
         options: ReceiveMessageRequestQueueReceiveMessagesTypeDef | None = None,
         *,
+        ack_max_delay: float = 0.1,
+        visibility_heartbeat: int | None = None,
+        retry_policy: RetryPolicy | None = None,
+        max_receives: int = 1,
         client: SQSClient,
     ): ...
 
@@ -34,42 +48,240 @@ class SQSProvider(AbstractProvider, BaseSQSClient):
         self,
         queue_name: str,
         options: ReceiveMessageRequestQueueReceiveMessagesTypeDef | None = None,
+        *,
+        ack_max_delay: float = 0.1,
+        visibility_heartbeat: int | None = None,
+        retry_policy: RetryPolicy | None = None,
+        max_receives: int = 1,
         **client_options: Unpack[ClientOptions],
     ): ...
 
     def __init__(
-        self, queue_name: str, options: ReceiveMessageRequestQueueReceiveMessagesTypeDef | None = None, **kwargs: Any
+        self,
+        queue_name: str,
+        options: ReceiveMessageRequestQueueReceiveMessagesTypeDef | None = None,
+        *,
+        ack_max_delay: float = 0.1,
+        visibility_heartbeat: int | None = None,
+        retry_policy: RetryPolicy | None = None,
+        max_receives: int = 1,
+        **kwargs: Any,
     ):
         self.queue_name: str = queue_name
-        self._options: ReceiveMessageRequestQueueReceiveMessagesTypeDef = options or {}
+        self._labels: Tags = {"queue": queue_name}
+        self._options: ReceiveMessageRequestQueueReceiveMessagesTypeDef = options.copy() if options else {}
+        # long polling, unless told otherwise: fewer empty receives on idle queues
+        self._options.setdefault("WaitTimeSeconds", 20)
+        # acknowledgements are coalesced into DeleteMessageBatch requests (up to 10 entries each)
+        self._acks: Batcher[str, Any] = Batcher(self._delete_messages, max_size=10, max_delay=ack_max_delay)
+        self._visibility: Batcher[tuple[str, int], Any] = Batcher(self._change_visibility, max_size=10, max_delay=0)
+
+        # while a message is not confirmed (or rejected) its visibility timeout is extended
+        # to `visibility_heartbeat` seconds, every third of that time
+        self.visibility_heartbeat: int | None = visibility_heartbeat
+        self._heartbeat_interval: float = 0
+        if visibility_heartbeat is not None:
+            self._heartbeat_interval = visibility_heartbeat / 3
+            self._options.setdefault("VisibilityTimeout", visibility_heartbeat)
+        self._in_flight: dict[str, None] = {}
+        self._heartbeat_task: asyncio.Task[None] | None = None
+
+        # messages not processed are retried after a delay given by `retry_policy`, from their
+        # receive count, instead of waiting for the visibility timeout of the queue
+        self.retry_policy: RetryPolicy | None = retry_policy
+        if retry_policy is not None:
+            names = list(self._options.get("MessageSystemAttributeNames", []))
+            if not {"All", "ApproximateReceiveCount"} & {*names, *self._options.get("AttributeNames", [])}:
+                names.append("ApproximateReceiveCount")
+                self._options["MessageSystemAttributeNames"] = names
         super().__init__(**kwargs)
 
+        # receives (up to `max_receives` at the same time, one per route poller) use a pooled
+        # client of their own, long polls must not take the connections of acknowledgements
+        if max_receives < 1:
+            msg = f"max_receives must be a positive integer: {max_receives!r}"
+            raise ValueError(msg)
+        if not hasattr(self, "_client"):
+            get_default_client_pool().reserve(self.boto_service_name, self._client_options, max_receives)
+
     def __str__(self) -> str:
         return f"<{type(self).__name__}: {self.queue_name}>"
 
     @override
     async def confirm_message(self, message: Message) -> None:
         receipt = message["ReceiptHandle"]
-        logger.info("confirm message (ack/deletion), receipt=%r", receipt)
+        get_message_logger().log(logger, logging.DEBUG, "confirm message (ack/deletion)", self.queue_name, receipt)
+        self._in_flight.pop(receipt, None)
+
+        # not awaited: the message task (and its worker) is done while the batch fills up,
+        # pending acknowledgements are sent by close
+        self._acks.submit_nowait(receipt).add_done_callback(partial(self._acknowledged, receipt))
+
+    def _acknowledged(self, receipt: str, future: "asyncio.Future[Any]") -> None:
+        if future.cancelled():
+            return
+
+        exc = future.exception()
+        if exc is None:
+            return
+
+        # the message will be delivered again once its visibility timeout expires
+        metrics = get_default_metrics()
+        if metrics.enabled:
+            metrics.increment("sqs.delete.errors", tags=self._labels)
+        code = exc.code if isinstance(exc, BatchEntryError) else type(exc).__name__
+        logger.error("message acknowledgement failed, code=%s, receipt=%r: %s", code, receipt, exc)
+
+    async def _delete_messages(self, receipts: list[str]) -> list[Any]:
+        queue_url = await self.get_queue_url(self.queue_name)
+        started_at = time.perf_counter()
+        async with self.get_client() as client:
+            response = await client.delete_message_batch(
+                QueueUrl=queue_url,
+                Entries=[{"Id": str(i), "ReceiptHandle": receipt} for i, receipt in enumerate(receipts)],
+            )
+
+        metrics = get_default_metrics()
+        if metrics.enabled:
+            metrics.timing("sqs.delete.duration", time.perf_counter() - started_at, tags=self._labels)
+            metrics.increment("sqs.delete.requests", tags=self._labels)
+
+        return batch_results(response, len(receipts))
+
+    @override
+    def message_id(self, message: Message) -> str | None:
+        message_id: str | None = message.get("MessageId")
+        return message_id
+
+    @override
+    async def message_not_processed(self, message: Message) -> None:
+        receipt = message["ReceiptHandle"]
+        self._in_flight.pop(receipt, None)
+        if self.retry_policy is None:
+            return
+
+        try:
+            attempt = int(message["Attributes"]["ApproximateReceiveCount"])
+        except (KeyError, TypeError, ValueError):
+            attempt = 1
+        timeout = min(round(self.retry_policy.delay(attempt)), MAX_VISIBILITY_TIMEOUT)
+        logger.debug("retrying message in %ds, attempt=%d, receipt=%r", timeout, attempt, receipt)
+
+        try:
+            await self._visibility.submit((receipt, timeout))
+        except BatchEntryError as exc:
+            logger.warning("message retry not scheduled, code=%s, receipt=%r: %s", exc.code, receipt, exc)
+            return
+
+        metrics = get_default_metrics()
+        if metrics.enabled:
+            metrics.increment("sqs.retries", tags=self._labels)
+
+    @override
+    async def release_message(self, message: Message) -> None:
+        receipt = message["ReceiptHandle"]
+        self._in_flight.pop(receipt, None)
+
+        try:
+            # the message is visible again right away
+            await self._visibility.submit((receipt, 0))
+        except BatchEntryError as exc:
+            logger.warning("message not released, code=%s, receipt=%r: %s", exc.code, receipt, exc)
 
+    async def _change_visibility(self, entries: list[tuple[str, int]]) -> list[Any]:
         queue_url = await self.get_queue_url(self.queue_name)
+        started_at = time.perf_counter()
         async with self.get_client() as client:
-            await client.delete_message(QueueUrl=queue_url, ReceiptHandle=receipt)
+            response = await client.change_message_visibility_batch(
+                QueueUrl=queue_url,
+                Entries=[
+                    {"Id": str(i), "ReceiptHandle": receipt, "VisibilityTimeout": timeout}
+                    for i, (receipt, timeout) in enumerate(entries)
+                ],
+            )
+
+        metrics = get_default_metrics()
+        if metrics.enabled:
+            metrics.timing("sqs.change_visibility.duration", time.perf_counter() - started_at, tags=self._labels)
+
+        return batch_results(response, len(entries))
+
+    async def _heartbeat(self, visibility_timeout: int) -> None:
+        while True:
+            await asyncio.sleep(self._heartbeat_interval)
+            receipts = list(self._in_flight)
+            if not receipts:
+                continue
+
+            logger.debug("extending visibility of %d message(s) on %s", len(receipts), self.queue_name)
+            results = await asyncio.gather(
+                *(self._visibility.submit((receipt, visibility_timeout)) for receipt in receipts),
+                return_exceptions=True,
+            )
+            for receipt, result in zip(receipts, results, strict=True):
+                if isinstance(result, BatchEntryError):
+                    # most likely the message was deleted in the meantime
+                    logger.debug("visibility not extended, code=%s, receipt=%r", result.code, receipt)
+                    self._in_flight.pop(receipt, None)
+                elif isinstance(result, Exception):
+                    logger.error("error extending visibility on %s: %r", self.queue_name, result)
+
+    @override
+    async def warmup(self) -> None:
+        # opens the pooled clients and checks the queue exists (and is accessible) with GetQueueUrl
+        async with self.get_client(), self.get_client(receive=True):
+            try:
+                queue_url = await self.get_queue_url(self.queue_name)
+            except (botocore.exceptions.BotoCoreError, botocore.exceptions.ClientError) as exc:
+                msg = f"error resolving queue={self.queue_name}: {exc!s}"
+                raise ProviderError(msg) from exc
 
-    async def fetch_messages(self) -> Iterable[Message]:
+        logger.debug("%s resolved to %s", self, queue_url)
+
+    @override
+    async def fetch_messages(self, max_messages: int | None = None) -> Iterable[Message]:
         logger.debug("fetching messages on %s", self.queue_name)
+        options = self._options
+        if max_messages is not None:
+            # SQS returns at most 10 messages per request, MaxNumberOfMessages (if given) is an upper limit
+            options = options.copy()
+            options["MaxNumberOfMessages"] = max(min(options.get("MaxNumberOfMessages", 10), max_messages), 1)
+
         queue_url: str = await self.get_queue_url(self.queue_name)
-        async with self.get_client() as client:
+        metrics = get_default_metrics()
+        started_at = time.perf_counter()
+        async with self.get_client(receive=True) as client:
             try:
-                response: ReceiveMessageResultTypeDef = await client.receive_message(
-                    QueueUrl=queue_url, **self._options
-                )
+                response: ReceiveMessageResultTypeDef = await client.receive_message(QueueUrl=queue_url, **options)
             except (botocore.exceptions.BotoCoreError, botocore.exceptions.ClientError) as exc:
+                if metrics.enabled:
+                    metrics.increment("sqs.receive.errors", tags=self._labels)
                 msg = f"error fetching messages from queue={self.queue_name}: {exc!s}"
                 raise ProviderError(msg) from exc
 
-        return response.get("Messages", [])
+        if metrics.enabled:
+            metrics.timing("sqs.receive.duration", time.perf_counter() - started_at, tags=self._labels)
+
+        messages = response.get("Messages", [])
+        if self.visibility_heartbeat is not None:
+            self._in_flight.update(dict.fromkeys(message["ReceiptHandle"] for message in messages))
+            if self._heartbeat_task is None:
+                self._heartbeat_task = asyncio.create_task(self._heartbeat(self.visibility_heartbeat))
+
+        return messages
 
     def stop(self) -> None:
         logger.info("stopping %s", self)
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
         return super().stop()
+
+    @override
+    async def close(self) -> None:
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+            self._heartbeat_task = None
+
+        logger.info("flushing %d pending acknowledgement(s) on %s", len(self._acks), self)
+        await self._acks.flush()
@@ -1,25 +1,63 @@
 from types import EllipsisType
-from typing import NotRequired, TypedDict
+from typing import Any, NotRequired, TypedDict, Unpack
 
 from types_aiobotocore_sqs import Client as SQSClient
 from types_aiobotocore_sqs.type_defs import ReceiveMessageRequestQueueReceiveMessagesTypeDef
 
 from loafer.message_translators import AbstractMessageTranslator
-from loafer.routes import Route
-from loafer.types import ErrorHandler, Handler, HandlerFunc
+from loafer.retries import RetryPolicy
+from loafer.routes import Route, RouteOptions
+from loafer.types import ErrorHandler, Handler, HandlerFunc, Message, MessageFilter
 
 from .bases import ClientOptions
+from .filters import AttributeConditions, SNSAttributeFilter, SQSAttributeFilter
 from .message_translators import SNSMessageTranslator, SQSMessageTranslator
 from .providers import SQSProvider
 
 
 class _ClientProviderOptions(TypedDict):
     options: NotRequired[ReceiveMessageRequestQueueReceiveMessagesTypeDef]
+    ack_max_delay: NotRequired[float]
+    visibility_heartbeat: NotRequired[int | None]
+    retry_policy: NotRequired[RetryPolicy | None]
     client: NotRequired[SQSClient]
 
 
 class _CustomProviderOptions(ClientOptions):
     options: NotRequired[ReceiveMessageRequestQueueReceiveMessagesTypeDef]
+    ack_max_delay: NotRequired[float]
+    visibility_heartbeat: NotRequired[int | None]
+    retry_policy: NotRequired[RetryPolicy | None]
+
+
+def _max_receives(route_options: RouteOptions) -> int:
+    # every route poller may be waiting on a receive request
+    return route_options.get("max_pollers") or route_options.get("pollers", 1)
+
+
+def _setup_attribute_filter(
+    attribute_filter: SQSAttributeFilter,
+    provider_options: _ClientProviderOptions | _CustomProviderOptions,
+    route_options: RouteOptions,
+) -> _ClientProviderOptions | _CustomProviderOptions:
+    # both the attribute filter and the route message_filter (if any) must accept the message
+    message_filter = route_options.get("message_filter")
+    if message_filter is None:
+        route_options["message_filter"] = attribute_filter
+    else:
+
+        def combined_filter(message: Message, message_filter: MessageFilter = message_filter) -> bool:
+            return attribute_filter(message) and message_filter(message)
+
+        route_options["message_filter"] = combined_filter
+
+    # SQS only returns the message attributes that are asked for
+    options = provider_options.get("options", {}).copy()
+    names = list(options.get("MessageAttributeNames", []))
+    if "All" not in names:
+        names.extend(name for name in attribute_filter.conditions if name not in names)
+    options["MessageAttributeNames"] = names
+    return {**provider_options, "options": options}  # type: ignore[return-value]
 
 
 class SQSRoute(Route):
@@ -32,16 +70,27 @@ class SQSRoute(Route):
         name: str = "",
         message_translator: AbstractMessageTranslator | None | EllipsisType = ...,
         error_handler: ErrorHandler | None = None,
+        schema: type[Any] | None = None,
+        message_attributes: AttributeConditions | None = None,
+        **route_options: Unpack[RouteOptions],
     ):
         provider_options = provider_options or {}
-        provider = SQSProvider(provider_queue, **provider_options)
+        if message_attributes:
+            provider_options = _setup_attribute_filter(
+                SQSAttributeFilter(message_attributes), provider_options, route_options
+            )
+        provider = SQSProvider(provider_queue, max_receives=_max_receives(route_options), **provider_options)
+
+        if message_translator is Ellipsis:
+            message_translator = SQSMessageTranslator(schema)
 
         super().__init__(
             provider=provider,
             handler=handler,
             name=name or provider_queue,
-            message_translator=message_translator if message_translator is not Ellipsis else SQSMessageTranslator(),
+            message_translator=message_translator,
             error_handler=error_handler,
+            **route_options,
         )
 
 
@@ -55,14 +104,25 @@ class SNSQueueRoute(Route):
         name: str = "",
         message_translator: AbstractMessageTranslator | None | EllipsisType = ...,
         error_handler: ErrorHandler | None = None,
+        schema: type[Any] | None = None,
+        message_attributes: AttributeConditions | None = None,
+        **route_options: Unpack[RouteOptions],
     ):
         provider_options = provider_options or {}
-        provider = SQSProvider(provider_queue, **provider_options)
+        if message_attributes:
+            provider_options = _setup_attribute_filter(
+                SNSAttributeFilter(message_attributes), provider_options, route_options
+            )
+        provider = SQSProvider(provider_queue, max_receives=_max_receives(route_options), **provider_options)
+
+        if message_translator is Ellipsis:
+            message_translator = SNSMessageTranslator(schema)
 
         super().__init__(
             provider=provider,
             handler=handler,
             name=name or provider_queue,
-            message_translator=message_translator if message_translator is not Ellipsis else SNSMessageTranslator(),
+            message_translator=message_translator,
             error_handler=error_handler,
+            **route_options,
         )
@@ -0,0 +1,99 @@
+import logging
+import random
+import time
+from typing import Any
+
+_OMITTED = object()
+
+
+class _Payload:
+    """Format a message payload only when the log record is emitted."""
+
+    __slots__ = ("max_size", "payload")
+
+    def __init__(self, payload: Any, max_size: int | None) -> None:
+        self.payload = payload
+        self.max_size = max_size
+
+    def __str__(self) -> str:
+        if self.payload is _OMITTED or self.max_size == 0:
+            return ""
+
+        text = repr(self.payload)
+        if self.max_size is not None and len(text) > self.max_size:
+            text = f"{text[: self.max_size]}...({len(text) - self.max_size} more)"
+        return f", message={text}"
+
+
+class MessageLogger:
+    """Log per-message events, sampled and rate limited per route.
+
+    ``sample_rate`` is the fraction of events logged, and ``rate_limit`` the maximum
+    number of events logged per second for each route (``None`` means no limit).
+    Payloads are omitted by default; ``max_payload`` logs their representation, truncated
+    to that many characters (``None`` logs the whole payload).
+    """
+
+    def __init__(
+        self,
+        *,
+        sample_rate: float = 1.0,
+        rate_limit: float | None = None,
+        max_payload: int | None = 0,
+    ) -> None:
+        if not 0 <= sample_rate <= 1:
+            msg = f"sample_rate must be between 0 and 1: {sample_rate!r}"
+            raise ValueError(msg)
+
+        if rate_limit is not None and rate_limit <= 0:
+            msg = f"rate_limit must be a positive number: {rate_limit!r}"
+            raise ValueError(msg)
+
+        self.sample_rate: float = sample_rate
+        self.rate_limit: float | None = rate_limit
+        self.max_payload: int | None = max_payload
+        # token buckets, per route: (available tokens, last update)
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def allow(self, route: str) -> bool:
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:  # noqa: S311
+            return False
+
+        if self.rate_limit is None:
+            return True
+
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(route, (self.rate_limit, now))
+        tokens = min(self.rate_limit, tokens + (now - updated_at) * self.rate_limit)
+        if tokens < 1:
+            self._buckets[route] = (tokens, now)
+            return False
+
+        self._buckets[route] = (tokens - 1, now)
+        return True
+
+    def log(self, logger: logging.Logger, level: int, event: str, route: str, payload: Any = _OMITTED) -> None:
+        if not logger.isEnabledFor(level) or not self.allow(route):
+            return
+
+        logger.log(
+            level,
+            "%s route=%s%s",
+            event,
+            route,
+            _Payload(payload, self.max_payload),
+            extra={"loafer_route": route, "loafer_event": event},
+        )
+
+
+DEFAULT_MESSAGE_LOGGER: MessageLogger = MessageLogger()
+
+
+def get_message_logger() -> MessageLogger:
+    return DEFAULT_MESSAGE_LOGGER
+
+
+def set_message_logger(message_logger: MessageLogger | None) -> None:
+    """Set how per-message events are logged, ``None`` restores the defaults."""
+    global DEFAULT_MESSAGE_LOGGER  # noqa: PLW0603
+    DEFAULT_MESSAGE_LOGGER = message_logger if message_logger is not None else MessageLogger()
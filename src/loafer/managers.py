@@ -3,18 +3,28 @@ from __future__ import annotations
 import asyncio
 import logging
 import os
+from functools import partial
 from typing import TYPE_CHECKING, Any
 
 from .dispatchers import LoaferDispatcher
-from .runners import LoaferRunner
+from .ext.aws.bases import close_default_client_pool, open_default_client_pool
+from .logs import set_message_logger
+from .metrics import set_default_metrics
+from .runners import LoaferProcessRunner, LoaferRunner
 
 if TYPE_CHECKING:
-    from collections.abc import Sequence
+    from collections.abc import Callable, Sequence
 
+    from ._compat import LoopFactory
+    from .logs import MessageLogger
+    from .metrics import AbstractMetrics
     from .routes import Route
 
 logger = logging.getLogger(__name__)
 
+# time given to worker processes, after drain_timeout, to send pending acknowledgements and close
+DRAIN_SHUTDOWN_MARGIN = 10
+
 
 class LoaferManager:
     def __init__(
@@ -23,20 +33,80 @@ class LoaferManager:
         runner: LoaferRunner | None = None,
         queue_size: int | None = None,
         workers: int | None = None,
+        processes: int = 1,
+        metrics: AbstractMetrics | None = None,
+        message_logger: MessageLogger | None = None,
+        drain_timeout: float | None = None,
+        *,
+        loop_factory: LoopFactory | None = None,
+        eager_tasks: bool = False,
+        warmup: bool = True,
+        on_ready: Callable[[], Any] | None = None,
     ):
+        if processes < 1:
+            msg = f"processes must be a positive integer: {processes!r}"
+            raise ValueError(msg)
+
+        if drain_timeout is not None and drain_timeout < 0:
+            msg = f"drain_timeout must be a positive number: {drain_timeout!r}"
+            raise ValueError(msg)
+
+        # with more than one process, every worker process runs all the routes
+        self.processes: int = processes
+        self._exit_code: int = 0
+        self._exception: BaseException | None = None
+
+        # with drain_timeout, a stop signal first lets the messages being processed finish
+        self.drain_timeout: float | None = drain_timeout
+
         if runner is None:
-            self.runner = LoaferRunner(on_stop_callback=self.on_loop__stop)
+            self.runner = LoaferRunner(
+                on_stop_callback=self.on_loop__stop,
+                on_drain_callback=self.drain if drain_timeout is not None else None,
+                loop_factory=loop_factory,
+                eager_tasks=eager_tasks,
+            )
         else:
             self.runner = runner
 
+        if metrics is not None:
+            # the default sink is read by the dispatcher, routes and providers
+            set_default_metrics(metrics)
+        self.metrics: AbstractMetrics | None = metrics
+
+        if message_logger is not None:
+            # sampling, rate limiting and payload size of per-message logs
+            set_message_logger(message_logger)
+
         self.dispatcher = LoaferDispatcher(routes, queue_size, workers)
 
+        # routes are warmed up (queue URLs, topic ARNs, clients) before messages are fetched,
+        # then `ready` is set and `on_ready` is called
+        self.warmup: bool = warmup
+        self.on_ready: Callable[[], Any] | None = on_ready
+        self.ready: asyncio.Event = asyncio.Event()
+
     def run(self, *, forever: bool = True, debug: bool = False) -> None:
+        if self.processes == 1:
+            self._run(forever=forever, debug=debug)
+            if self._exception is not None:
+                # the fatal error, for applications embedding loafer (uncaught, it exits with status 1)
+                exception, self._exception = self._exception, None
+                raise exception
+            return
+
+        logger.info("starting loafer supervisor, pid=%s, processes=%s", os.getpid(), self.processes)
+        options = {}
+        if self.drain_timeout is not None:
+            options["shutdown_timeout"] = self.drain_timeout + DRAIN_SHUTDOWN_MARGIN
+        process_runner = LoaferProcessRunner(self.processes, **options)
+        exit_code = process_runner.start(partial(self._run, forever=forever, debug=debug))
+        if exit_code:
+            raise SystemExit(exit_code)
+
+    def _run(self, *, forever: bool, debug: bool) -> int:
         loop = self.runner.loop
-        self._future = asyncio.ensure_future(
-            self.dispatcher.dispatch_providers(forever=forever),
-            loop=loop,
-        )
+        self._future = asyncio.ensure_future(self._start(forever=forever), loop=loop)
 
         self._future.add_done_callback(self.on_future__errors)
         if not forever:
@@ -45,6 +115,20 @@ class LoaferManager:
         start = "starting loafer, pid={}, forever={}"
         logger.info(start.format(os.getpid(), forever))
         self.runner.start(debug=debug)
+        return self._exit_code
+
+    async def _start(self, *, forever: bool) -> None:
+        # AWS clients are kept open (and shared) until the manager is closed
+        open_default_client_pool()
+        if self.warmup:
+            await self.dispatcher.warmup()
+
+        logger.info("loafer is ready, pid=%s", os.getpid())
+        self.ready.set()
+        if self.on_ready is not None:
+            self.on_ready()
+
+        await self.dispatcher.dispatch_providers(forever=forever)
 
     #
     # Callbacks
@@ -58,6 +142,8 @@ class LoaferManager:
         # Unhandled errors crashes the event loop execution
         if isinstance(exc, BaseException):
             logger.critical("fatal error caught: %r", exc)
+            self._exit_code = 1
+            self._exception = exc
             self.runner.prepare_stop()
             return None
         return None
@@ -66,6 +152,19 @@ class LoaferManager:
         logger.info("cancel dispatcher operations ...")
 
         if hasattr(self, "_future"):
+            # the loop is stopping already, these callbacks would stop it again while closing
+            self._future.remove_done_callback(self.on_future__errors)
+            self._future.remove_done_callback(self.runner.prepare_stop)
             self._future.cancel()
 
         self.dispatcher.stop()
+        self.runner.loop.run_until_complete(self.close())
+
+    async def drain(self) -> None:
+        await self.dispatcher.drain(self.drain_timeout or 0)
+
+    async def close(self) -> None:
+        logger.info("closing dispatcher resources ...")
+        await self.dispatcher.close()
+        # routes may use pooled clients while closing, the pool must be the last one
+        await close_default_client_pool()
@@ -1,7 +1,9 @@
 import abc
 import logging
+from collections.abc import Iterator, Mapping
+from typing import Any
 
-from .types import Message, TranslatedMessage
+from .types import Message, Metadata, TranslatedMessage
 
 logger = logging.getLogger(__name__)
 
@@ -17,8 +19,65 @@ class AbstractMessageTranslator(abc.ABC):
         dictionary with translation metadata or an empty `dict`.
         """
 
+    def message_size(self, message: Message) -> int | None:
+        """Return the size of the payload this translator decodes, if it is known.
+
+        Routes use it to translate large messages outside the event loop.
+        """
+        if isinstance(message, str | bytes):
+            return len(message)
+        return None
+
 
 class StringMessageTranslator(AbstractMessageTranslator):
     def translate(self, message: Message) -> TranslatedMessage:
         logger.debug("%r will translate %r", type(self).__name__, message)
         return {"content": str(message), "metadata": {}}
+
+
+class LazyTranslatedMessage(Mapping[str, Any]):
+    """A message translated on first access of its ``content`` or ``metadata``.
+
+    The translation is done once and cached; ``raw`` is the received message, as is.
+    """
+
+    __slots__ = ("_translated", "_translator", "raw")
+
+    def __init__(self, raw: Message, translator: AbstractMessageTranslator | None = None) -> None:
+        self.raw: Message = raw
+        self._translator = translator
+        self._translated: TranslatedMessage | None = None
+
+    def translate(self) -> TranslatedMessage:
+        if self._translated is None:
+            if self._translator is None:
+                self._translated = {"content": self.raw, "metadata": {}}
+            else:
+                translated = self._translator.translate(self.raw)
+                if not translated["content"]:
+                    msg = f"{self._translator} failed to translate message={self.raw}"
+                    raise ValueError(msg)
+                self._translated = {"content": translated["content"], "metadata": translated.get("metadata", {})}
+
+        return self._translated
+
+    @property
+    def content(self) -> Message:
+        return self.translate()["content"]
+
+    @property
+    def metadata(self) -> Metadata:
+        return self.translate()["metadata"]
+
+    def __getitem__(self, key: str) -> Any:
+        return self.translate()[key]  # type: ignore[literal-required]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(("content", "metadata"))
+
+    def __len__(self) -> int:
+        return 2
+
+    def __repr__(self) -> str:
+        # not translated by logs
+        return f"{type(self).__name__}({self.raw!r})"
@@ -0,0 +1,286 @@
+import abc
+import logging
+import socket
+import time
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+from typing import TypeAlias
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+Tags: TypeAlias = Mapping[str, str]
+_Key: TypeAlias = tuple[str, tuple[tuple[str, str], ...]]
+
+
+class AbstractMetrics(abc.ABC):
+    """A sink for the metrics reported by the dispatcher, routes and providers.
+
+    Instrumented code checks ``enabled`` before measuring anything, so a disabled
+    sink costs an attribute lookup per hook.
+    """
+
+    enabled: bool = True
+
+    @abc.abstractmethod
+    def increment(self, name: str, value: float = 1, *, tags: Tags | None = None) -> None:
+        """Add ``value`` to the counter ``name``."""
+
+    @abc.abstractmethod
+    def gauge(self, name: str, value: float, *, tags: Tags | None = None) -> None:
+        """Set the gauge ``name`` to ``value``."""
+
+    @abc.abstractmethod
+    def timing(self, name: str, seconds: float, *, tags: Tags | None = None) -> None:
+        """Record a duration, in seconds."""
+
+
+class NullMetrics(AbstractMetrics):
+    enabled = False
+
+    def increment(self, name: str, value: float = 1, *, tags: Tags | None = None) -> None:
+        pass
+
+    def gauge(self, name: str, value: float, *, tags: Tags | None = None) -> None:
+        pass
+
+    def timing(self, name: str, seconds: float, *, tags: Tags | None = None) -> None:
+        pass
+
+
+# exponential bounds, from 100 microseconds to ~105 seconds, with 4 buckets per power of two
+# (values are reported with an error of at most 19%)
+DEFAULT_BUCKETS: tuple[float, ...] = tuple(0.0001 * 2 ** (i / 4) for i in range(81))
+
+
+class Histogram:
+    """Fixed-bucket histogram of durations, in seconds.
+
+    Recording a value takes a binary search and a few increments, without allocations.
+    """
+
+    __slots__ = ("bounds", "count", "counts", "max", "min", "sum")
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        # upper bounds, the last bucket (values greater than every bound) is implicit
+        self.bounds: tuple[float, ...] = tuple(bounds)
+        self.counts: list[int] = [0] * (len(self.bounds) + 1)
+        self.count: int = 0
+        self.sum: float = 0
+        self.min: float = float("inf")
+        self.max: float = 0
+
+    def record(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent: float) -> float:
+        """Return the upper bound of the bucket of the given percentile (0-100)."""
+        if not self.count:
+            return 0
+
+        rank = percent / 100 * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank and count:
+                bound = self.bounds[index] if index < len(self.bounds) else self.max
+                return min(bound, self.max)
+
+        return self.max  # pragma: no cover
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__}: count={self.count} p50={self.percentile(50)} p99={self.percentile(99)}>"
+
+
+class InMemoryMetrics(AbstractMetrics):
+    """Keep the metrics in memory, values are looked up by name and tags.
+
+    Timings are recorded in histograms with the given bucket ``bounds``.
+    """
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.bounds: tuple[float, ...] = tuple(bounds)
+        self.counters: dict[_Key, float] = {}
+        self.gauges: dict[_Key, float] = {}
+        self.timings: dict[_Key, Histogram] = {}
+
+    @staticmethod
+    def _key(name: str, tags: Tags | None) -> _Key:
+        return (name, tuple(sorted(tags.items())) if tags else ())
+
+    def increment(self, name: str, value: float = 1, *, tags: Tags | None = None) -> None:
+        key = self._key(name, tags)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name: str, value: float, *, tags: Tags | None = None) -> None:
+        self.gauges[self._key(name, tags)] = value
+
+    def timing(self, name: str, seconds: float, *, tags: Tags | None = None) -> None:
+        key = self._key(name, tags)
+        histogram = self.timings.get(key)
+        if histogram is None:
+            histogram = self.timings[key] = Histogram(self.bounds)
+        histogram.record(seconds)
+
+    def counter_value(self, name: str, tags: Tags | None = None) -> float:
+        return self.counters.get(self._key(name, tags), 0)
+
+    def gauge_value(self, name: str, tags: Tags | None = None) -> float | None:
+        return self.gauges.get(self._key(name, tags))
+
+    def timing_histogram(self, name: str, tags: Tags | None = None) -> Histogram | None:
+        return self.timings.get(self._key(name, tags))
+
+    def clear(self) -> None:
+        self.counters.clear()
+        self.gauges.clear()
+        self.timings.clear()
+
+
+# coarser buckets for prometheus, every bucket is a time series
+PROMETHEUS_BUCKETS: tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class PrometheusMetrics(InMemoryMetrics):
+    """Keep the metrics in memory and render them in the Prometheus text format.
+
+    Serving :meth:`render` (on a ``/metrics`` endpoint, for instance) is up to the application.
+    """
+
+    def __init__(self, namespace: str = "loafer", bounds: Sequence[float] = PROMETHEUS_BUCKETS) -> None:
+        super().__init__(bounds)
+        self.namespace: str = namespace
+
+    def _name(self, name: str) -> str:
+        name = name.replace(".", "_").replace("-", "_")
+        return f"{self.namespace}_{name}" if self.namespace else name
+
+    @staticmethod
+    def _labels(labels: tuple[tuple[str, str], ...], **extra: str) -> str:
+        labels = (*labels, *extra.items())
+        if not labels:
+            return ""
+        escaped = ((key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for key, value in labels)
+        return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+    def render(self) -> str:
+        lines: list[str] = []
+        declared: set[str] = set()
+
+        def declare(name: str, kind: str) -> None:
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(self.counters.items()):
+            metric = f"{self._name(name)}_total"
+            declare(metric, "counter")
+            lines.append(f"{metric}{self._labels(labels)} {value}")
+
+        for (name, labels), value in sorted(self.gauges.items()):
+            metric = self._name(name)
+            declare(metric, "gauge")
+            lines.append(f"{metric}{self._labels(labels)} {value}")
+
+        for (name, labels), histogram in sorted(self.timings.items(), key=lambda item: item[0]):
+            metric = f"{self._name(name)}_seconds"
+            declare(metric, "histogram")
+            cumulative = 0
+            for bound, count in zip(histogram.bounds, histogram.counts, strict=False):
+                cumulative += count
+                lines.append(f"{metric}_bucket{self._labels(labels, le=f'{bound:g}')} {cumulative}")
+            lines.append(f"{metric}_bucket{self._labels(labels, le='+Inf')} {histogram.count}")
+            lines.append(f"{metric}_count{self._labels(labels)} {histogram.count}")
+            lines.append(f"{metric}_sum{self._labels(labels)} {histogram.sum}")
+
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+class StatsDMetrics(AbstractMetrics):
+    """Send the metrics to a StatsD server, over UDP, with DogStatsD style tags.
+
+    Every metric is sent right away, in a single datagram; errors are logged and ignored.
+    The address is resolved once, when connecting the socket; if that fails, connecting is
+    tried again at most every ``reconnect_interval`` seconds.
+    """
+
+    reconnect_interval: float = 30.0
+
+    def __init__(self, host: str = "localhost", port: int = 8125, *, prefix: str = "loafer") -> None:
+        self.address: tuple[str, int] = (host, port)
+        self.prefix: str = f"{prefix}." if prefix else ""
+        self._socket: socket.socket | None = None
+        self._next_connect: float = 0.0
+        self._connect()
+
+    def format(self, name: str, value: float, kind: str, tags: Tags | None = None) -> str:
+        line = f"{self.prefix}{name}:{value:g}|{kind}"
+        if tags:
+            line += "|#" + ",".join(f"{key}:{value}" for key, value in tags.items())
+        return line
+
+    def _connect(self) -> None:
+        # resolving a host name blocks (the event loop), it must not happen for every metric
+        self._next_connect = time.monotonic() + self.reconnect_interval
+        try:
+            family, kind, proto, _, address = socket.getaddrinfo(*self.address, type=socket.SOCK_DGRAM)[0]
+            sock = socket.socket(family, kind, proto)
+        except OSError as exc:
+            logger.warning("error connecting to statsd, address=%r: %r", self.address, exc)
+            return
+
+        try:
+            sock.setblocking(False)
+            sock.connect(address)
+        except OSError as exc:
+            sock.close()
+            logger.warning("error connecting to statsd, address=%r: %r", self.address, exc)
+            return
+
+        self._socket = sock
+
+    def _send(self, line: str) -> None:
+        if self._socket is None:
+            if time.monotonic() < self._next_connect:
+                return
+            self._connect()
+            if self._socket is None:
+                return
+
+        try:
+            self._socket.send(line.encode())
+        except OSError as exc:
+            logger.debug("error sending metric to statsd, line=%r: %r", line, exc)
+
+    def increment(self, name: str, value: float = 1, *, tags: Tags | None = None) -> None:
+        self._send(self.format(name, value, "c", tags))
+
+    def gauge(self, name: str, value: float, *, tags: Tags | None = None) -> None:
+        self._send(self.format(name, value, "g", tags))
+
+    def timing(self, name: str, seconds: float, *, tags: Tags | None = None) -> None:
+        self._send(self.format(name, seconds * 1000, "ms", tags))
+
+    def close(self) -> None:
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+        self._next_connect = 0.0
+
+
+DEFAULT_METRICS: AbstractMetrics = NullMetrics()
+
+
+def get_default_metrics() -> AbstractMetrics:
+    return DEFAULT_METRICS
+
+
+def set_default_metrics(metrics: AbstractMetrics | None) -> None:
+    """Set the metrics sink used by loafer, ``None`` disables metrics."""
+    global DEFAULT_METRICS  # noqa: PLW0603
+    DEFAULT_METRICS = metrics if metrics is not None else NullMetrics()
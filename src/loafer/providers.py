@@ -10,6 +10,9 @@ class AbstractProvider(abc.ABC):
         """Return a sequence of messages to be processed.
 
         If no messages are available, this coroutine should return an empty list.
+
+        Providers may accept an optional ``max_messages`` keyword argument. In that case,
+        the dispatcher passes how many messages it is able to take at the moment.
         """
 
     @abc.abstractmethod
@@ -23,9 +26,34 @@ class AbstractProvider(abc.ABC):
     async def message_not_processed(self, message: Message) -> None:
         """Perform actions when a message was not processed."""
 
+    async def release_message(self, message: Message) -> None:
+        """Give back a message that was received but will not be processed.
+
+        Called when loafer is draining, the message should be delivered again as soon
+        as possible (to this or another consumer).
+        """
+
+    async def warmup(self) -> None:
+        """Prepare the provider before messages are fetched.
+
+        Called once, when loafer starts. Resources (like queue URLs and connections) can be
+        resolved here, errors stop loafer before any message is fetched.
+        """
+
+    def message_id(self, message: Message) -> str | None:  # noqa: ARG002
+        """Return an identifier of the message, used in logs."""
+        return None
+
     def stop(self) -> None:
         """Stop the provider.
 
         If needed, the provider should perform clean-up actions.
         This method is called whenever we need to shutdown the provider.
         """
+
+    async def close(self) -> None:
+        """Release the provider resources.
+
+        This coroutine is awaited once, after :meth:`stop`, when loafer is shutting down.
+        Pending work (like buffered acknowledgements) should be completed here.
+        """
@@ -0,0 +1,66 @@
+import abc
+import random
+
+
+class RetryPolicy(abc.ABC):
+    """How long a message that was not processed waits before being delivered again."""
+
+    @abc.abstractmethod
+    def delay(self, attempt: int) -> float:
+        """Return the delay, in seconds, after the ``attempt``-th delivery (starting at 1) failed."""
+
+
+class ImmediateRetry(RetryPolicy):
+    def delay(self, attempt: int) -> float:  # noqa: ARG002
+        return 0
+
+
+class FixedRetry(RetryPolicy):
+    def __init__(self, delay: float) -> None:
+        if delay < 0:
+            msg = f"delay must be a positive number: {delay!r}"
+            raise ValueError(msg)
+
+        self._delay: float = delay
+
+    def delay(self, attempt: int) -> float:  # noqa: ARG002
+        return self._delay
+
+
+class ExponentialRetry(RetryPolicy):
+    """Multiply the delay by ``multiplier`` on every attempt, up to ``max_delay``.
+
+    With ``jitter``, a random delay between half and the whole of it is returned,
+    so messages that failed together are not retried together.
+    """
+
+    def __init__(
+        self,
+        base_delay: float = 1,
+        *,
+        multiplier: float = 2,
+        max_delay: float = 900,
+        jitter: bool = True,
+    ) -> None:
+        if base_delay < 0 or max_delay < 0:
+            msg = f"delays must be positive numbers: base_delay={base_delay!r}, max_delay={max_delay!r}"
+            raise ValueError(msg)
+
+        if multiplier < 1:
+            msg = f"multiplier must be at least 1: {multiplier!r}"
+            raise ValueError(msg)
+
+        self.base_delay: float = base_delay
+        self.multiplier: float = multiplier
+        self.max_delay: float = max_delay
+        self.jitter: bool = jitter
+
+    def delay(self, attempt: int) -> float:
+        try:
+            delay = min(self.base_delay * self.multiplier ** (max(attempt, 1) - 1), self.max_delay)
+        except OverflowError:
+            delay = self.max_delay
+
+        if self.jitter:
+            delay = random.uniform(delay / 2, delay)  # noqa: S311
+        return delay
@@ -1,9 +1,18 @@
 import logging
-from typing import Any
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import TYPE_CHECKING, Any, NotRequired, TypedDict
 
 from ._compat import ensure_coroutinefunction
-from .message_translators import AbstractMessageTranslator
+from .batching import Batcher
+from .deduplication import DeduplicationStore
+from .exceptions import DeleteMessage
+from .executors import ExecutorOption, RouteProcessPoolExecutor, create_executor
+from .logs import get_message_logger
+from .message_translators import AbstractMessageTranslator, LazyTranslatedMessage
+from .metrics import Tags, get_default_metrics
 from .providers import AbstractProvider
+from .tracing import LatencyHistograms, current_trace
 from .types import (
     AsyncErrorHandler,
     AsyncHandlerFunc,
@@ -12,12 +21,44 @@ from .types import (
     Handler,
     HandlerFunc,
     Message,
+    MessageFilter,
+    MessageKey,
     TranslatedMessage,
 )
 
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
 logger: logging.Logger = logging.getLogger(__name__)
 
 
+def _translate(translator: AbstractMessageTranslator | None, message: Any) -> TranslatedMessage:
+    if translator is None:
+        return {"content": message, "metadata": {}}
+
+    # the metadata returned by the translator is used as is, not copied
+    translated = translator.translate(message)
+    return {"content": translated["content"], "metadata": translated.get("metadata", {})}
+
+
+class RouteOptions(TypedDict):
+    max_concurrency: NotRequired[int | None]
+    weight: NotRequired[int]
+    pollers: NotRequired[int]
+    max_pollers: NotRequired[int | None]
+    executor: NotRequired[ExecutorOption | None]
+    max_threads: NotRequired[int | None]
+    batch_size: NotRequired[int | None]
+    batch_max_wait: NotRequired[float]
+    message_filter: NotRequired[MessageFilter | None]
+    translate_threshold: NotRequired[int | None]
+    translate_executor: NotRequired[ExecutorOption | None]
+    slow_message_threshold: NotRequired[float | None]
+    deduplication: NotRequired[DeduplicationStore | None]
+    deduplication_key: NotRequired[MessageKey | None]
+    lazy_translation: NotRequired[bool]
+
+
 class Route:
     def __init__(
         self,
@@ -26,8 +67,25 @@ class Route:
         name: str = "default",
         message_translator: AbstractMessageTranslator | None = None,
         error_handler: ErrorHandler | None = None,
+        *,
+        max_concurrency: int | None = None,
+        weight: int = 1,
+        pollers: int = 1,
+        max_pollers: int | None = None,
+        executor: ExecutorOption | None = None,
+        max_threads: int | None = None,
+        batch_size: int | None = None,
+        batch_max_wait: float = 1.0,
+        message_filter: MessageFilter | None = None,
+        translate_threshold: int | None = None,
+        translate_executor: ExecutorOption | None = None,
+        slow_message_threshold: float | None = None,
+        deduplication: DeduplicationStore | None = None,
+        deduplication_key: MessageKey | None = None,
+        lazy_translation: bool = False,
     ):
         self.name = name
+        self._labels: Tags = {"route": name}
 
         if not isinstance(provider, AbstractProvider):
             msg = f"invalid provider instance: {provider!r}"
@@ -45,56 +103,323 @@ class Route:
             msg = f"error_handler must be a callable object: {error_handler!r}"
             raise TypeError(msg)
 
+        # sync handlers (and error handlers) run in this executor, only the route-created ones are shut down
+        self._executor: Executor | None = create_executor(
+            executor, max_threads=max_threads, name=name, tags=self._labels
+        )
+        self._owns_executor: bool = not isinstance(executor, Executor) and self._executor is not None
+
         if error_handler:
-            self._error_handler: AsyncErrorHandler | None = ensure_coroutinefunction(error_handler)
+            self._error_handler: AsyncErrorHandler | None = ensure_coroutinefunction(error_handler, self._executor)
         else:
             self._error_handler = None
 
         self.handler: AsyncHandlerFunc
         self._handler_instance: Handler | None
         if callable(handler):
-            self.handler = ensure_coroutinefunction(handler)
+            self.handler = ensure_coroutinefunction(handler, self._executor)
             self._handler_instance = None
         elif isinstance(handler, Handler):
-            self.handler = ensure_coroutinefunction(handler.handle)
+            self.handler = ensure_coroutinefunction(handler.handle, self._executor)
             self._handler_instance = handler
         else:
             msg = f"handler must be a callable object or implement `handle` method: {handler!r}"
             raise TypeError(msg)
 
+        if max_concurrency is not None and max_concurrency < 1:
+            msg = f"max_concurrency must be a positive integer: {max_concurrency!r}"
+            raise ValueError(msg)
+
+        # maximum number of messages of this route processed at the same time (None means no route limit)
+        self.max_concurrency: int | None = max_concurrency
+
+        if weight < 1:
+            msg = f"weight must be a positive integer: {weight!r}"
+            raise ValueError(msg)
+
+        # how many messages of this route are scheduled in a row, on each scheduling round
+        self.weight: int = weight
+
+        if pollers < 1:
+            msg = f"pollers must be a positive integer: {pollers!r}"
+            raise ValueError(msg)
+
+        if max_pollers is not None and max_pollers < pollers:
+            msg = f"max_pollers must be greater than or equal to pollers: {max_pollers!r}"
+            raise ValueError(msg)
+
+        # concurrent fetch loops: `pollers` always run, up to `max_pollers` while the provider has a backlog
+        self.pollers: int = pollers
+        self.max_pollers: int = max_pollers if max_pollers is not None else pollers
+
+        if message_filter is not None and not callable(message_filter):
+            msg = f"message_filter must be a callable object: {message_filter!r}"
+            raise TypeError(msg)
+
+        # messages rejected by the filter (called with the received message, before translation)
+        # are acknowledged without being delivered to the handler
+        self.message_filter: MessageFilter | None = message_filter
+        self.filtered_messages: int = 0
+
+        if translate_threshold is not None and translate_threshold < 0:
+            msg = f"translate_threshold must not be negative: {translate_threshold!r}"
+            raise ValueError(msg)
+
+        # messages with payloads of `translate_threshold` bytes (or more) are translated
+        # in `translate_executor`, to keep large payloads from blocking the event loop
+        self.translate_threshold: int | None = translate_threshold
+        self._translate_executor: Executor | None = create_executor(translate_executor, name=name)
+        self._owns_translate_executor: bool = (
+            not isinstance(translate_executor, Executor) and self._translate_executor is not None
+        )
+
+        if lazy_translation and translate_threshold is not None:
+            msg = f"translate_threshold does not apply to lazy translation: {translate_threshold!r}"
+            raise ValueError(msg)
+
+        # handlers are called with a LazyTranslatedMessage (translated on first access) and the
+        # received message, instead of the translated content and metadata
+        self.lazy_translation: bool = lazy_translation
+
+        if slow_message_threshold is not None and slow_message_threshold < 0:
+            msg = f"slow_message_threshold must not be negative: {slow_message_threshold!r}"
+            raise ValueError(msg)
+
+        # processing times of the messages of this route, messages processed in `slow_message_threshold`
+        # seconds (or more) are logged with the duration of each phase
+        self.latency: LatencyHistograms = LatencyHistograms()
+        self.slow_message_threshold: float | None = slow_message_threshold
+
+        if deduplication is not None and not isinstance(deduplication, DeduplicationStore):
+            msg = f"invalid deduplication store instance: {deduplication!r}"
+            raise TypeError(msg)
+
+        if deduplication_key is not None and not callable(deduplication_key):
+            msg = f"deduplication_key must be a callable object: {deduplication_key!r}"
+            raise TypeError(msg)
+
+        # messages already processed (by their `deduplication_key`, the provider message id by default)
+        # are acknowledged without being delivered to the handler
+        self.deduplication: DeduplicationStore | None = deduplication
+        self._deduplication_key: MessageKey = deduplication_key or self.provider.message_id
+        self._processing_keys: set[str] = set()
+        self.duplicate_messages: int = 0
+        self.unique_messages: int = 0
+
+        if batch_size is not None and batch_size < 1:
+            msg = f"batch_size must be a positive integer: {batch_size!r}"
+            raise ValueError(msg)
+
+        if batch_max_wait < 0:
+            msg = f"batch_max_wait must not be negative: {batch_max_wait!r}"
+            raise ValueError(msg)
+
+        # a batch only gathers messages being processed at the same time
+        if batch_size is not None and max_concurrency is not None and batch_size > max_concurrency:
+            msg = f"batch_size must not be greater than max_concurrency: {batch_size!r} > {max_concurrency!r}"
+            raise ValueError(msg)
+
+        # batch routes call the handler with lists of messages, gathered across receives
+        self.batch_size: int | None = batch_size
+        self.batch_max_wait: float = batch_max_wait
+        self._batcher: Batcher[TranslatedMessage | LazyTranslatedMessage, bool] | None = None
+        if batch_size is not None:
+            self._batcher = Batcher(
+                self._deliver_batch,
+                max_size=batch_size,
+                max_delay=batch_max_wait,
+                max_attempts=1,
+                drop_cancelled=True,
+            )
+
+    @property
+    def executor(self) -> Executor | None:
+        """The executor of sync handlers, ``None`` means the event loop default executor."""
+        return self._executor
+
+    @property
+    def labels(self) -> Tags:
+        """Tags of the metrics reported for this route."""
+        return self._labels
+
     def __str__(self) -> str:
         return f"<{type(self).__name__}(name={self.name} provider={self.provider!r} handler={self.handler!r})>"
 
     def apply_message_translator(self, message: Any) -> TranslatedMessage:
-        processed_message: TranslatedMessage = {"content": message, "metadata": {}}
-        if not self.message_translator:
-            return processed_message
-
-        translated = self.message_translator.translate(processed_message["content"])
-        processed_message["metadata"].update(translated.get("metadata", {}))
-        processed_message["content"] = translated["content"]
-        if not processed_message["content"]:
+        return self._check_translation(_translate(self.message_translator, message), message)
+
+    async def apply_message_translator_in_executor(self, message: Any) -> TranslatedMessage:
+        # a module function, only the translator and message are sent to process pools
+        translate = ensure_coroutinefunction(_translate, self._translate_executor)
+        return self._check_translation(await translate(self.message_translator, message), message)
+
+    def _check_translation(self, translated: TranslatedMessage, message: Any) -> TranslatedMessage:
+        if self.message_translator and not translated["content"]:
             msg = f"{self.message_translator} failed to translate message={message}"
             raise ValueError(msg)
 
-        return processed_message
+        return translated
+
+    def _offload_translation(self, message: Any) -> bool:
+        if self.translate_threshold is None or self.message_translator is None:
+            return False
+
+        size = self.message_translator.message_size(message)
+        return size is not None and size >= self.translate_threshold
 
     async def deliver(self, raw_message: Message) -> bool:
-        message: TranslatedMessage = self.apply_message_translator(raw_message)
-        logger.info("delivering message route=%s, message=%r", self, message)
+        metrics = get_default_metrics()
+        if self.message_filter is not None and not self.message_filter(raw_message):
+            self.filtered_messages += 1
+            if metrics.enabled:
+                metrics.increment("messages.filtered", tags=self._labels)
+            get_message_logger().log(logger, logging.DEBUG, "message filtered out", self.name, raw_message)
+            return True
+
+        if self.deduplication is not None:
+            key = self._deduplication_key(raw_message)
+            if key is not None:
+                return await self._deliver_once(raw_message, key, self.deduplication)
+
+        return await self._deliver(raw_message)
+
+    async def _deliver_once(self, raw_message: Message, key: str, store: DeduplicationStore) -> bool:
+        if key in self._processing_keys:
+            # the same message is being processed, this one is retried in case that one fails
+            get_message_logger().log(logger, logging.DEBUG, "duplicate message being processed", self.name, key)
+            return False
+
+        # from now on (stores may suspend), duplicates of this message wait for its result
+        self._processing_keys.add(key)
+        try:
+            metrics = get_default_metrics()
+            if await store.contains(key):
+                self.duplicate_messages += 1
+                if metrics.enabled:
+                    metrics.increment("deduplication.hits", tags=self._labels)
+                get_message_logger().log(logger, logging.DEBUG, "duplicate message ignored", self.name, key)
+                return True
+
+            self.unique_messages += 1
+            if metrics.enabled:
+                metrics.increment("deduplication.misses", tags=self._labels)
+
+            try:
+                confirmed = await self._deliver(raw_message)
+            except DeleteMessage:
+                await store.add(key)
+                raise
+
+            if confirmed:
+                await store.add(key)
+            return confirmed
+        finally:
+            self._processing_keys.discard(key)
+
+    async def _deliver(self, raw_message: Message) -> bool:
+        metrics = get_default_metrics()
+        trace = current_trace.get()
+        timed = trace is not None or metrics.enabled
+        started_at = time.perf_counter() if timed else 0
+
+        message: TranslatedMessage | LazyTranslatedMessage
+        if self.lazy_translation:
+            message = LazyTranslatedMessage(raw_message, self.message_translator)
+        elif self._offload_translation(raw_message):
+            message = await self.apply_message_translator_in_executor(raw_message)
+        else:
+            message = self.apply_message_translator(raw_message)
+        get_message_logger().log(logger, logging.INFO, "delivering message", self.name, message)
+
+        if not timed:
+            return await self._handle(message)
+
+        translated_at = time.perf_counter()
+        try:
+            return await self._handle(message)
+        finally:
+            handled_at = time.perf_counter()
+            if trace is not None:
+                trace.translate = translated_at - started_at
+                trace.handle = handled_at - translated_at
+            if metrics.enabled:
+                metrics.timing("translate.duration", translated_at - started_at, tags=self._labels)
+                metrics.timing("handler.duration", handled_at - translated_at, tags=self._labels)
+
+    async def _handle(self, message: TranslatedMessage | LazyTranslatedMessage) -> bool:
+        if self._batcher is not None:
+            return await self._batcher.submit(message)
+        if isinstance(message, LazyTranslatedMessage):
+            return await self.handler(message, message.raw)
         return await self.handler(message["content"], message["metadata"])
 
+    async def _deliver_batch(self, messages: list[TranslatedMessage | LazyTranslatedMessage]) -> list[bool]:
+        contents: list[Any] = []
+        metadata: list[Any] = []
+        for message in messages:
+            if isinstance(message, LazyTranslatedMessage):
+                contents.append(message)
+                metadata.append(message.raw)
+            else:
+                contents.append(message["content"])
+                metadata.append(message["metadata"])
+        logger.info("delivering batch route=%s, size=%d", self.name, len(messages))
+        metrics = get_default_metrics()
+        started_at = time.perf_counter()
+        try:
+            result: bool | Sequence[bool] = await self.handler(contents, metadata)
+        except DeleteMessage:
+            return [True] * len(messages)
+        finally:
+            if metrics.enabled:
+                metrics.timing("handler.batch_duration", time.perf_counter() - started_at, tags=self._labels)
+
+        # a single value applies to the whole batch
+        if isinstance(result, bool):
+            return [result] * len(messages)
+
+        results = [bool(value) for value in result]
+        if len(results) != len(messages):
+            msg = f"batch handler returned {len(results)} results for {len(messages)} messages"
+            raise ValueError(msg)
+
+        return results
+
     async def error_handler(self, exc_info: ExcInfo, message: Message) -> bool:
-        logger.info("error handler process originated by message=%s", message)
+        get_message_logger().log(logger, logging.INFO, "error handler process originated", self.name, message)
 
         if self._error_handler is not None:
+            if isinstance(self._executor, ProcessPoolExecutor | RouteProcessPoolExecutor):
+                # tracebacks can't be pickled
+                exc_info = (exc_info[0], exc_info[1], None)  # type: ignore[assignment]
             return await self._error_handler(exc_info, message)
 
         return False
 
+    async def warmup(self) -> None:
+        """Prepare the provider (and class-based handler) before messages are fetched."""
+        await self.provider.warmup()
+        # only for class-based handlers
+        if self._handler_instance and hasattr(self._handler_instance, "warmup"):
+            await self._handler_instance.warmup()
+
     def stop(self) -> None:
         logger.info("stopping route %s", self)
         self.provider.stop()
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._owns_translate_executor and self._translate_executor is not None:
+            self._translate_executor.shutdown(wait=False, cancel_futures=True)
         # only for class-based handlers
         if self._handler_instance and hasattr(self._handler_instance, "stop"):
             self._handler_instance.stop()
+
+    async def close(self) -> None:
+        if self._batcher is not None:
+            await self._batcher.flush()
+        await self.provider.close()
+        if self.deduplication is not None:
+            await self.deduplication.close()
+        # only for class-based handlers
+        if self._handler_instance and hasattr(self._handler_instance, "close"):
+            await self._handler_instance.close()
@@ -1,42 +1,102 @@
 import asyncio
 import logging
+import multiprocessing
+import multiprocessing.connection
+import os
 import signal
-from collections.abc import Callable
+import sys
+import threading
+import time
+from collections.abc import Awaitable, Callable
 from concurrent.futures import CancelledError
 from contextlib import suppress
+from types import FrameType
 from typing import Any
 
+from ._compat import LoopFactory, eager_task_factory, new_event_loop
+
 logger = logging.getLogger(__name__)
 
 
 class LoaferRunner:
-    def __init__(self, on_stop_callback: Callable[[], Any] | None = None) -> None:
+    """Run the event loop until ``SIGINT``/``SIGTERM``.
+
+    With ``on_drain_callback``, the first signal awaits it before stopping the loop
+    (a second signal stops it right away).
+
+    The loop is created by ``loop_factory`` (uvloop, when installed, by default) on first
+    use and managed by an :class:`asyncio.Runner`. With ``eager_tasks`` (Python 3.12+),
+    tasks start running as soon as they are created, instead of on the next loop iteration.
+    """
+
+    def __init__(
+        self,
+        on_stop_callback: Callable[[], Any] | None = None,
+        on_drain_callback: Callable[[], Awaitable[Any]] | None = None,
+        *,
+        loop_factory: LoopFactory | None = None,
+        eager_tasks: bool = False,
+    ) -> None:
         self._on_stop_callback: Callable[[], Any] | None = on_stop_callback
+        self._on_drain_callback: Callable[[], Awaitable[Any]] | None = on_drain_callback
+        self._drain_task: asyncio.Future[Any] | None = None
+        self._stopping: bool = False
+
+        self.loop_factory: LoopFactory = loop_factory or new_event_loop
+        if eager_tasks and eager_task_factory is None:
+            logger.warning("eager tasks require Python 3.12 or later, option ignored")
+        self.eager_tasks: bool = eager_tasks and eager_task_factory is not None
+        self._runner: asyncio.Runner | None = None
+
+    def _new_loop(self) -> asyncio.AbstractEventLoop:
+        loop = self.loop_factory()
+        if self.eager_tasks:
+            loop.set_task_factory(eager_task_factory)
+        return loop
 
     @property
     def loop(self) -> asyncio.AbstractEventLoop:
-        return asyncio.get_event_loop()
+        if self._runner is None:
+            self._runner = asyncio.Runner(loop_factory=self._new_loop)
+        return self._runner.get_loop()
 
     def start(self, *, debug: bool = False) -> None:
+        loop = self.loop
         if debug:
-            self.loop.set_debug(enabled=debug)
+            loop.set_debug(enabled=debug)
+        logger.debug("event loop: %r, eager_tasks=%s", loop, self.eager_tasks)
 
-        self.loop.add_signal_handler(signal.SIGINT, self.prepare_stop)
-        self.loop.add_signal_handler(signal.SIGTERM, self.prepare_stop)
+        loop.add_signal_handler(signal.SIGINT, self.prepare_drain)
+        loop.add_signal_handler(signal.SIGTERM, self.prepare_drain)
 
         try:
-            self.loop.run_forever()
+            loop.run_forever()
         finally:
             self.stop()
-            self.loop.close()
-            logger.debug("loop.is_running=%s", self.loop.is_running())
-            logger.debug("loop.is_closed=%s", self.loop.is_closed())
+            self.close()
+
+    def close(self) -> None:
+        """Close the loop, remaining tasks are cancelled and the default executor is shut down."""
+        if self._runner is not None:
+            self._runner.close()
+            self._runner = None
+        self._stopping = False
 
     def prepare_stop(self, *args: Any) -> None:  # noqa: ARG002
-        if self.loop.is_running():
+        # once stopping, the loop runs until the resources are closed (signals included)
+        if self.loop.is_running() and not self._stopping:
             # signals loop.run_forever to exit in the next iteration
             self.loop.stop()
 
+    def prepare_drain(self, *args: Any) -> None:  # noqa: ARG002
+        if self._on_drain_callback is None or self._drain_task is not None:
+            self.prepare_stop()
+            return
+
+        logger.info("draining Loafer, signal again to stop right away ...")
+        self._drain_task = asyncio.ensure_future(self._on_drain_callback(), loop=self.loop)
+        self._drain_task.add_done_callback(self.prepare_stop)
+
     def _cancel_all_tasks(self) -> None:
         to_cancel = asyncio.all_tasks(self.loop)
         if not to_cancel:
@@ -59,9 +119,147 @@ class LoaferRunner:
 
     def stop(self) -> None:
         logger.info("stopping Loafer ...")
+        self._stopping = True
         if callable(self._on_stop_callback):
             self._on_stop_callback()
 
         logger.info("cancel schedulled operations ...")
         with suppress(CancelledError, RuntimeError):
             self._cancel_all_tasks()
+
+
+class LoaferProcessRunner:
+    """Run ``target`` in ``processes`` worker processes and supervise them.
+
+    Workers are forked, so routes and handlers don't need to be picklable. Every
+    worker must create its own event loop. ``SIGINT``/``SIGTERM`` are forwarded to
+    the workers as ``SIGTERM`` and workers still running after ``shutdown_timeout``
+    seconds are killed. Workers run in their own process group, so signals sent to the
+    group of the main process (like ``Ctrl-C`` in a terminal) only reach them once, and
+    they check every ``parent_check_interval`` seconds that the main process is still
+    running: orphaned workers send themselves ``SIGTERM``. A worker that exits with an
+    error is restarted, after an exponential backoff (reset once the worker runs for
+    ``max_restart_backoff``).
+    """
+
+    def __init__(
+        self,
+        processes: int,
+        *,
+        shutdown_timeout: float = 30,
+        restart_backoff: float = 1,
+        max_restart_backoff: float = 30,
+        parent_check_interval: float = 1,
+    ) -> None:
+        if processes < 1:
+            msg = f"processes must be a positive integer: {processes!r}"
+            raise ValueError(msg)
+
+        self.processes: int = processes
+        self.shutdown_timeout: float = shutdown_timeout
+        self.restart_backoff: float = restart_backoff
+        self.max_restart_backoff: float = max_restart_backoff
+        self.parent_check_interval: float = parent_check_interval
+
+        self._context = multiprocessing.get_context("fork")
+        self._workers: dict[int, multiprocessing.process.BaseProcess] = {}
+        self._stop_deadline: float | None = None
+
+    def start(self, target: Callable[[], Any]) -> int:
+        """Start the workers and wait for all of them to finish, returning the aggregated exit code."""
+        previous_handlers = {sig: signal.signal(sig, self.prepare_stop) for sig in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            return self._supervise(target)
+        finally:
+            for sig, handler in previous_handlers.items():
+                signal.signal(sig, handler)
+
+    def prepare_stop(self, signum: int = signal.SIGTERM, frame: FrameType | None = None) -> None:  # noqa: ARG002
+        logger.info("stopping %d worker(s), signal=%s", len(self._workers), signum)
+        if self._stop_deadline is None:
+            self._stop_deadline = time.monotonic() + self.shutdown_timeout
+
+        for process in self._workers.values():
+            if process.pid is not None and process.exitcode is None:
+                with suppress(ProcessLookupError):
+                    os.kill(process.pid, signal.SIGTERM)
+
+    def _spawn(self, target: Callable[[], Any], slot: int) -> float:
+        process = self._context.Process(
+            target=_run_worker,
+            args=(target, os.getpid(), self.parent_check_interval),
+            name=f"loafer-worker-{slot}",
+        )
+        process.start()
+        logger.info("worker started, slot=%d, pid=%s", slot, process.pid)
+        self._workers[slot] = process
+        return time.monotonic()
+
+    def _supervise(self, target: Callable[[], Any]) -> int:
+        self._stop_deadline = None
+        started_at = {slot: self._spawn(target, slot) for slot in range(self.processes)}
+        failures = dict.fromkeys(started_at, 0)
+        restart_at: dict[int, float] = {}
+        exit_codes: dict[int, int] = {}
+
+        while self._workers or (restart_at and self._stop_deadline is None):
+            multiprocessing.connection.wait([process.sentinel for process in self._workers.values()], timeout=0.5)
+
+            for slot, process in list(self._workers.items()):
+                if process.exitcode is None:
+                    continue
+
+                del self._workers[slot]
+                exit_codes[slot] = process.exitcode
+                if not process.exitcode or self._stop_deadline is not None:
+                    logger.info("worker finished, slot=%d, exitcode=%s", slot, process.exitcode)
+                    continue
+
+                if time.monotonic() - started_at[slot] >= self.max_restart_backoff:
+                    failures[slot] = 0
+                delay = min(self.restart_backoff * 2 ** failures[slot], self.max_restart_backoff)
+                failures[slot] += 1
+                logger.error("worker crashed, slot=%d, exitcode=%s, restarting in %.1fs", slot, process.exitcode, delay)
+                restart_at[slot] = time.monotonic() + delay
+
+            now = time.monotonic()
+            if self._stop_deadline is not None:
+                restart_at.clear()
+                if now >= self._stop_deadline:
+                    for process in self._workers.values():
+                        logger.warning("worker did not stop in time, killing pid=%s", process.pid)
+                        process.kill()
+
+            for slot, when in list(restart_at.items()):
+                if when <= now:
+                    del restart_at[slot]
+                    started_at[slot] = self._spawn(target, slot)
+
+        # the first failure wins, processes killed by a signal follow the shell convention (128 + signal)
+        for code in exit_codes.values():
+            if code:
+                return code if code > 0 else 128 - code
+        return 0
+
+
+def _watch_parent(parent_pid: int, interval: float) -> None:
+    while os.getppid() == parent_pid:
+        time.sleep(interval)
+
+    # the supervisor was killed: the worker stops as if the supervisor forwarded a stop signal
+    logger.warning("supervisor is gone, stopping worker, pid=%s, parent_pid=%s", os.getpid(), parent_pid)
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+def _run_worker(target: Callable[[], Any], parent_pid: int, parent_check_interval: float) -> None:
+    # a terminal signal would reach the worker twice (directly and forwarded): a second stop
+    # signal stops the worker right away, without draining
+    os.setpgid(0, 0)
+    # the parent handlers must not be used by the worker, the event loop is created by its runner
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # out of the supervisor process group, orphaned workers would keep consuming messages
+    threading.Thread(
+        target=_watch_parent, args=(parent_pid, parent_check_interval), name="loafer-parent-watch", daemon=True
+    ).start()
+    sys.exit(target())
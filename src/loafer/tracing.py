@@ -0,0 +1,53 @@
+import time
+from contextvars import ContextVar
+
+from .metrics import Histogram
+
+# phases of the processing of a message, in order
+PHASES: tuple[str, ...] = ("wait", "translate", "handle", "ack", "total")
+
+
+class MessageTrace:
+    """Durations, in seconds, of the processing phases of a message.
+
+    ``wait`` is the time spent in the dispatcher queue, ``translate`` and ``handle``
+    are measured by the route, ``ack`` is the confirmation (or rejection) on the provider.
+    """
+
+    __slots__ = ("ack", "handle", "started_at", "total", "translate", "wait")
+
+    def __init__(self, wait: float = 0) -> None:
+        self.started_at: float = time.perf_counter()
+        self.wait: float = wait
+        self.translate: float = 0
+        self.handle: float = 0
+        self.ack: float = 0
+        self.total: float = 0
+
+    def __repr__(self) -> str:
+        phases = " ".join(f"{phase}={getattr(self, phase):.3f}s" for phase in PHASES)
+        return f"<{type(self).__name__}: {phases}>"
+
+
+# the trace of the message being processed by the current task
+current_trace: ContextVar[MessageTrace | None] = ContextVar("loafer_message_trace", default=None)
+
+
+class LatencyHistograms:
+    """Histograms of the processing phases of the messages of a route."""
+
+    __slots__ = PHASES
+
+    def __init__(self) -> None:
+        for phase in PHASES:
+            setattr(self, phase, Histogram())
+
+    def record(self, trace: MessageTrace) -> None:
+        for phase in PHASES:
+            getattr(self, phase).record(getattr(trace, phase))
+
+    def __getitem__(self, phase: str) -> Histogram:
+        if phase not in PHASES:
+            raise KeyError(phase)
+        histogram: Histogram = getattr(self, phase)
+        return histogram
@@ -15,6 +15,9 @@ SyncHandlerFunc: TypeAlias = Callable[[Message, Metadata], bool]
 AsyncHandlerFunc: TypeAlias = Callable[[Message, Metadata], Awaitable[bool]]
 HandlerFunc: TypeAlias = SyncHandlerFunc | AsyncHandlerFunc
 
+MessageFilter: TypeAlias = Callable[[Message], bool]
+MessageKey: TypeAlias = Callable[[Message], str | None]
+
 
 @runtime_checkable
 class SyncHandler(Protocol):
@@ -1,8 +1,17 @@
 import pytest
 
+from loafer import metrics as loafer_metrics
 from loafer.providers import AbstractProvider
 
 
+@pytest.fixture
+def metrics():
+    sink = loafer_metrics.InMemoryMetrics()
+    loafer_metrics.set_default_metrics(sink)
+    yield sink
+    loafer_metrics.set_default_metrics(None)
+
+
 @pytest.fixture
 def dummy_handler():
     def handler(message, *args):  # noqa: ARG001
@@ -1,6 +1,10 @@
 from unittest import mock
 
 import pytest
+import pytest_asyncio
+from botocore.credentials import ReadOnlyCredentials
+
+from loafer.ext.aws import bases
 
 # boto client methods mock
 
@@ -25,9 +29,17 @@ def sqs_send_message():
     }
 
 
+async def sqs_batch_response(*, QueueUrl, Entries):  # noqa: ARG001, N803
+    return {"Successful": [{"Id": entry["Id"]} for entry in Entries], "Failed": []}
+
+
+async def sns_batch_response(*, TopicArn, PublishBatchRequestEntries):  # noqa: ARG001, N803
+    return {"Successful": [{"Id": entry["Id"]} for entry in PublishBatchRequestEntries], "Failed": []}
+
+
 @pytest.fixture
-def sns_list_topics():
-    return {"Topics": [{"TopicArn": "arn:aws:sns:region:id:topic-name"}]}
+def sts_caller_identity():
+    return {"UserId": "user-id", "Account": "123456789012", "Arn": "arn:aws:iam::123456789012:user/loafer"}
 
 
 @pytest.fixture
@@ -38,6 +50,13 @@ def sns_publish():
 # boto client mock
 
 
+@pytest_asyncio.fixture(autouse=True)
+async def close_client_pool():
+    # pooled clients are process-wide, every test leaves the pool empty
+    yield
+    await bases.close_default_client_pool()
+
+
 class ClientContextCreator:
     def __init__(self, client):
         self._client = client
@@ -54,9 +73,12 @@ def boto_client_sqs(queue_url, sqs_message):
     mock_client = mock.Mock()
     mock_client.get_queue_url = mock.AsyncMock(return_value=queue_url)
     mock_client.delete_message = mock.AsyncMock()
+    mock_client.delete_message_batch = mock.AsyncMock(side_effect=sqs_batch_response)
     mock_client.receive_message = mock.AsyncMock(return_value=sqs_message)
     mock_client.send_message = mock.AsyncMock(return_value=sqs_send_message)
+    mock_client.send_message_batch = mock.AsyncMock(side_effect=sqs_batch_response)
     mock_client.change_message_visibility = mock.AsyncMock()
+    mock_client.change_message_visibility_batch = mock.AsyncMock(side_effect=sqs_batch_response)
     mock_client.close = mock.AsyncMock()
     return mock_client
 
@@ -70,9 +92,16 @@ def mock_boto_session_sqs(boto_client_sqs):
 
 
 @pytest.fixture
-def boto_client_sns(sns_publish):
+def boto_client_sns(sns_publish, sts_caller_identity):
     mock_client = mock.Mock()
+    mock_client.meta.region_name = "us-east-1"
+    mock_client._request_signer._credentials.get_frozen_credentials = mock.AsyncMock(  # noqa: SLF001
+        return_value=ReadOnlyCredentials("access-key", "secret-key", "token")
+    )
+    # the same mock is returned for the STS client
+    mock_client.get_caller_identity = mock.AsyncMock(return_value=sts_caller_identity)
     mock_client.publish = mock.AsyncMock(return_value=sns_publish)
+    mock_client.publish_batch = mock.AsyncMock(side_effect=sns_batch_response)
     mock_client.close = mock.AsyncMock()
     return mock_client
 
@@ -1,8 +1,17 @@
+import asyncio
 from unittest import mock
 
+import botocore.exceptions
 import pytest
+from aiobotocore.config import AioConfig
 
-from loafer.ext.aws.bases import BaseSNSClient, BaseSQSClient
+from loafer.ext.aws.bases import (
+    BaseSNSClient,
+    BaseSQSClient,
+    close_default_client_pool,
+    get_default_client_pool,
+    open_default_client_pool,
+)
 
 
 @pytest.fixture
@@ -41,6 +50,15 @@ async def test_get_queue_url_when_queue_name_is_url(mock_boto_session_sqs, boto_
         assert boto_client_sqs.get_queue_url.call_count == 0
 
 
+@pytest.mark.asyncio
+async def test_get_queue_url_concurrent_calls(mock_boto_session_sqs, boto_client_sqs, base_sqs_client):
+    with mock_boto_session_sqs:
+        urls = await asyncio.gather(*(base_sqs_client.get_queue_url("queue-name") for _ in range(5)))
+
+    assert len(set(urls)) == 1
+    assert boto_client_sqs.get_queue_url.call_count == 1
+
+
 @pytest.mark.asyncio
 async def test_sqs_get_client(mock_boto_session_sqs, base_sqs_client, boto_client_sqs):
     with mock_boto_session_sqs as mock_session:
@@ -67,9 +85,102 @@ def base_sns_client():
 
 
 @pytest.mark.asyncio
-async def test_get_topic_arn_using_topic_name(base_sns_client):
-    arn = await base_sns_client.get_topic_arn("topic-name")
-    assert arn == "arn:aws:sns:*:topic-name"
+async def test_get_topic_arn_using_topic_name(mock_boto_session_sns, base_sns_client):
+    with mock_boto_session_sns:
+        arn = await base_sns_client.get_topic_arn("topic-name")
+
+    assert arn == "arn:aws:sns:us-east-1:123456789012:topic-name"
+
+
+@pytest.mark.asyncio
+async def test_cache_get_topic_arn(mock_boto_session_sns, boto_client_sns):
+    # accounts are cached by the (process-wide) pool, options used by no other test
+    open_default_client_pool()
+    clients = [BaseSNSClient(region_name="ap-east-1") for _ in range(3)]
+    with mock_boto_session_sns as mock_session:
+        arns = await asyncio.gather(*(client.get_topic_arn(f"topic-{i}") for i in range(5) for client in clients))
+
+    assert set(arns) == {f"arn:aws:sns:us-east-1:123456789012:topic-{i}" for i in range(5)}
+    boto_client_sns.get_caller_identity.assert_called_once_with()
+    services = [call.args[0] for call in mock_session.return_value.create_client.call_args_list]
+    assert services == ["sns", "sts"]
+
+
+@pytest.mark.asyncio
+async def test_get_topic_arn_partition(mock_boto_session_sns, boto_client_sns):
+    boto_client_sns.meta.region_name = "cn-north-1"
+    boto_client_sns.get_caller_identity.return_value = {
+        "UserId": "user-id",
+        "Account": "123456789012",
+        "Arn": "arn:aws-cn:iam::123456789012:user/loafer",
+    }
+    with mock_boto_session_sns:
+        arn = await BaseSNSClient(region_name="cn-north-1").get_topic_arn("topic-name")
+
+    assert arn == "arn:aws-cn:sns:cn-north-1:123456789012:topic-name"
+
+
+@pytest.mark.asyncio
+async def test_get_topic_arn_custom_client(mock_boto_session_sns, boto_client_sns):
+    boto_client_sns.meta.region_name = "sa-east-1"
+    with mock_boto_session_sns as mock_session:
+        arn = await BaseSNSClient(client=boto_client_sns).get_topic_arn("topic-name")
+
+    assert arn == "arn:aws:sns:sa-east-1:123456789012:topic-name"
+    # the credentials of the custom client, not the default ones
+    mock_session.return_value.create_client.assert_called_once_with(
+        "sts",
+        region_name="sa-east-1",
+        aws_access_key_id="access-key",
+        aws_secret_access_key="secret-key",
+        aws_session_token="token",
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_topic_arn_sts_without_sns_endpoint(mock_boto_session_sns):
+    client = BaseSNSClient(endpoint_url="http://localhost:4566", region_name="eu-west-3", api_version="2010-03-31")
+    with mock_boto_session_sns as mock_session:
+        await client.get_topic_arn("topic-name")
+
+    (sns_call, sts_call) = mock_session.return_value.create_client.call_args_list
+    assert sns_call.args == ("sns",)
+    assert sns_call.kwargs["endpoint_url"] == "http://localhost:4566"
+    assert sts_call.args == ("sts",)
+    assert "endpoint_url" not in sts_call.kwargs
+    assert "api_version" not in sts_call.kwargs
+    assert sts_call.kwargs["region_name"] == "eu-west-3"
+
+
+@pytest.mark.asyncio
+async def test_get_topic_arn_lists_topics_when_account_lookup_fails(mock_boto_session_sns, boto_client_sns):
+    boto_client_sns.get_caller_identity.side_effect = botocore.exceptions.ClientError(
+        {"Error": {"Code": "InvalidClientTokenId", "Message": "invalid"}}, "GetCallerIdentity"
+    )
+    boto_client_sns.list_topics = mock.AsyncMock(
+        side_effect=[
+            {"Topics": [{"TopicArn": "arn:aws:sns:us-east-1:000000000000:first"}], "NextToken": "next"},
+            {"Topics": [{"TopicArn": "arn:aws:sns:us-east-1:000000000000:topic-name"}]},
+        ]
+    )
+    client = BaseSNSClient(region_name="il-central-1")
+    with mock_boto_session_sns:
+        arn = await client.get_topic_arn("topic-name")
+        assert await client.get_topic_arn("first") == "arn:aws:sns:us-east-1:000000000000:first"
+
+    assert arn == "arn:aws:sns:us-east-1:000000000000:topic-name"
+    assert boto_client_sns.list_topics.call_args_list == [mock.call(), mock.call(NextToken="next")]
+
+
+@pytest.mark.asyncio
+async def test_get_topic_arn_unsigned_custom_client(boto_client_sns):
+    boto_client_sns._request_signer._credentials = None  # noqa: SLF001
+    boto_client_sns.list_topics = mock.AsyncMock(return_value={"Topics": []})
+
+    with pytest.raises(ValueError, match="topic not found: 'topic-name'"):
+        await BaseSNSClient(client=boto_client_sns).get_topic_arn("topic-name")
+
+    boto_client_sns.get_caller_identity.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -95,3 +206,143 @@ async def test_sns_get_client_with_custom_client(mock_boto_session_sns, boto_cli
             assert boto_client_sns is client
 
     mock_session.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_client_reuses_pooled_client(mock_boto_session_sqs, boto_client_sqs):
+    open_default_client_pool()
+    with mock_boto_session_sqs as mock_session:
+        async with BaseSQSClient().get_client() as client1:
+            pass
+        async with BaseSQSClient().get_client() as client2:
+            pass
+
+    assert client1 is client2 is boto_client_sqs
+    assert mock_session.return_value.create_client.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_get_client_pool_per_options(mock_boto_session_sqs):
+    with mock_boto_session_sqs as mock_session:
+        async with BaseSQSClient(region_name="us-east-1").get_client():
+            pass
+        async with BaseSQSClient(region_name="sa-east-1").get_client():
+            pass
+
+    assert mock_session.return_value.create_client.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_get_client_receive(mock_boto_session_sqs):
+    open_default_client_pool()
+    with mock_boto_session_sqs as mock_session:
+        async with BaseSQSClient().get_client():
+            pass
+        async with BaseSQSClient().get_client(receive=True):
+            pass
+        async with BaseSQSClient().get_client(receive=True):
+            pass
+
+    create_client = mock_session.return_value.create_client
+    assert create_client.call_count == 2
+    # no connections reserved, botocore's defaults
+    assert create_client.call_args.kwargs["config"] is None
+
+
+@pytest.mark.asyncio
+async def test_get_client_receive_reserved_connections(mock_boto_session_sqs):
+    # reservations are process-wide, options used by no other test
+    base_sqs_client = BaseSQSClient(region_name="eu-south-2")
+    client_options = base_sqs_client._client_options  # noqa: SLF001
+    get_default_client_pool().reserve("sqs", client_options, 8)
+    get_default_client_pool().reserve("sqs", client_options, 8)
+
+    with mock_boto_session_sqs as mock_session:
+        async with base_sqs_client.get_client(receive=True):
+            pass
+
+    config = mock_session.return_value.create_client.call_args.kwargs["config"]
+    assert config.max_pool_connections == 16
+
+
+@pytest.mark.asyncio
+async def test_get_client_receive_reserved_connections_with_config(mock_boto_session_sqs):
+    base_sqs_client = BaseSQSClient(region_name="eu-south-2", config=AioConfig(connect_timeout=5))
+    get_default_client_pool().reserve("sqs", base_sqs_client._client_options, 20)  # noqa: SLF001
+
+    with mock_boto_session_sqs as mock_session:
+        async with base_sqs_client.get_client(receive=True):
+            pass
+
+    config = mock_session.return_value.create_client.call_args.kwargs["config"]
+    assert config.max_pool_connections == 20
+    assert config.connect_timeout == 5
+
+
+@pytest.mark.asyncio
+async def test_close_default_client_pool(mock_boto_session_sqs):
+    open_default_client_pool()
+    with mock_boto_session_sqs as mock_session:
+        async with BaseSQSClient().get_client():
+            pass
+        await close_default_client_pool()
+        assert not get_default_client_pool().is_open()
+        open_default_client_pool()
+        async with BaseSQSClient().get_client():
+            pass
+
+    assert mock_session.return_value.create_client.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_get_client_pool_not_open(mock_boto_session_sqs, boto_client_sqs):
+    # without a manager, every call gets a client of its own
+    context = mock.AsyncMock(__aenter__=mock.AsyncMock(return_value=boto_client_sqs))
+    with mock_boto_session_sqs as mock_session:
+        mock_session.return_value.create_client.return_value = context
+        for _ in range(2):
+            async with BaseSQSClient().get_client() as client:
+                assert client is boto_client_sqs
+
+    assert mock_session.return_value.create_client.call_count == 2
+    assert context.__aexit__.await_count == 2
+
+    with pytest.raises(RuntimeError, match="the client pool is not open"):
+        await get_default_client_pool().get_client("sqs", {})
+
+
+def test_get_client_successive_event_loops(mock_boto_session_sqs):
+    async def get_queue_url():
+        return await BaseSQSClient().get_queue_url("queue-name")
+
+    with mock_boto_session_sqs as mock_session:
+        asyncio.run(get_queue_url())
+        asyncio.run(get_queue_url())
+
+    assert mock_session.return_value.create_client.call_count == 2
+
+
+class SlowClientContextCreator:
+    async def __aenter__(self):
+        await asyncio.sleep(0.01)
+        return mock.Mock()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+def test_client_pool_reused_by_another_event_loop():
+    pool = get_default_client_pool()
+
+    async def use_pool():
+        pool.open()
+        # concurrent requests contend on the pool lock
+        await asyncio.gather(*(pool.get_client("sqs", {}) for _ in range(3)))
+        await close_default_client_pool()
+
+    session = mock.Mock(create_client=mock.Mock(side_effect=lambda *_, **__: SlowClientContextCreator()))
+    with mock.patch("loafer.ext.aws.bases.get_default_session", return_value=session):
+        asyncio.run(use_pool())
+        asyncio.run(use_pool())
+
+    assert session.create_client.call_count == 2
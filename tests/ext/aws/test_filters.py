@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from loafer.ext.aws.filters import SNSAttributeFilter, SQSAttributeFilter
+
+
+def sqs_message(**attributes):
+    return {
+        "Body": "not json",
+        "MessageAttributes": {name: {"DataType": "String", "StringValue": value} for name, value in attributes.items()},
+    }
+
+
+def sns_message(**attributes):
+    envelope = {
+        "Message": "not json",
+        "MessageAttributes": {name: {"Type": "String", "Value": value} for name, value in attributes.items()},
+    }
+    return {"Body": json.dumps(envelope)}
+
+
+@pytest.mark.parametrize(
+    ("message", "expected"),
+    [
+        (sqs_message(event="created", tenant="olist"), True),
+        (sqs_message(event="updated", tenant="olist"), True),
+        (sqs_message(event="deleted", tenant="olist"), False),
+        (sqs_message(event="created", tenant="other"), False),
+        (sqs_message(event="created"), False),
+        ({"Body": "no attributes"}, False),
+    ],
+)
+def test_sqs_attribute_filter(message, expected):
+    message_filter = SQSAttributeFilter({"event": ["created", "updated"], "tenant": "olist"})
+    assert message_filter(message) is expected
+
+
+@pytest.mark.parametrize(
+    ("message", "expected"),
+    [
+        (sns_message(event="created"), True),
+        (sns_message(event="deleted"), False),
+        (sns_message(), False),
+        # raw message delivery
+        (sqs_message(event="created"), True),
+        (sqs_message(event="deleted"), False),
+        # invalid messages are left to the message translator
+        ({"Body": "invalid: json"}, True),
+        ({"Body": json.dumps("string")}, True),
+    ],
+)
+def test_sns_attribute_filter(message, expected):
+    message_filter = SNSAttributeFilter({"event": "created"})
+    assert message_filter(message) is expected
@@ -1,3 +1,4 @@
+import asyncio
 import json
 from unittest import mock
 
@@ -53,6 +54,73 @@ async def test_sqs_handler_hadle():
     handler.publish.assert_called_once_with("message")
 
 
+@pytest.mark.asyncio
+async def test_sqs_handler_publish_batch(mock_boto_session_sqs, boto_client_sqs):
+    handler = SQSHandler("queue-name", batch_size=10, batch_max_wait=60)
+    with mock_boto_session_sqs:
+        tasks = [asyncio.create_task(handler.publish(f"message-{i}", encoder=None)) for i in range(3)]
+        await asyncio.sleep(0)
+        await handler.close()
+        results = await asyncio.gather(*tasks)
+
+    assert results == [{"Id": "0"}, {"Id": "1"}, {"Id": "2"}]
+    assert not boto_client_sqs.send_message.called
+    boto_client_sqs.send_message_batch.assert_awaited_once_with(
+        QueueUrl=await handler.get_queue_url("queue-name"),
+        Entries=[{"Id": str(i), "MessageBody": f"message-{i}"} for i in range(3)],
+    )
+
+
+@pytest.mark.asyncio
+async def test_sqs_handler_publish_batch_max_bytes(mock_boto_session_sqs, boto_client_sqs):
+    handler = SQSHandler("queue-name", batch_size=10, batch_max_wait=0)
+    message = "x" * (100 * 1024)
+    with mock_boto_session_sqs:
+        await asyncio.gather(*(handler.publish(message, encoder=None) for _ in range(3)))
+
+    sizes = [len(call.kwargs["Entries"]) for call in boto_client_sqs.send_message_batch.await_args_list]
+    assert sizes == [2, 1]
+
+
+@pytest.mark.asyncio
+async def test_sqs_handler_publish_batch_retry(mock_boto_session_sqs, boto_client_sqs):
+    boto_client_sqs.send_message_batch.side_effect = [
+        {"Successful": [{"Id": "0"}], "Failed": [{"Id": "1", "Code": "InternalError", "SenderFault": False}]},
+        {"Successful": [{"Id": "0", "MessageId": "retried"}], "Failed": []},
+    ]
+    handler = SQSHandler("queue-name", batch_size=2)
+    handler._batcher.retry_delay = 0  # noqa: SLF001
+    with mock_boto_session_sqs:
+        results = await asyncio.gather(handler.publish("first"), handler.publish("second"))
+
+    assert results == [{"Id": "0"}, {"Id": "0", "MessageId": "retried"}]
+    assert boto_client_sqs.send_message_batch.await_count == 2
+
+
+@pytest.mark.parametrize("batch_size", [0, 11])
+def test_sqs_handler_batch_size_invalid(batch_size):
+    with pytest.raises(ValueError, match="batch_size must be between 1 and 10"):
+        SQSHandler("queue-name", batch_size=batch_size)
+
+
+@pytest.mark.asyncio
+async def test_sqs_handler_warmup(mock_boto_session_sqs, boto_client_sqs):
+    handler = SQSHandler("queue-name")
+    with mock_boto_session_sqs:
+        await handler.warmup()
+        await handler.publish("message")
+
+    boto_client_sqs.get_queue_url.assert_called_once_with(QueueName="queue-name")
+
+
+@pytest.mark.asyncio
+async def test_sqs_handler_warmup_without_queue_name(mock_boto_session_sqs, boto_client_sqs):
+    with mock_boto_session_sqs:
+        await SQSHandler().warmup()
+
+    assert not boto_client_sqs.get_queue_url.called
+
+
 # SNSHandler
 
 
@@ -103,3 +171,30 @@ async def test_sns_handler_hadle():
     await handler.handle("message", "metadata")
     assert handler.publish.called
     handler.publish.assert_called_once_with("message")
+
+
+@pytest.mark.asyncio
+async def test_sns_handler_publish_batch(mock_boto_session_sns, boto_client_sns):
+    handler = SNSHandler("arn:aws:sns:whatever:topic-name", batch_size=2)
+    with mock_boto_session_sns:
+        results = await asyncio.gather(handler.publish("first"), handler.publish("second"))
+
+    assert results == [{"Id": "0"}, {"Id": "1"}]
+    assert not boto_client_sns.publish.called
+    boto_client_sns.publish_batch.assert_awaited_once_with(
+        TopicArn="arn:aws:sns:whatever:topic-name",
+        PublishBatchRequestEntries=[
+            {"Id": str(i), "MessageStructure": "json", "Message": json.dumps({"default": json.dumps(message)})}
+            for i, message in enumerate(["first", "second"])
+        ],
+    )
+
+
+@pytest.mark.asyncio
+async def test_sns_handler_warmup(mock_boto_session_sns, boto_client_sns):
+    handler = SNSHandler("topic-name")
+    with mock_boto_session_sns:
+        await handler.warmup()
+        await handler.publish("message")
+
+    assert boto_client_sns.publish.call_args.kwargs["TopicArn"] == "arn:aws:sns:us-east-1:123456789012:topic-name"
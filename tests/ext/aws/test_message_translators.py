@@ -1,9 +1,17 @@
+import dataclasses
 import json
+import pickle
 
 import pytest
 
 from loafer.ext.aws.message_translators import SNSMessageTranslator, SQSMessageTranslator
 
+
+@dataclasses.dataclass
+class Event:
+    name: str
+
+
 # sqs
 
 
@@ -48,6 +56,27 @@ def test_translate_sqs_handles_json_error(sqs_translator):
     assert content["content"] is None
 
 
+def test_translate_sqs_keeps_message(sqs_translator):
+    original = {"Body": json.dumps("some-content"), "MessageId": "uuid"}
+    content = sqs_translator.translate(original)
+    assert content["metadata"] == {"MessageId": "uuid"}
+    assert original == {"Body": json.dumps("some-content"), "MessageId": "uuid"}
+
+
+def test_translate_sqs_with_schema():
+    pytest.importorskip("msgspec")
+    translator = SQSMessageTranslator(schema=Event)
+    content = translator.translate({"Body": json.dumps({"name": "created"})})
+    assert content["content"] == Event(name="created")
+
+
+def test_translate_sqs_with_schema_invalid():
+    pytest.importorskip("msgspec")
+    translator = SQSMessageTranslator(schema=Event)
+    content = translator.translate({"Body": json.dumps({"other": "created"})})
+    assert content["content"] is None
+
+
 # sns
 
 
@@ -93,3 +122,45 @@ def test_translate_sns_handles_invalid_content(sns_translator, parametrize_inval
 def test_translate_sns_handles_invalid_format(sns_translator, parametrize_invalid_messages):
     content = sns_translator.translate(parametrize_invalid_messages)
     assert content["content"] is None
+
+
+def test_translate_sns_keeps_message(sns_translator):
+    original = {"Body": json.dumps({"Message": json.dumps("content")}), "MessageId": "uuid"}
+    content = sns_translator.translate(original)
+    assert content["metadata"] == {"MessageId": "uuid"}
+    assert "Body" in original
+
+
+def test_translate_sns_with_schema():
+    pytest.importorskip("msgspec")
+    translator = SNSMessageTranslator(schema=Event)
+    message = json.dumps({"Message": json.dumps({"name": "created"}), "TopicArn": "arn"})
+    content = translator.translate({"Body": message})
+    assert content["content"] == Event(name="created")
+    assert content["metadata"] == {"TopicArn": "arn"}
+
+
+@pytest.mark.parametrize(
+    ("translator", "body"),
+    [(SQSMessageTranslator(), json.dumps("content")), (SNSMessageTranslator(), json.dumps({"Message": '"content"'}))],
+)
+def test_translate_metadata_is_a_dict(translator, body):
+    metadata = translator.translate({"Body": body, "MessageId": "uuid"})["metadata"]
+    assert type(metadata) is dict
+    assert json.dumps(metadata | {"extra": 1}) == json.dumps(metadata.copy() | {"extra": 1})
+
+
+@pytest.mark.parametrize("translator_class", [SQSMessageTranslator, SNSMessageTranslator])
+def test_translator_message_size(translator_class):
+    translator = translator_class()
+    assert translator.message_size({"Body": "12345"}) == 5
+    assert translator.message_size({}) is None
+    assert translator.message_size("invalid") is None
+
+
+@pytest.mark.parametrize("translator_class", [SQSMessageTranslator, SNSMessageTranslator])
+def test_translator_pickle(translator_class):
+    pytest.importorskip("msgspec")
+    translator = pickle.loads(pickle.dumps(translator_class(schema=Event)))
+    assert isinstance(translator, translator_class)
+    assert translator.schema is Event
@@ -1,10 +1,13 @@
+import asyncio
 from unittest import mock
 
 import pytest
 from botocore.exceptions import BotoCoreError, ClientError
 
 from loafer.exceptions import ProviderError
+from loafer.ext.aws.bases import get_default_client_pool, open_default_client_pool
 from loafer.ext.aws.providers import SQSProvider
+from loafer.retries import ExponentialRetry, FixedRetry
 
 
 @pytest.mark.asyncio
@@ -13,21 +16,88 @@ async def test_confirm_message(mock_boto_session_sqs, boto_client_sqs):
         provider = SQSProvider("queue-name")
         message = {"ReceiptHandle": "message-receipt-handle"}
         await provider.confirm_message(message)
+        await provider.close()
 
-        assert boto_client_sqs.delete_message.call_args == mock.call(
-            QueueUrl=await provider.get_queue_url("queue-name"), ReceiptHandle="message-receipt-handle"
+        assert boto_client_sqs.delete_message_batch.call_args == mock.call(
+            QueueUrl=await provider.get_queue_url("queue-name"),
+            Entries=[{"Id": "0", "ReceiptHandle": "message-receipt-handle"}],
         )
 
 
 @pytest.mark.asyncio
-async def test_confirm_message_unknown_error(mock_boto_session_sqs, boto_client_sqs):
+async def test_confirm_message_does_not_wait_for_the_batch(mock_boto_session_sqs, boto_client_sqs):
+    with mock_boto_session_sqs:
+        provider = SQSProvider("queue-name", ack_max_delay=60)
+        await asyncio.wait_for(provider.confirm_message({"ReceiptHandle": "receipt"}), 1)
+        assert len(provider._acks) == 1  # noqa: SLF001
+        assert not boto_client_sqs.delete_message_batch.called
+
+        await provider.close()
+
+    assert boto_client_sqs.delete_message_batch.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_confirm_message_batches_acknowledgements(mock_boto_session_sqs, boto_client_sqs):
+    with mock_boto_session_sqs:
+        provider = SQSProvider("queue-name", ack_max_delay=60)
+        messages = [{"ReceiptHandle": f"receipt-{i}"} for i in range(12)]
+        confirmations = [asyncio.create_task(provider.confirm_message(message)) for message in messages]
+        await asyncio.sleep(0)
+        # ten entries are sent right away, the remaining ones wait for the delay (or close)
+        assert len(provider._acks) == 2  # noqa: SLF001
+
+        await provider.close()
+        await asyncio.gather(*confirmations)
+
+    assert boto_client_sqs.delete_message_batch.call_count == 2
+    entries = [call.kwargs["Entries"] for call in boto_client_sqs.delete_message_batch.call_args_list]
+    assert [len(batch) for batch in entries] == [10, 2]
+    assert entries[1] == [{"Id": "0", "ReceiptHandle": "receipt-10"}, {"Id": "1", "ReceiptHandle": "receipt-11"}]
+
+
+@pytest.mark.asyncio
+async def test_confirm_message_retries_failed_entries(mock_boto_session_sqs, boto_client_sqs):
+    boto_client_sqs.delete_message_batch.side_effect = [
+        {"Failed": [{"Id": "0", "Code": "InternalError", "SenderFault": False}]},
+        {"Successful": [{"Id": "0"}]},
+    ]
+    with mock_boto_session_sqs:
+        provider = SQSProvider("queue-name", ack_max_delay=0)
+        provider._acks.retry_delay = 0  # noqa: SLF001
+        await provider.confirm_message({"ReceiptHandle": "message-receipt-handle"})
+        await provider.close()
+
+    assert boto_client_sqs.delete_message_batch.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_confirm_message_permanent_failure(mock_boto_session_sqs, boto_client_sqs, caplog):
+    boto_client_sqs.delete_message_batch.side_effect = None
+    boto_client_sqs.delete_message_batch.return_value = {
+        "Failed": [{"Id": "0", "Code": "ReceiptHandleIsInvalid", "SenderFault": True}]
+    }
+    with mock_boto_session_sqs:
+        provider = SQSProvider("queue-name", ack_max_delay=0)
+        await provider.confirm_message({"ReceiptHandle": "message-receipt-handle"})
+        await provider.close()
+
+    assert boto_client_sqs.delete_message_batch.call_count == 1
+    assert "ReceiptHandleIsInvalid" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_confirm_message_unknown_error(mock_boto_session_sqs, boto_client_sqs, caplog, metrics):
     error = ClientError(error_response={"ResponseMetadata": {"HTTPStatusCode": 400}}, operation_name="whatever")
-    boto_client_sqs.delete_message.side_effect = error
+    boto_client_sqs.delete_message_batch.side_effect = error
     with mock_boto_session_sqs:
         provider = SQSProvider("queue-name")
         message = {"ReceiptHandle": "message-receipt-handle-not-found"}
-        with pytest.raises(ClientError):
-            await provider.confirm_message(message)
+        await provider.confirm_message(message)
+        await provider.close()
+
+    assert "message acknowledgement failed, code=ClientError" in caplog.text
+    assert metrics.counter_value("sqs.delete.errors", {"queue": "queue-name"}) == 1
 
 
 @pytest.mark.asyncio
@@ -84,3 +154,278 @@ async def test_fetch_messages_with_botocoreerror(mock_boto_session_sqs, boto_cli
         provider = SQSProvider("queue-name")
         with pytest.raises(ProviderError):
             await provider.fetch_messages()
+
+
+@pytest.mark.asyncio
+async def test_warmup(mock_boto_session_sqs, boto_client_sqs):
+    open_default_client_pool()
+    with mock_boto_session_sqs as mock_session:
+        provider = SQSProvider("queue-name")
+        await provider.warmup()
+        # the receive and the default clients
+        assert mock_session.return_value.create_client.call_count == 2
+        await provider.fetch_messages()
+
+    assert mock_session.return_value.create_client.call_count == 2
+    boto_client_sqs.get_queue_url.assert_called_once_with(QueueName="queue-name")
+
+
+def test_max_receives():
+    pool = get_default_client_pool()
+    provider = SQSProvider("queue-name", region_name="us-east-1", max_receives=4)
+    key = pool._key("sqs", provider._client_options, receive=True)  # noqa: SLF001
+    reserved = pool._connections[key]  # noqa: SLF001
+
+    SQSProvider("queue-name", region_name="us-east-1", max_receives=4)
+
+    assert pool._connections[key] == reserved + 4  # noqa: SLF001
+
+
+def test_max_receives_invalid():
+    with pytest.raises(ValueError, match="max_receives must be a positive integer"):
+        SQSProvider("queue-name", max_receives=0)
+
+
+@pytest.mark.asyncio
+async def test_warmup_with_client_error(mock_boto_session_sqs, boto_client_sqs):
+    error = ClientError(error_response={"Error": {"Code": "AccessDenied", "Message": "denied"}}, operation_name="x")
+    boto_client_sqs.get_queue_url.side_effect = error
+    with mock_boto_session_sqs:
+        provider = SQSProvider("queue-name")
+        with pytest.raises(ProviderError, match="error resolving queue=queue-name"):
+            await provider.warmup()
+
+
+@pytest.mark.asyncio
+async def test_fetch_messages_with_visibility_heartbeat(mock_boto_session_sqs, boto_client_sqs, sqs_message):
+    sqs_message["Messages"][0]["ReceiptHandle"] = "receipt"
+    with mock_boto_session_sqs:
+        provider = SQSProvider("queue-name", visibility_heartbeat=30)
+        provider._heartbeat_interval = 0.01  # noqa: SLF001
+        await provider.fetch_messages()
+        await asyncio.sleep(0.05)
+        await provider.confirm_message({"ReceiptHandle": "receipt"})
+        heartbeats = boto_client_sqs.change_message_visibility_batch.call_count
+        await asyncio.sleep(0.05)
+        await provider.close()
+
+    assert boto_client_sqs.receive_message.call_args == mock.call(
+        QueueUrl=await provider.get_queue_url("queue-name"), WaitTimeSeconds=20, VisibilityTimeout=30
+    )
+    assert boto_client_sqs.change_message_visibility_batch.call_args == mock.call(
+        QueueUrl=await provider.get_queue_url("queue-name"),
+        Entries=[{"Id": "0", "ReceiptHandle": "receipt", "VisibilityTimeout": 30}],
+    )
+    # the heartbeat stops once the message is confirmed
+    assert heartbeats > 0
+    assert boto_client_sqs.change_message_visibility_batch.call_count == heartbeats
+    assert provider._heartbeat_task is None  # noqa: SLF001
+
+
+@pytest.mark.asyncio
+async def test_visibility_heartbeat_stops_on_message_not_processed(mock_boto_session_sqs, sqs_message):
+    sqs_message["Messages"][0]["ReceiptHandle"] = "receipt"
+    with mock_boto_session_sqs:
+        provider = SQSProvider("queue-name", visibility_heartbeat=30)
+        await provider.fetch_messages()
+        assert "receipt" in provider._in_flight  # noqa: SLF001
+
+        await provider.message_not_processed({"ReceiptHandle": "receipt"})
+        assert "receipt" not in provider._in_flight  # noqa: SLF001
+        await provider.close()
+
+
+@pytest.mark.asyncio
+async def test_message_not_processed_without_retry_policy(mock_boto_session_sqs, boto_client_sqs):
+    with mock_boto_session_sqs:
+        provider = SQSProvider("queue-name")
+        await provider.message_not_processed({"ReceiptHandle": "receipt"})
+
+    assert not boto_client_sqs.change_message_visibility_batch.called
+
+
+@pytest.mark.asyncio
+async def test_message_not_processed_with_retry_policy(mock_boto_session_sqs, boto_client_sqs, metrics):
+    with mock_boto_session_sqs:
+        provider = SQSProvider("queue-name", retry_policy=ExponentialRetry(10, jitter=False))
+        await asyncio.gather(
+            provider.message_not_processed(
+                {"ReceiptHandle": "receipt1", "Attributes": {"ApproximateReceiveCount": "1"}}
+            ),
+            provider.message_not_processed(
+                {"ReceiptHandle": "receipt2", "Attributes": {"ApproximateReceiveCount": "3"}}
+            ),
+            # without the receive count, it's the first attempt
+            provider.message_not_processed({"ReceiptHandle": "receipt3"}),
+        )
+
+    assert boto_client_sqs.change_message_visibility_batch.call_args == mock.call(
+        QueueUrl=await provider.get_queue_url("queue-name"),
+        Entries=[
+            {"Id": "0", "ReceiptHandle": "receipt1", "VisibilityTimeout": 10},
+            {"Id": "1", "ReceiptHandle": "receipt2", "VisibilityTimeout": 40},
+            {"Id": "2", "ReceiptHandle": "receipt3", "VisibilityTimeout": 10},
+        ],
+    )
+    assert metrics.counter_value("sqs.retries", {"queue": "queue-name"}) == 3
+
+
+@pytest.mark.asyncio
+async def test_message_not_processed_max_visibility_timeout(mock_boto_session_sqs, boto_client_sqs):
+    with mock_boto_session_sqs:
+        provider = SQSProvider("queue-name", retry_policy=FixedRetry(86400))
+        await provider.message_not_processed({"ReceiptHandle": "receipt"})
+
+    entries = boto_client_sqs.change_message_visibility_batch.call_args.kwargs["Entries"]
+    assert entries == [{"Id": "0", "ReceiptHandle": "receipt", "VisibilityTimeout": 43200}]
+
+
+@pytest.mark.asyncio
+async def test_message_not_processed_retry_failure(mock_boto_session_sqs, boto_client_sqs, caplog):
+    boto_client_sqs.change_message_visibility_batch.side_effect = None
+    boto_client_sqs.change_message_visibility_batch.return_value = {
+        "Successful": [],
+        "Failed": [{"Id": "0", "Code": "ReceiptHandleIsInvalid", "SenderFault": True}],
+    }
+    with mock_boto_session_sqs:
+        provider = SQSProvider("queue-name", retry_policy=FixedRetry(5))
+        await provider.message_not_processed({"ReceiptHandle": "receipt"})
+
+    assert "message retry not scheduled, code=ReceiptHandleIsInvalid" in caplog.text
+
+
+@pytest.mark.parametrize(
+    ("options", "expected"),
+    [
+        ({}, ["ApproximateReceiveCount"]),
+        ({"MessageSystemAttributeNames": ["SentTimestamp"]}, ["SentTimestamp", "ApproximateReceiveCount"]),
+        ({"MessageSystemAttributeNames": ["All"]}, ["All"]),
+    ],
+)
+def test_retry_policy_receives_receive_count(options, expected):
+    provider = SQSProvider("queue-name", options=options, retry_policy=FixedRetry(5))
+    assert provider._options["MessageSystemAttributeNames"] == expected  # noqa: SLF001
+
+
+def test_retry_policy_receives_receive_count_legacy_attribute_names():
+    provider = SQSProvider("queue-name", options={"AttributeNames": ["All"]}, retry_policy=FixedRetry(5))
+    assert "MessageSystemAttributeNames" not in provider._options  # noqa: SLF001
+
+
+@pytest.mark.asyncio
+async def test_release_message(mock_boto_session_sqs, boto_client_sqs, sqs_message):
+    sqs_message["Messages"][0]["ReceiptHandle"] = "receipt"
+    with mock_boto_session_sqs:
+        provider = SQSProvider("queue-name", visibility_heartbeat=30)
+        await provider.fetch_messages()
+
+        await asyncio.gather(
+            provider.release_message({"ReceiptHandle": "receipt"}),
+            provider.release_message({"ReceiptHandle": "other-receipt"}),
+        )
+        await provider.close()
+
+    assert provider._in_flight == {}  # noqa: SLF001
+    assert boto_client_sqs.change_message_visibility_batch.call_args == mock.call(
+        QueueUrl=await provider.get_queue_url("queue-name"),
+        Entries=[
+            {"Id": "0", "ReceiptHandle": "receipt", "VisibilityTimeout": 0},
+            {"Id": "1", "ReceiptHandle": "other-receipt", "VisibilityTimeout": 0},
+        ],
+    )
+
+
+@pytest.mark.asyncio
+async def test_release_message_failure(mock_boto_session_sqs, boto_client_sqs, caplog):
+    boto_client_sqs.change_message_visibility_batch.side_effect = None
+    boto_client_sqs.change_message_visibility_batch.return_value = {
+        "Successful": [],
+        "Failed": [{"Id": "0", "Code": "ReceiptHandleIsInvalid", "SenderFault": True}],
+    }
+    with mock_boto_session_sqs:
+        provider = SQSProvider("queue-name")
+        await provider.release_message({"ReceiptHandle": "receipt"})
+
+    assert "message not released, code=ReceiptHandleIsInvalid" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_fetch_messages_without_visibility_heartbeat(mock_boto_session_sqs, sqs_message):
+    sqs_message["Messages"][0]["ReceiptHandle"] = "receipt"
+    with mock_boto_session_sqs:
+        provider = SQSProvider("queue-name")
+        await provider.fetch_messages()
+
+    assert provider._in_flight == {}  # noqa: SLF001
+    assert provider._heartbeat_task is None  # noqa: SLF001
+
+
+@pytest.mark.asyncio
+async def test_fetch_messages_long_polling_by_default(mock_boto_session_sqs, boto_client_sqs):
+    with mock_boto_session_sqs:
+        provider = SQSProvider("queue-name")
+        await provider.fetch_messages()
+
+    assert boto_client_sqs.receive_message.call_args == mock.call(
+        QueueUrl=await provider.get_queue_url("queue-name"), WaitTimeSeconds=20
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("options", "max_messages", "expected"),
+    [
+        ({}, 3, 3),
+        ({}, 50, 10),
+        ({"MaxNumberOfMessages": 5}, 8, 5),
+        ({"MaxNumberOfMessages": 5}, 2, 2),
+    ],
+)
+async def test_fetch_messages_with_max_messages(
+    mock_boto_session_sqs, boto_client_sqs, options, max_messages, expected
+):
+    with mock_boto_session_sqs:
+        provider = SQSProvider("queue-name", options=options)
+        await provider.fetch_messages(max_messages=max_messages)
+
+    assert boto_client_sqs.receive_message.call_args.kwargs["MaxNumberOfMessages"] == expected
+
+
+@pytest.mark.asyncio
+async def test_provider_metrics(mock_boto_session_sqs, metrics):
+    with mock_boto_session_sqs:
+        provider = SQSProvider("queue-name")
+        await provider.fetch_messages()
+        await provider.confirm_message({"ReceiptHandle": "receipt"})
+        await provider.close()
+
+    tags = {"queue": "queue-name"}
+    assert metrics.timing_histogram("sqs.receive.duration", tags).count == 1
+    assert metrics.timing_histogram("sqs.delete.duration", tags).count == 1
+    assert metrics.counter_value("sqs.delete.requests", tags) == 1
+
+
+@pytest.mark.asyncio
+async def test_provider_metrics_errors(mock_boto_session_sqs, boto_client_sqs, metrics):
+    boto_client_sqs.delete_message_batch.side_effect = None
+    boto_client_sqs.delete_message_batch.return_value = {
+        "Successful": [],
+        "Failed": [{"Id": "0", "Code": "ReceiptHandleIsInvalid", "SenderFault": True}],
+    }
+    boto_client_sqs.receive_message.side_effect = ClientError(error_response={}, operation_name="whatever")
+    with mock_boto_session_sqs:
+        provider = SQSProvider("queue-name")
+        await provider.confirm_message({"ReceiptHandle": "receipt"})
+        await provider.close()
+        with pytest.raises(ProviderError):
+            await provider.fetch_messages()
+
+    tags = {"queue": "queue-name"}
+    assert metrics.counter_value("sqs.delete.errors", tags) == 1
+    assert metrics.counter_value("sqs.receive.errors", tags) == 1
+
+
+def test_message_id():
+    provider = SQSProvider("queue-name")
+    assert provider.message_id({"MessageId": "uuid", "Body": "test"}) == "uuid"
+    assert provider.message_id({"Body": "test"}) is None
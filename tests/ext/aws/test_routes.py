@@ -1,3 +1,7 @@
+import pytest
+
+from loafer.ext.aws.bases import get_default_client_pool
+from loafer.ext.aws.filters import SNSAttributeFilter, SQSAttributeFilter
 from loafer.ext.aws.message_translators import SNSMessageTranslator, SQSMessageTranslator
 from loafer.ext.aws.providers import SQSProvider
 from loafer.ext.aws.routes import SNSQueueRoute, SQSRoute
@@ -28,6 +32,19 @@ def test_sqs_route_provider_options(dummy_handler):
     assert route.provider._client_options["use_ssl"] is False  # noqa: SLF001
 
 
+@pytest.mark.parametrize(("options", "expected"), [({}, 1), ({"pollers": 3}, 3), ({"pollers": 2, "max_pollers": 6}, 6)])
+@pytest.mark.parametrize("route_class", [SQSRoute, SNSQueueRoute])
+def test_route_reserves_receive_connections(dummy_handler, route_class, options, expected):
+    pool = get_default_client_pool()
+    route = route_class("what", handler=dummy_handler, **options)
+    key = pool._key("sqs", route.provider._client_options, receive=True)  # noqa: SLF001
+    reserved = pool._connections[key]  # noqa: SLF001
+
+    route_class("what", handler=dummy_handler, **options)
+
+    assert pool._connections[key] == reserved + expected  # noqa: SLF001
+
+
 def test_sns_queue_route(dummy_handler):
     route = SNSQueueRoute("what", handler=dummy_handler)
     assert isinstance(route.message_translator, SNSMessageTranslator)
@@ -51,3 +68,47 @@ def test_sns_queue_route_provider_options(dummy_handler):
     route = SNSQueueRoute("what", provider_options={"region_name": "sa-east-1"}, handler=dummy_handler, name="foobar")
     assert "region_name" in route.provider._client_options  # noqa: SLF001
     assert route.provider._client_options["region_name"] == "sa-east-1"  # noqa: SLF001
+
+
+def test_sqs_route_options(dummy_handler):
+    route = SQSRoute("what", handler=dummy_handler, max_concurrency=5)
+    assert route.max_concurrency == 5
+
+
+def test_routes_schema(dummy_handler):
+    pytest.importorskip("msgspec")
+    route = SQSRoute("what", handler=dummy_handler, schema=dict)
+    assert route.message_translator.schema is dict
+    route = SNSQueueRoute("what", handler=dummy_handler, schema=dict)
+    assert route.message_translator.schema is dict
+
+
+def test_sqs_route_message_attributes(dummy_handler):
+    route = SQSRoute(
+        "what",
+        {"options": {"MessageAttributeNames": ["trace"]}},
+        handler=dummy_handler,
+        message_attributes={"event": "created"},
+    )
+    assert isinstance(route.message_filter, SQSAttributeFilter)
+    assert route.provider._options["MessageAttributeNames"] == ["trace", "event"]  # noqa: SLF001
+
+
+def test_sns_queue_route_message_attributes(dummy_handler):
+    route = SNSQueueRoute(
+        "what",
+        {"options": {"MessageAttributeNames": ["All"]}},
+        handler=dummy_handler,
+        message_attributes={"event": "created"},
+    )
+    assert isinstance(route.message_filter, SNSAttributeFilter)
+    assert route.provider._options["MessageAttributeNames"] == ["All"]  # noqa: SLF001
+
+
+def test_sqs_route_message_attributes_and_message_filter(dummy_handler):
+    message = {"Body": "{}", "MessageAttributes": {"event": {"StringValue": "created"}}}
+    route = SQSRoute(
+        "what", handler=dummy_handler, message_attributes={"event": "created"}, message_filter=lambda m: "x" in m
+    )
+    assert route.message_filter(message) is False
+    assert route.message_filter({**message, "x": 1}) is True
@@ -0,0 +1,108 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from loafer.batching import Batcher
+from loafer.exceptions import BatchEntryError
+
+
+@pytest.mark.asyncio
+async def test_submit_sends_after_max_delay():
+    send = mock.AsyncMock(side_effect=lambda items: [item * 2 for item in items])
+    batcher = Batcher(send, max_size=10, max_delay=0)
+
+    results = await asyncio.gather(batcher.submit(1), batcher.submit(2))
+
+    assert results == [2, 4]
+    send.assert_awaited_once_with([1, 2])
+
+
+@pytest.mark.asyncio
+async def test_submit_sends_when_batch_is_full():
+    send = mock.AsyncMock(side_effect=lambda items: items)
+    batcher = Batcher(send, max_size=2, max_delay=60)
+
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(4)))
+
+    assert results == [0, 1, 2, 3]
+    assert send.await_args_list == [mock.call([0, 1]), mock.call([2, 3])]
+
+
+@pytest.mark.asyncio
+async def test_submit_nowait():
+    send = mock.AsyncMock(side_effect=lambda items: items)
+    batcher = Batcher(send, max_size=10, max_delay=60)
+
+    futures = [batcher.submit_nowait(i) for i in range(3)]
+    assert len(batcher) == 3
+    assert not any(future.done() for future in futures)
+
+    await batcher.flush()
+    assert [future.result() for future in futures] == [0, 1, 2]
+    send.assert_awaited_once_with([0, 1, 2])
+
+
+@pytest.mark.asyncio
+async def test_flush():
+    send = mock.AsyncMock(side_effect=lambda items: items)
+    batcher = Batcher(send, max_size=10, max_delay=60)
+
+    task = asyncio.create_task(batcher.submit("item"))
+    await asyncio.sleep(0)
+    assert len(batcher) == 1
+
+    await batcher.flush()
+
+    assert len(batcher) == 0
+    assert await task == "item"
+
+
+@pytest.mark.asyncio
+async def test_retry_failed_entries():
+    retryable = BatchEntryError("throttled", code="Throttling", retryable=True)
+    send = mock.AsyncMock(side_effect=[["ok", retryable], ["ok again"]])
+    batcher = Batcher(send, max_delay=0, retry_delay=0)
+
+    results = await asyncio.gather(batcher.submit("a"), batcher.submit("b"))
+
+    assert results == ["ok", "ok again"]
+    assert send.await_args_list == [mock.call(["a", "b"]), mock.call(["b"])]
+
+
+@pytest.mark.asyncio
+async def test_permanent_failure():
+    permanent = BatchEntryError("invalid", code="Invalid", retryable=False)
+    send = mock.AsyncMock(return_value=[permanent])
+    batcher = Batcher(send, max_delay=0)
+
+    with pytest.raises(BatchEntryError, match="invalid"):
+        await batcher.submit("a")
+
+    send.assert_awaited_once_with(["a"])
+
+
+@pytest.mark.asyncio
+async def test_request_failure():
+    send = mock.AsyncMock(side_effect=ValueError("boom"))
+    batcher = Batcher(send, max_delay=0)
+
+    results = await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+
+    assert [type(result) for result in results] == [ValueError, ValueError]
+
+
+@pytest.mark.asyncio
+async def test_drop_cancelled():
+    send = mock.AsyncMock(side_effect=lambda items: items)
+    batcher = Batcher(send, max_size=10, max_delay=60, drop_cancelled=True)
+
+    cancelled = asyncio.create_task(batcher.submit("a"))
+    task = asyncio.create_task(batcher.submit("b"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    await batcher.flush()
+
+    assert await task == "b"
+    send.assert_awaited_once_with(["b"])
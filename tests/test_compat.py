@@ -0,0 +1,99 @@
+import contextvars
+import dataclasses
+import json
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+
+from loafer._compat import (
+    JSONDecodeError,
+    _json_backends,
+    json_backend,
+    json_decoder,
+    json_loads,
+    run_in_executor,
+)
+from loafer.executors import RouteThreadPoolExecutor
+
+
+@dataclasses.dataclass
+class Order:
+    id: int
+    total: float
+
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("executor_class", [ThreadPoolExecutor, RouteThreadPoolExecutor])
+async def test_run_in_executor_copies_context(executor_class):
+    request_id.set("uuid")
+    with executor_class(max_workers=1) as executor:
+        assert await run_in_executor(executor, request_id.get) == "uuid"
+
+
+@pytest.fixture(params=["json", "msgspec"])
+def backend_loads(request):
+    if request.param == "msgspec":
+        pytest.importorskip("msgspec")
+    return _json_backends[request.param]
+
+
+def test_json_loads():
+    assert json_backend in {"msgspec", "json"}
+    assert json_loads('{"key": ["value", 1]}') == {"key": ["value", 1]}
+    assert json_loads(b'"bytes"') == "bytes"
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        '{"key": ["value", 1.5, true, null]}',
+        '"\\u00e9t\\u00e9"',
+        "-0.0",
+        "123456789012345678901234567890",
+        "-123456789012345678901234567890",
+        "[NaN, Infinity, -Infinity]",
+        "1e400",
+        '"\\ud800"',
+        '{"key": 1, "key": 2}',
+    ],
+)
+def test_json_backend(backend_loads, document):
+    # every backend decodes like the standard library
+    assert repr(backend_loads(document)) == repr(json.loads(document))
+    assert repr(backend_loads(document.encode())) == repr(json.loads(document))
+
+
+@pytest.mark.parametrize("document", ["invalid: json", "", "[1,]", "{'key': 1}"])
+def test_json_backend_invalid(backend_loads, document):
+    with pytest.raises(json.JSONDecodeError):
+        backend_loads(document)
+
+
+def test_json_decoder_without_schema():
+    assert json_decoder() is json_loads
+
+
+def test_json_decoder_with_schema():
+    pytest.importorskip("msgspec")
+    decode = json_decoder(Order)
+    assert decode('{"id": 1, "total": 9.9}') == Order(id=1, total=9.9)
+    assert decode('{"id": 1, "total": 9.9, "unknown": 1}') == Order(id=1, total=9.9)
+
+
+@pytest.mark.parametrize("document", ['"not an object"', '{"id": 1}', '{"id": "1", "total": 9.9}', "invalid: json"])
+def test_json_decoder_with_schema_invalid(document):
+    pytest.importorskip("msgspec")
+    with pytest.raises(JSONDecodeError):
+        json_decoder(Order)(document)
+
+
+def test_json_decoder_with_schema_requires_msgspec():
+    with (
+        mock.patch("loafer._compat.msgspec", None),
+        pytest.raises(ImportError, match="msgspec is required to decode json into a schema"),
+    ):
+        json_decoder(Order)
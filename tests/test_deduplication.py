@@ -0,0 +1,128 @@
+import asyncio
+import sqlite3
+from contextlib import closing
+from unittest import mock
+
+import pytest
+
+from loafer.deduplication import MemoryDeduplicationStore, SQLiteDeduplicationStore
+
+
+@pytest.mark.asyncio
+async def test_memory_store():
+    store = MemoryDeduplicationStore()
+
+    assert await store.contains("key") is False
+    await store.add("key")
+    assert await store.contains("key") is True
+    assert await store.contains("other") is False
+
+
+@pytest.mark.asyncio
+async def test_memory_store_ttl():
+    store = MemoryDeduplicationStore(ttl=10)
+    with mock.patch("loafer.deduplication.time.monotonic", return_value=100):
+        await store.add("key")
+
+    with mock.patch("loafer.deduplication.time.monotonic", return_value=109):
+        assert await store.contains("key") is True
+
+    with mock.patch("loafer.deduplication.time.monotonic", return_value=110):
+        assert await store.contains("key") is False
+    assert len(store) == 0
+
+
+@pytest.mark.asyncio
+async def test_memory_store_evicts_least_recently_seen():
+    store = MemoryDeduplicationStore(max_size=2)
+    await store.add("key1")
+    await store.add("key2")
+    assert await store.contains("key1") is True
+
+    await store.add("key3")
+
+    assert len(store) == 2
+    assert await store.contains("key1") is True
+    assert await store.contains("key2") is False
+    assert await store.contains("key3") is True
+
+
+@pytest.mark.parametrize(
+    ("options", "message"),
+    [({"max_size": 0}, "max_size must be a positive integer"), ({"ttl": 0}, "ttl must be a positive number")],
+)
+def test_memory_store_invalid(options, message):
+    with pytest.raises(ValueError, match=message):
+        MemoryDeduplicationStore(**options)
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store(tmp_path):
+    store = SQLiteDeduplicationStore(tmp_path / "keys.db")
+
+    assert await store.contains("key") is False
+    await store.add("key")
+    assert await store.contains("key") is True
+    await store.close()
+    await store.close()
+
+    # keys survive restarts
+    store = SQLiteDeduplicationStore(tmp_path / "keys.db")
+    assert await store.contains("key") is True
+    assert await store.contains("other") is False
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_ttl(tmp_path):
+    store = SQLiteDeduplicationStore(tmp_path / "keys.db", ttl=10)
+    with mock.patch("loafer.deduplication.time.time", return_value=100):
+        await store.add("key")
+
+    with mock.patch("loafer.deduplication.time.time", return_value=109):
+        assert await store.contains("key") is True
+
+    with mock.patch("loafer.deduplication.time.time", return_value=110):
+        assert await store.contains("key") is False
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_purges_expired_keys(tmp_path):
+    store = SQLiteDeduplicationStore(tmp_path / "keys.db", ttl=10, purge_interval=2)
+    with mock.patch("loafer.deduplication.time.time", return_value=100):
+        await store.add("key1")
+
+    with mock.patch("loafer.deduplication.time.time", return_value=200):
+        await store.add("key2")
+
+    await store.close()
+    with closing(sqlite3.connect(tmp_path / "keys.db")) as connection:
+        assert connection.execute("SELECT key FROM loafer_keys").fetchall() == [("key2",)]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_does_not_block_the_event_loop(tmp_path):
+    store = SQLiteDeduplicationStore(tmp_path / "keys.db")
+    await store.add("key")
+
+    # another process holds the database lock
+    with closing(sqlite3.connect(tmp_path / "keys.db", isolation_level=None)) as connection:
+        connection.execute("BEGIN EXCLUSIVE")
+        task = asyncio.ensure_future(store.add("other"))
+        await asyncio.sleep(0.1)
+        assert not task.done()
+        connection.execute("COMMIT")
+
+    await task
+    assert await store.contains("other") is True
+    await store.close()
+
+
+@pytest.mark.parametrize(
+    ("options", "message"),
+    [({"ttl": -1}, "ttl must be a positive number"), ({"purge_interval": 0}, "purge_interval must be a positive")],
+)
+def test_sqlite_store_invalid(tmp_path, options, message):
+    with pytest.raises(ValueError, match=message):
+        SQLiteDeduplicationStore(tmp_path / "keys.db", **options)
@@ -1,27 +1,41 @@
 import asyncio
+import logging
 from unittest import mock
 
 import pytest
 
-from loafer.dispatchers import LoaferDispatcher
-from loafer.exceptions import DeleteMessage
+from loafer.dispatchers import LoaferDispatcher, ProcessingQueue
+from loafer.exceptions import DeleteMessage, ProviderError
 from loafer.routes import Route
+from loafer.tracing import LatencyHistograms, current_trace
 
 
-def create_mock_route(messages):
+def create_mock_route(messages, max_concurrency=None, weight=1, pollers=1, max_pollers=1):
     provider = mock.AsyncMock(
         fetch_messages=mock.AsyncMock(side_effect=[messages]),
         confirm_message=mock.AsyncMock(),
         message_not_processed=mock.AsyncMock(),
+        release_message=mock.AsyncMock(),
     )
 
     message_translator = mock.Mock(translate=mock.Mock(side_effect=[{"content": message} for message in messages]))
-    return mock.AsyncMock(
+    route = mock.AsyncMock(
         provider=provider,
         handler=mock.AsyncMock(),
         message_translator=message_translator,
+        max_concurrency=max_concurrency,
+        weight=weight,
+        pollers=pollers,
+        max_pollers=max_pollers,
+        labels={"route": "test"},
+        latency=LatencyHistograms(),
+        slow_message_threshold=None,
+        batch_size=None,
         spec=Route,
     )
+    # `name` is a Mock constructor argument, it can't be given above
+    route.name = "test"
+    return route
 
 
 @pytest.fixture
@@ -102,6 +116,72 @@ async def test_dispatch_providers(route):
     dispatcher.dispatch_message.assert_awaited_once_with("message", route)
 
 
+@pytest.mark.asyncio
+async def test_dispatch_providers_metrics(metrics):
+    route = create_mock_route(["message1", "message2"])
+    dispatcher = LoaferDispatcher([route])
+    dispatcher.dispatch_message = mock.AsyncMock(side_effect=[True, False])
+
+    await dispatcher.dispatch_providers(forever=False)
+
+    tags = {"route": "test"}
+    assert metrics.counter_value("messages.received", tags) == 2
+    assert metrics.counter_value("messages.confirmed", tags) == 1
+    assert metrics.counter_value("messages.not_processed", tags) == 1
+    assert metrics.timing_histogram("receive.duration", tags).count == 1
+    assert metrics.timing_histogram("message.duration", tags).count == 2
+    assert metrics.gauge_value("queue.depth", tags) == 2
+    assert metrics.gauge_value("dispatcher.in_flight") == 0
+    assert dispatcher.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_process_message_latency(route):
+    async def deliver(message):  # noqa: ARG001
+        current_trace.get().handle = 0.25
+        return True
+
+    route.deliver = deliver
+    dispatcher = LoaferDispatcher([route])
+
+    await dispatcher._process_message("message", route, wait=0.5)  # noqa: SLF001
+
+    assert route.latency["wait"].sum == 0.5
+    assert route.latency["handle"].sum == 0.25
+    assert route.latency["total"].sum >= 0.5
+    assert current_trace.get() is None
+
+
+@pytest.mark.asyncio
+async def test_process_message_slow_message(route, caplog):
+    route.name = "slow-route"
+    route.slow_message_threshold = 0.1
+    route.provider.message_id = mock.Mock(return_value="message-id")
+    route.deliver = mock.AsyncMock(return_value=True)
+    dispatcher = LoaferDispatcher([route])
+
+    with caplog.at_level(logging.WARNING, logger="loafer.dispatchers"):
+        await dispatcher._process_message("message", route, wait=0.05)  # noqa: SLF001
+        assert not caplog.records
+
+        await dispatcher._process_message("message", route, wait=0.2)  # noqa: SLF001
+
+    assert len(caplog.records) == 1
+    assert "slow message route=slow-route, message_id=message-id" in caplog.records[0].getMessage()
+    route.provider.message_id.assert_called_once_with("message")
+
+
+@pytest.mark.asyncio
+async def test_dispatch_message_error_metrics(route, metrics):
+    route.deliver = mock.AsyncMock(side_effect=ValueError)
+    route.error_handler = mock.AsyncMock(return_value=False)
+    dispatcher = LoaferDispatcher([route])
+
+    await dispatcher.dispatch_message("message", route)
+
+    assert metrics.counter_value("messages.errors", {"route": "test"}) == 1
+
+
 @pytest.mark.asyncio
 async def test_dispatch_providers_multiple_routes():
     route1 = create_mock_route(["message1", "message2"])
@@ -121,6 +201,139 @@ async def test_dispatch_providers_multiple_routes():
     )
 
 
+async def _max_in_flight(dispatcher):
+    in_flight = 0
+    max_in_flight = 0
+
+    async def dispatch_message(message, route):  # noqa: ARG001
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(in_flight, max_in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return True
+
+    dispatcher.dispatch_message = dispatch_message
+    await dispatcher.dispatch_providers(forever=False)
+    return max_in_flight
+
+
+@pytest.mark.asyncio
+async def test_dispatch_providers_concurrent_messages():
+    route = create_mock_route([f"message{i}" for i in range(10)])
+    dispatcher = LoaferDispatcher([route], workers=4)
+
+    assert await _max_in_flight(dispatcher) == 4
+    assert route.provider.confirm_message.await_count == 10
+
+
+@pytest.mark.asyncio
+async def test_dispatch_providers_route_max_concurrency():
+    route = create_mock_route([f"message{i}" for i in range(10)], max_concurrency=2)
+    dispatcher = LoaferDispatcher([route], workers=4)
+
+    assert await _max_in_flight(dispatcher) == 2
+    assert route.provider.confirm_message.await_count == 10
+
+
+@pytest.mark.asyncio
+async def test_fetch_messages_max_messages():
+    route = create_mock_route(["message1", "message2"])
+    dispatcher = LoaferDispatcher([route])
+    queue = ProcessingQueue([route], maxsize=5)
+    await queue.put("waiting", route)
+
+    await dispatcher._fetch_messages(queue, route, forever=False)  # noqa: SLF001
+
+    route.provider.fetch_messages.assert_awaited_once_with(max_messages=4)
+    assert queue.qsize(route) == 3
+
+
+@pytest.mark.asyncio
+async def test_fetch_messages_provider_without_max_messages(route):
+    class Provider:
+        async def fetch_messages(self):
+            return ["message"]
+
+    route.provider = Provider()
+    dispatcher = LoaferDispatcher([route])
+    queue = ProcessingQueue([route], maxsize=5)
+
+    await dispatcher._fetch_messages(queue, route, forever=False)  # noqa: SLF001
+
+    assert queue.qsize(route) == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_messages_waits_for_space():
+    route = create_mock_route(["message"])
+    dispatcher = LoaferDispatcher([route])
+    queue = ProcessingQueue([route], maxsize=1)
+    await queue.put("waiting", route)
+
+    task = asyncio.create_task(dispatcher._fetch_messages(queue, route, forever=False))  # noqa: SLF001
+    await asyncio.sleep(0)
+    assert not route.provider.fetch_messages.called
+
+    await queue.get()
+    await task
+    route.provider.fetch_messages.assert_awaited_once_with(max_messages=1)
+
+
+@pytest.mark.asyncio
+async def test_fetch_messages_backoff_on_empty_responses(route):
+    route.provider.fetch_messages.side_effect = [[], [], ["message"], asyncio.CancelledError]
+    dispatcher = LoaferDispatcher([route])
+    queue = ProcessingQueue([route], maxsize=5)
+
+    with mock.patch("loafer.dispatchers.asyncio.sleep") as sleep_mock, pytest.raises(asyncio.CancelledError):
+        await dispatcher._fetch_messages(queue, route)  # noqa: SLF001
+
+    assert sleep_mock.await_args_list == [mock.call(0.05), mock.call(0.1)]
+    assert queue.qsize(route) == 1
+
+
+@pytest.mark.asyncio
+async def test_dispatch_providers_multiple_pollers():
+    route = create_mock_route([], pollers=3, max_pollers=3)
+    route.provider.fetch_messages.side_effect = [["message1"], ["message2"], ["message3"]]
+    dispatcher = LoaferDispatcher([route])
+    dispatcher.dispatch_message = mock.AsyncMock()
+
+    await dispatcher.dispatch_providers(forever=False)
+
+    assert route.provider.fetch_messages.await_count == 3
+    assert dispatcher.dispatch_message.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_dispatch_providers_scale_pollers():
+    route = create_mock_route([], pollers=1, max_pollers=3)
+    fetches = {"total": 0, "active": 0, "max_active": 0}
+
+    async def fetch_messages(max_messages=None):  # noqa: ARG001
+        fetches["active"] += 1
+        fetches["max_active"] = max(fetches["active"], fetches["max_active"])
+        await asyncio.sleep(0.01)
+        fetches["active"] -= 1
+        fetches["total"] += 1
+        return ["message"] if fetches["total"] <= 20 else []
+
+    route.provider.fetch_messages.side_effect = fetch_messages
+    dispatcher = LoaferDispatcher([route], queue_size=100)
+    dispatcher.dispatch_message = mock.AsyncMock(return_value=True)
+
+    task = asyncio.create_task(dispatcher.dispatch_providers())
+    await asyncio.sleep(0.3)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    # scaled up to max_pollers while there were messages, and back to pollers when the queue was empty
+    assert fetches["max_active"] == 3
+    assert dispatcher.dispatch_message.await_count == 20
+
+
 @pytest.mark.asyncio
 async def test_dispatch_providers_with_error(route):
     route.provider.fetch_messages.side_effect = ValueError
@@ -132,6 +345,86 @@ async def test_dispatch_providers_with_error(route):
     assert exc_info.value.subgroup(ValueError) is not None
 
 
+async def _drain_while_processing(route, max_wait, **options):
+    batches = iter([["message1", "message2", "message3", "message4", "message5"]])
+
+    async def fetch_messages(max_messages):  # noqa: ARG001
+        try:
+            return next(batches)
+        except StopIteration:
+            await asyncio.Event().wait()
+
+    route.provider.fetch_messages.side_effect = fetch_messages
+    dispatcher = LoaferDispatcher([route], workers=1, **options)
+    started, finish = asyncio.Event(), asyncio.Event()
+
+    async def dispatch_message(message, route):  # noqa: ARG001
+        started.set()
+        await finish.wait()
+        return True
+
+    dispatcher.dispatch_message = dispatch_message
+    task = asyncio.create_task(dispatcher.dispatch_providers())
+    await asyncio.wait_for(started.wait(), 1)
+
+    drain = asyncio.create_task(dispatcher.drain(max_wait))
+    await asyncio.sleep(0.01)
+    return dispatcher, task, drain, finish
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("queue_size", [10, 2])
+async def test_dispatcher_drain(route, queue_size):
+    _, task, drain, finish = await _drain_while_processing(route, max_wait=1, queue_size=queue_size)
+    assert not drain.done()
+
+    finish.set()
+    await drain
+    # every message received but not started (queued or not) is released
+    released = [call.args[0] for call in route.provider.release_message.await_args_list]
+    assert sorted(released) == ["message2", "message3", "message4", "message5"]
+    route.provider.confirm_message.assert_awaited_once_with("message1")
+
+    # nothing left to do, the dispatcher finishes on its own
+    await asyncio.wait_for(task, 1)
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_drain_max_wait(route, caplog):
+    _, task, drain, _ = await _drain_while_processing(route, max_wait=0.01)
+
+    with caplog.at_level(logging.WARNING):
+        await drain
+
+    assert "1 message(s) still being processed after the drain timeout" in caplog.text
+    assert not route.provider.confirm_message.called
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_drain_release_error(route, caplog):
+    route.provider.release_message.side_effect = ValueError
+    _, task, drain, finish = await _drain_while_processing(route, max_wait=1)
+    finish.set()
+
+    with caplog.at_level(logging.ERROR):
+        await drain
+
+    assert "error releasing message, route=test" in caplog.text
+    await asyncio.wait_for(task, 1)
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_drain_not_started(route):
+    dispatcher = LoaferDispatcher([route])
+
+    await dispatcher.drain(1)
+
+    assert not route.provider.release_message.called
+
+
 def test_dispatcher_stop(route):
     route.stop = mock.Mock()
     dispatcher = LoaferDispatcher([route])
@@ -139,3 +432,155 @@ def test_dispatcher_stop(route):
     dispatcher.stop()
 
     assert route.stop.called
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_close(route):
+    route.close = mock.AsyncMock()
+    dispatcher = LoaferDispatcher([route])
+
+    await dispatcher.close()
+
+    route.close.assert_awaited_once_with()
+
+
+def test_dispatcher_batch_size_larger_than_workers(caplog):
+    route = create_mock_route([])
+    route.batch_size = 10
+    LoaferDispatcher([route], workers=10)
+    assert not caplog.records
+
+    LoaferDispatcher([route], workers=5)
+    assert "route=test has batch_size=10 but there are only 5 workers" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_warmup(metrics):
+    warming_up = 0
+
+    async def warmup():
+        nonlocal warming_up
+        warming_up += 1
+        await asyncio.sleep(0.01)
+        # every route warms up at the same time
+        assert warming_up == 2
+
+    routes = [create_mock_route([]), create_mock_route([])]
+    for route in routes:
+        route.warmup = mock.AsyncMock(side_effect=warmup)
+    dispatcher = LoaferDispatcher(routes)
+
+    await dispatcher.warmup()
+
+    for route in routes:
+        route.warmup.assert_awaited_once_with()
+    assert metrics.timing_histogram("dispatcher.warmup_duration").count == 1
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_warmup_errors(caplog):
+    error = ValueError("topic not found")
+    routes = [create_mock_route([]), create_mock_route([]), create_mock_route([])]
+    routes[0].warmup = mock.AsyncMock(side_effect=error)
+    routes[1].warmup = mock.AsyncMock()
+    routes[2].warmup = mock.AsyncMock(side_effect=ProviderError("queue not found"))
+    dispatcher = LoaferDispatcher(routes)
+
+    with pytest.raises(ExceptionGroup, match=r"warmup failed for 2 route\(s\)") as excinfo:
+        await dispatcher.warmup()
+
+    assert excinfo.value.exceptions[0] is error
+    assert isinstance(excinfo.value.exceptions[1], ProviderError)
+    assert caplog.text.count("warmup failed, route=test") == 2
+
+
+async def _get_all(queue, count):
+    items = []
+    for _ in range(count):
+        message, route = await queue.get()
+        queue.task_done(route)
+        items.append(message)
+    return items
+
+
+@pytest.mark.asyncio
+async def test_processing_queue_pop_all():
+    route1 = create_mock_route([])
+    route2 = create_mock_route([])
+    queue = ProcessingQueue([route1, route2], maxsize=2)
+    for message in ["a1", "a2"]:
+        await queue.put(message, route1)
+    await queue.put("b1", route2)
+    assert await queue.get() == ("a1", route1)
+
+    assert queue.pop_all() == [("a2", route1), ("b1", route2)]
+    assert queue.qsize(route1) == queue.qsize(route2) == 0
+    assert queue.free_slots(route1) == 2
+
+    queue.task_done(route1)
+    await asyncio.wait_for(queue.join(), 1)
+
+
+@pytest.mark.asyncio
+async def test_processing_queue_round_robin():
+    route1 = create_mock_route([])
+    route2 = create_mock_route([])
+    queue = ProcessingQueue([route1, route2], maxsize=10)
+    for message in ["a1", "a2", "a3", "a4"]:
+        await queue.put(message, route1)
+    for message in ["b1", "b2"]:
+        await queue.put(message, route2)
+
+    assert await _get_all(queue, 6) == ["a1", "b1", "a2", "b2", "a3", "a4"]
+    await queue.join()
+
+
+@pytest.mark.asyncio
+async def test_processing_queue_weighted_round_robin():
+    route1 = create_mock_route([], weight=2)
+    route2 = create_mock_route([])
+    queue = ProcessingQueue([route1, route2], maxsize=10)
+    for message in ["a1", "a2", "a3", "a4"]:
+        await queue.put(message, route1)
+    for message in ["b1", "b2"]:
+        await queue.put(message, route2)
+
+    assert await _get_all(queue, 6) == ["a1", "a2", "b1", "a3", "a4", "b2"]
+
+
+@pytest.mark.asyncio
+async def test_processing_queue_route_max_concurrency():
+    route1 = create_mock_route([], max_concurrency=1)
+    route2 = create_mock_route([])
+    queue = ProcessingQueue([route1, route2], maxsize=10)
+    await queue.put("a1", route1)
+    await queue.put("a2", route1)
+    await queue.put("b1", route2)
+
+    assert await queue.get() == ("a1", route1)
+    # route1 is busy, its next message waits for task_done
+    assert await queue.get() == ("b1", route2)
+    pending = asyncio.create_task(queue.get())
+    await asyncio.sleep(0)
+    assert not pending.done()
+
+    queue.task_done(route1)
+    assert await pending == ("a2", route1)
+
+
+@pytest.mark.asyncio
+async def test_processing_queue_route_maxsize():
+    route1 = create_mock_route([])
+    route2 = create_mock_route([])
+    queue = ProcessingQueue([route1, route2], maxsize=1)
+    await queue.put("a1", route1)
+    blocked = asyncio.create_task(queue.put("a2", route1))
+    await asyncio.sleep(0)
+    assert not blocked.done()
+
+    # a full route queue does not block the other routes
+    await queue.put("b1", route2)
+
+    assert await queue.get() == ("a1", route1)
+    await blocked
+    assert queue.qsize(route1) == 1
@@ -0,0 +1,127 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from loafer.executors import (
+    DEFAULT_MAX_PROCESSES,
+    RouteProcessPoolExecutor,
+    RouteThreadPoolExecutor,
+    create_executor,
+)
+
+
+def test_create_executor_default():
+    assert create_executor(None) is None
+    assert create_executor("thread") is None
+
+
+def test_create_executor_max_threads():
+    executor = create_executor("thread", max_threads=2, name="route")
+    assert isinstance(executor, RouteThreadPoolExecutor)
+    assert executor._max_workers == 2  # noqa: SLF001
+    executor.shutdown()
+
+
+def test_create_executor_process():
+    executor = create_executor("process")
+    assert isinstance(executor, RouteProcessPoolExecutor)
+    assert executor.max_workers == DEFAULT_MAX_PROCESSES <= 4
+    # processes are only started on first use
+    assert executor._pool is None  # noqa: SLF001
+    executor.shutdown()
+
+
+def test_route_process_pool_executor():
+    executor = RouteProcessPoolExecutor(max_workers=1)
+    try:
+        assert executor.submit(os.getpid).result() != os.getpid()
+        pool = executor._pool  # noqa: SLF001
+        assert executor.submit(abs, -1).result() == 1
+        assert executor._pool is pool  # noqa: SLF001
+    finally:
+        executor.shutdown()
+    assert executor._pool is None  # noqa: SLF001
+
+
+def test_route_process_pool_executor_after_fork():
+    executor = RouteProcessPoolExecutor(max_workers=1)
+    try:
+        executor.submit(abs, -1).result()
+        inherited = executor._pool  # noqa: SLF001
+        # as seen by a forked process: the inherited pool is not used (nor shut down)
+        executor._pid = -1  # noqa: SLF001
+        assert executor.submit(abs, -2).result() == 2
+        assert executor._pool is not inherited  # noqa: SLF001
+    finally:
+        executor.shutdown()
+        inherited.shutdown()
+
+
+def test_create_executor_instance():
+    executor = ThreadPoolExecutor()
+    assert create_executor(executor) is executor
+    executor.shutdown()
+
+
+@pytest.mark.parametrize(("option", "max_threads"), [("thread", 0), ("process", 2)])
+def test_create_executor_invalid_max_threads(option, max_threads):
+    with pytest.raises(ValueError, match="max_threads"):
+        create_executor(option, max_threads=max_threads)
+
+
+def test_create_executor_invalid():
+    with pytest.raises(TypeError, match="executor must be"):
+        create_executor("invalid")
+
+
+def test_route_thread_pool_executor_queue_depth():
+    executor = RouteThreadPoolExecutor(max_workers=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait()
+        return threading.current_thread().name
+
+    first = executor.submit(blocking)
+    started.wait()
+    second = executor.submit(blocking)
+    assert executor.active == 1
+    assert executor.queue_depth == 1
+
+    release.set()
+    assert first.result() == second.result()
+    executor.shutdown()
+    assert executor.active == 0
+    assert executor.queue_depth == 0
+
+
+def test_route_thread_pool_executor_metrics(metrics):
+    executor = RouteThreadPoolExecutor(max_workers=1, tags={"route": "route"})
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait()
+
+    first = executor.submit(blocking)
+    started.wait()
+    executor.submit(blocking)
+    assert metrics.gauge_value("route.executor.active", {"route": "route"}) == 1
+    assert metrics.gauge_value("route.executor.queue_depth", {"route": "route"}) == 1
+
+    release.set()
+    first.result()
+    executor.shutdown()
+    assert metrics.gauge_value("route.executor.active", {"route": "route"}) == 0
+    assert metrics.gauge_value("route.executor.queue_depth", {"route": "route"}) == 0
+
+
+def test_create_executor_tags():
+    executor = create_executor("thread", max_threads=2, name="route", tags={"route": "route"})
+    assert executor.tags == {"route": "route"}
+    executor.shutdown()
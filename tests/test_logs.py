@@ -0,0 +1,80 @@
+import logging
+from unittest import mock
+
+import pytest
+
+from loafer.logs import MessageLogger, get_message_logger, set_message_logger
+
+logger = logging.getLogger("loafer.tests")
+
+
+def test_log_omits_payload_by_default(caplog):
+    with caplog.at_level(logging.INFO, logger="loafer.tests"):
+        MessageLogger().log(logger, logging.INFO, "delivering message", "route", {"secret": "payload"})
+
+    assert caplog.messages == ["delivering message route=route"]
+    assert caplog.records[0].loafer_route == "route"
+    assert caplog.records[0].loafer_event == "delivering message"
+
+
+@pytest.mark.parametrize(
+    ("max_payload", "expected"),
+    [
+        (None, "event route=route, message='0123456789'"),
+        (5, "event route=route, message='0123...(7 more)"),
+    ],
+)
+def test_log_payload(caplog, max_payload, expected):
+    with caplog.at_level(logging.INFO, logger="loafer.tests"):
+        MessageLogger(max_payload=max_payload).log(logger, logging.INFO, "event", "route", "0123456789")
+
+    assert caplog.messages == [expected]
+
+
+def test_log_disabled_level_does_not_format(caplog):
+    class Payload:
+        def __repr__(self):
+            msg = "I should not be called"
+            raise AssertionError(msg)
+
+    with caplog.at_level(logging.WARNING, logger="loafer.tests"):
+        MessageLogger(max_payload=None).log(logger, logging.INFO, "event", "route", Payload())
+
+    assert not caplog.records
+
+
+def test_sample_rate():
+    message_logger = MessageLogger(sample_rate=0.5)
+    with mock.patch("loafer.logs.random.random", side_effect=[0.1, 0.9]):
+        assert message_logger.allow("route") is True
+        assert message_logger.allow("route") is False
+
+    assert MessageLogger(sample_rate=0).allow("route") is False
+
+
+def test_rate_limit():
+    message_logger = MessageLogger(rate_limit=2)
+    with mock.patch("loafer.logs.time.monotonic", return_value=100):
+        assert [message_logger.allow("route") for _ in range(3)] == [True, True, False]
+        # routes are limited independently
+        assert message_logger.allow("other") is True
+
+    with mock.patch("loafer.logs.time.monotonic", return_value=100.5):
+        assert [message_logger.allow("route") for _ in range(2)] == [True, False]
+
+
+@pytest.mark.parametrize(("options", "error"), [({"sample_rate": 2}, "sample_rate"), ({"rate_limit": 0}, "rate_limit")])
+def test_message_logger_invalid(options, error):
+    with pytest.raises(ValueError, match=error):
+        MessageLogger(**options)
+
+
+def test_default_message_logger():
+    message_logger = MessageLogger(rate_limit=10)
+    set_message_logger(message_logger)
+    try:
+        assert get_message_logger() is message_logger
+    finally:
+        set_message_logger(None)
+
+    assert get_message_logger().rate_limit is None
@@ -1,11 +1,18 @@
 import asyncio
+import os
+import signal
+import sys
 from unittest import mock
 
 import pytest
 
 from loafer.dispatchers import LoaferDispatcher
 from loafer.exceptions import ProviderError
+from loafer.ext.aws.bases import close_default_client_pool, get_default_client_pool
+from loafer.logs import MessageLogger, get_message_logger, set_message_logger
 from loafer.managers import LoaferManager
+from loafer.metrics import InMemoryMetrics, get_default_metrics, set_default_metrics
+from loafer.providers import AbstractProvider
 from loafer.routes import Route
 from loafer.runners import LoaferRunner
 
@@ -37,20 +44,26 @@ def test_custom_runner():
 def test_on_future_errors():
     manager = LoaferManager(routes=[])
     manager.runner = mock.Mock()
-    future = asyncio.Future()
+    loop = asyncio.new_event_loop()
+    future = loop.create_future()
     future.set_exception(ProviderError)
     manager.on_future__errors(future)
+    loop.close()
 
     assert manager.runner.prepare_stop.called
     manager.runner.prepare_stop.assert_called_once_with()
+    assert manager._exit_code == 1  # noqa: SLF001
+    assert isinstance(manager._exception, ProviderError)  # noqa: SLF001
 
 
 def test_on_future_errors_cancelled():
     manager = LoaferManager(routes=[])
     manager.runner = mock.Mock()
-    future = asyncio.Future()
+    loop = asyncio.new_event_loop()
+    future = loop.create_future()
     future.cancel()
     manager.on_future__errors(future)
+    loop.close()
 
     assert manager.runner.prepare_stop.called
     manager.runner.prepare_stop.assert_called_once_with()
@@ -58,9 +71,198 @@ def test_on_future_errors_cancelled():
 
 def test_on_loop__stop():
     manager = LoaferManager(routes=[])
+    manager.runner = mock.Mock()
     manager.dispatcher = mock.Mock()
+    manager.close = mock.Mock()
     manager._future = mock.Mock()  # noqa: SLF001
     manager.on_loop__stop()
 
     assert manager.dispatcher.stop.called
     assert manager._future.cancel.called  # noqa: SLF001
+    manager._future.remove_done_callback.assert_any_call(manager.on_future__errors)  # noqa: SLF001
+    manager.runner.loop.run_until_complete.assert_called_once_with(manager.close.return_value)
+
+
+@pytest.mark.asyncio
+@mock.patch("loafer.managers.close_default_client_pool")
+async def test_close(close_pool_mock):
+    manager = LoaferManager(routes=[], runner=mock.Mock())
+    manager.dispatcher = mock.AsyncMock()
+
+    await manager.close()
+
+    manager.dispatcher.close.assert_awaited_once_with()
+    close_pool_mock.assert_awaited_once_with()
+
+
+def test_drain_timeout_invalid():
+    with pytest.raises(ValueError, match="drain_timeout must be a positive number"):
+        LoaferManager(routes=[], drain_timeout=-1)
+
+
+def test_default_runner_loop_options():
+    loop_factory = mock.Mock()
+    manager = LoaferManager(routes=[], loop_factory=loop_factory, eager_tasks=True)
+
+    assert manager.runner.loop_factory is loop_factory
+    assert manager.runner.eager_tasks is (sys.version_info >= (3, 12))
+
+
+def test_default_runner_drain():
+    manager = LoaferManager(routes=[], drain_timeout=10)
+    assert manager.runner._on_drain_callback == manager.drain  # noqa: SLF001
+
+    manager = LoaferManager(routes=[])
+    assert manager.runner._on_drain_callback is None  # noqa: SLF001
+
+
+@pytest.mark.asyncio
+async def test_drain():
+    manager = LoaferManager(routes=[], runner=mock.Mock(), drain_timeout=10)
+    manager.dispatcher = mock.AsyncMock()
+
+    await manager.drain()
+
+    manager.dispatcher.drain.assert_awaited_once_with(10)
+
+
+@pytest.mark.asyncio
+async def test_start():
+    calls = []
+    on_ready = mock.Mock(side_effect=lambda: calls.append("ready"))
+    manager = LoaferManager(routes=[], runner=mock.Mock(), on_ready=on_ready)
+    manager.dispatcher = mock.AsyncMock()
+    manager.dispatcher.warmup.side_effect = lambda: calls.append("warmup")
+    manager.dispatcher.dispatch_providers.side_effect = lambda **_: calls.append("dispatch")
+
+    await manager._start(forever=False)  # noqa: SLF001
+
+    assert get_default_client_pool().is_open()
+    await close_default_client_pool()
+    assert calls == ["warmup", "ready", "dispatch"]
+    assert manager.ready.is_set()
+    manager.dispatcher.dispatch_providers.assert_awaited_once_with(forever=False)
+
+
+@pytest.mark.asyncio
+async def test_start_without_warmup():
+    manager = LoaferManager(routes=[], runner=mock.Mock(), warmup=False)
+    manager.dispatcher = mock.AsyncMock()
+
+    await manager._start(forever=True)  # noqa: SLF001
+
+    assert not manager.dispatcher.warmup.called
+    assert manager.ready.is_set()
+
+
+@pytest.mark.asyncio
+async def test_start_warmup_error():
+    manager = LoaferManager(routes=[], runner=mock.Mock())
+    manager.dispatcher = mock.AsyncMock()
+    manager.dispatcher.warmup.side_effect = ProviderError("queue not found")
+
+    with pytest.raises(ProviderError):
+        await manager._start(forever=True)  # noqa: SLF001
+
+    assert not manager.ready.is_set()
+    assert not manager.dispatcher.dispatch_providers.called
+
+
+def test_run_warmup_error(dummy_provider):
+    dummy_provider.warmup = mock.AsyncMock(side_effect=ProviderError("queue not found"))
+    dummy_provider.stop = mock.Mock()
+    manager = LoaferManager(routes=[Route(dummy_provider, handler=mock.Mock())])
+
+    with pytest.raises(ExceptionGroup) as excinfo:
+        manager.run(forever=False)
+
+    assert excinfo.group_contains(ProviderError, match="queue not found")
+
+    assert not manager.ready.is_set()
+
+
+def test_processes_invalid():
+    with pytest.raises(ValueError, match="processes must be a positive integer"):
+        LoaferManager(routes=[], processes=0)
+
+
+@mock.patch("loafer.managers.LoaferProcessRunner")
+def test_run_with_processes(process_runner_mock):
+    process_runner_mock.return_value.start.return_value = 0
+    manager = LoaferManager(routes=[], runner=mock.Mock(), processes=3)
+    manager._run = mock.Mock()  # noqa: SLF001
+
+    manager.run(forever=False)
+
+    process_runner_mock.assert_called_once_with(3)
+    target = process_runner_mock.return_value.start.call_args.args[0]
+    target()
+    manager._run.assert_called_once_with(forever=False, debug=False)  # noqa: SLF001
+
+
+@mock.patch("loafer.managers.LoaferProcessRunner")
+def test_run_with_processes_drain_timeout(process_runner_mock):
+    process_runner_mock.return_value.start.return_value = 0
+    manager = LoaferManager(routes=[], runner=mock.Mock(), processes=2, drain_timeout=60)
+
+    manager.run()
+
+    process_runner_mock.assert_called_once_with(2, shutdown_timeout=70)
+
+
+@mock.patch("loafer.managers.LoaferProcessRunner")
+def test_run_with_processes_exit_code(process_runner_mock):
+    process_runner_mock.return_value.start.return_value = 1
+    manager = LoaferManager(routes=[], runner=mock.Mock(), processes=2)
+
+    with pytest.raises(SystemExit) as exc_info:
+        manager.run()
+
+    assert exc_info.value.code == 1
+
+
+def test_metrics(dummy_route):
+    sink = InMemoryMetrics()
+    try:
+        manager = LoaferManager(routes=[dummy_route], metrics=sink)
+        assert manager.metrics is sink
+        assert get_default_metrics() is sink
+    finally:
+        set_default_metrics(None)
+
+
+def test_message_logger(dummy_route):
+    message_logger = MessageLogger(sample_rate=0.1)
+    try:
+        LoaferManager(routes=[dummy_route], message_logger=message_logger)
+        assert get_message_logger() is message_logger
+    finally:
+        set_message_logger(None)
+
+
+def test_run_stop_signal_closes_routes():
+    class Provider(AbstractProvider):
+        closed = False
+
+        async def fetch_messages(self):
+            await asyncio.sleep(0.01)
+            return []
+
+        async def confirm_message(self, message):
+            pass
+
+        async def message_not_processed(self, message):
+            pass
+
+        async def close(self):
+            # pending acknowledgements are sent while closing
+            await asyncio.sleep(0.01)
+            self.closed = True
+
+    provider = Provider()
+    manager = LoaferManager(routes=[Route(provider, handler=mock.Mock())])
+    manager.on_ready = lambda: manager.runner.loop.call_later(0.05, os.kill, os.getpid(), signal.SIGTERM)
+
+    manager.run()
+
+    assert provider.closed
@@ -1,4 +1,8 @@
-from loafer.message_translators import StringMessageTranslator
+from unittest import mock
+
+import pytest
+
+from loafer.message_translators import LazyTranslatedMessage, StringMessageTranslator
 
 
 def test_translate():
@@ -11,3 +15,32 @@ def test_translate():
 
     message = translator.translate(None)
     assert message == {"content": "None", "metadata": {}}
+
+
+def test_lazy_translated_message():
+    translator = StringMessageTranslator()
+    translator.translate = mock.Mock(return_value={"content": "content", "metadata": {"key": "value"}})
+    message = LazyTranslatedMessage("raw", translator)
+
+    assert message.raw == "raw"
+    assert repr(message) == "LazyTranslatedMessage('raw')"
+    assert not translator.translate.called
+
+    assert message.content == "content"
+    assert message.metadata == {"key": "value"}
+    assert dict(message) == {"content": "content", "metadata": {"key": "value"}}
+    translator.translate.assert_called_once_with("raw")
+
+
+def test_lazy_translated_message_without_translator():
+    message = LazyTranslatedMessage("raw")
+    assert message == {"content": "raw", "metadata": {}}
+
+
+def test_lazy_translated_message_error():
+    translator = StringMessageTranslator()
+    translator.translate = mock.Mock(return_value={"content": "", "metadata": {}})
+    message = LazyTranslatedMessage("raw", translator)
+
+    with pytest.raises(ValueError, match="failed to translate message=raw"):
+        message.content  # noqa: B018
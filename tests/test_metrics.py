@@ -0,0 +1,159 @@
+import socket
+from unittest import mock
+
+import pytest
+
+from loafer.metrics import (
+    Histogram,
+    InMemoryMetrics,
+    NullMetrics,
+    PrometheusMetrics,
+    StatsDMetrics,
+    get_default_metrics,
+    set_default_metrics,
+)
+
+
+def test_default_metrics():
+    assert isinstance(get_default_metrics(), NullMetrics)
+    assert get_default_metrics().enabled is False
+
+    sink = InMemoryMetrics()
+    set_default_metrics(sink)
+    try:
+        assert get_default_metrics() is sink
+    finally:
+        set_default_metrics(None)
+
+    assert isinstance(get_default_metrics(), NullMetrics)
+
+
+def test_in_memory_metrics():
+    metrics = InMemoryMetrics()
+    metrics.increment("messages", tags={"route": "a"})
+    metrics.increment("messages", 2, tags={"route": "a"})
+    metrics.increment("messages", tags={"route": "b"})
+    metrics.gauge("depth", 3)
+    metrics.gauge("depth", 1)
+    metrics.timing("duration", 0.5)
+    metrics.timing("duration", 1.5)
+
+    assert metrics.counter_value("messages", {"route": "a"}) == 3
+    assert metrics.counter_value("messages", {"route": "b"}) == 1
+    assert metrics.counter_value("unknown") == 0
+    assert metrics.gauge_value("depth") == 1
+    histogram = metrics.timing_histogram("duration")
+    assert (histogram.count, histogram.sum, histogram.min, histogram.max) == (2, 2.0, 0.5, 1.5)
+
+    metrics.clear()
+    assert metrics.counter_value("messages", {"route": "a"}) == 0
+
+
+def test_prometheus_metrics():
+    metrics = PrometheusMetrics(bounds=[0.1, 1])
+    metrics.increment("messages.received", 2, tags={"route": 'say "hi"'})
+    metrics.gauge("queue.depth", 5, tags={"route": "a"})
+    metrics.timing("handler.duration", 0.25, tags={"route": "a"})
+
+    assert metrics.render() == (
+        "# TYPE loafer_messages_received_total counter\n"
+        'loafer_messages_received_total{route="say \\"hi\\""} 2\n'
+        "# TYPE loafer_queue_depth gauge\n"
+        'loafer_queue_depth{route="a"} 5\n'
+        "# TYPE loafer_handler_duration_seconds histogram\n"
+        'loafer_handler_duration_seconds_bucket{route="a",le="0.1"} 0\n'
+        'loafer_handler_duration_seconds_bucket{route="a",le="1"} 1\n'
+        'loafer_handler_duration_seconds_bucket{route="a",le="+Inf"} 1\n'
+        'loafer_handler_duration_seconds_count{route="a"} 1\n'
+        'loafer_handler_duration_seconds_sum{route="a"} 0.25\n'
+    )
+
+
+def test_prometheus_metrics_empty():
+    assert PrometheusMetrics().render() == ""
+
+
+@pytest.mark.parametrize(
+    ("method", "args", "expected"),
+    [
+        ("increment", ("messages",), b"loafer.messages:1|c|#route:a"),
+        ("gauge", ("depth", 3), b"loafer.depth:3|g|#route:a"),
+        ("timing", ("duration", 0.25), b"loafer.duration:250|ms|#route:a"),
+    ],
+)
+def test_statsd_metrics(method, args, expected):
+    metrics = StatsDMetrics("127.0.0.1", 8125)
+    metrics.close()
+    metrics._socket = mock.Mock()  # noqa: SLF001
+    getattr(metrics, method)(*args, tags={"route": "a"})
+    metrics._socket.send.assert_called_once_with(expected)  # noqa: SLF001
+
+
+def test_statsd_metrics_send():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as server:
+        server.bind(("127.0.0.1", 0))
+        server.settimeout(1)
+        metrics = StatsDMetrics("127.0.0.1", server.getsockname()[1])
+        metrics.increment("messages")
+        metrics.close()
+
+        assert server.recv(1024) == b"loafer.messages:1|c"
+
+
+def test_statsd_metrics_resolves_address_once():
+    with mock.patch("loafer.metrics.socket.getaddrinfo", wraps=socket.getaddrinfo) as getaddrinfo:
+        metrics = StatsDMetrics("localhost", 8125)
+        for _ in range(3):
+            metrics.increment("messages")
+        metrics.close()
+
+    getaddrinfo.assert_called_once_with("localhost", 8125, type=socket.SOCK_DGRAM)
+
+
+def test_statsd_metrics_connect_error():
+    with mock.patch("loafer.metrics.socket.getaddrinfo", side_effect=socket.gaierror) as getaddrinfo:
+        metrics = StatsDMetrics("unknown", 8125)
+        metrics.increment("messages")
+        assert getaddrinfo.call_count == 1
+
+        # connecting is tried again after reconnect_interval
+        metrics._next_connect = 0  # noqa: SLF001
+        metrics.increment("messages")
+        assert getaddrinfo.call_count == 2
+
+    assert metrics._socket is None  # noqa: SLF001
+
+
+def test_statsd_metrics_send_error():
+    metrics = StatsDMetrics()
+    metrics.close()
+    metrics._socket = mock.Mock(send=mock.Mock(side_effect=OSError))  # noqa: SLF001
+    metrics.increment("messages")
+
+    metrics.close()
+    assert metrics._socket is None  # noqa: SLF001
+
+
+def test_histogram():
+    histogram = Histogram([0.01, 0.1, 1])
+    for value in [0.005, 0.01, 0.05, 0.05, 0.5, 2]:
+        histogram.record(value)
+
+    assert histogram.counts == [2, 2, 1, 1]
+    assert histogram.count == 6
+    assert histogram.min == 0.005
+    assert histogram.max == 2
+    assert histogram.percentile(50) == 0.1
+    assert histogram.percentile(99) == 2
+    assert histogram.percentile(1) == 0.01
+
+
+def test_histogram_empty():
+    assert Histogram().percentile(99) == 0
+
+
+def test_histogram_default_buckets():
+    histogram = Histogram()
+    histogram.record(0.0123)
+    # the reported value is the bucket upper bound, at most 19% greater than the recorded value
+    assert 0.0123 <= histogram.percentile(50) <= 0.0123 * 1.19
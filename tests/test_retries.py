@@ -0,0 +1,58 @@
+from unittest import mock
+
+import pytest
+
+from loafer.retries import ExponentialRetry, FixedRetry, ImmediateRetry
+
+
+def test_immediate_retry():
+    assert ImmediateRetry().delay(1) == 0
+    assert ImmediateRetry().delay(10) == 0
+
+
+def test_fixed_retry():
+    assert FixedRetry(30).delay(1) == 30
+    assert FixedRetry(30).delay(10) == 30
+
+
+def test_fixed_retry_invalid():
+    with pytest.raises(ValueError, match="delay must be a positive number"):
+        FixedRetry(-1)
+
+
+@pytest.mark.parametrize(("attempt", "expected"), [(0, 1), (1, 1), (2, 2), (3, 4), (5, 16), (6, 20), (10_000, 20)])
+def test_exponential_retry(attempt, expected):
+    policy = ExponentialRetry(1, max_delay=20, jitter=False)
+    assert policy.delay(attempt) == expected
+
+
+def test_exponential_retry_multiplier():
+    policy = ExponentialRetry(5, multiplier=3, jitter=False)
+    assert [policy.delay(attempt) for attempt in range(1, 4)] == [5, 15, 45]
+
+
+@mock.patch("loafer.retries.random.uniform", return_value=3)
+def test_exponential_retry_jitter(uniform_mock):
+    policy = ExponentialRetry(1, max_delay=20)
+
+    assert policy.delay(4) == 3
+    uniform_mock.assert_called_once_with(4, 8)
+
+
+def test_exponential_retry_jitter_bounds():
+    policy = ExponentialRetry(2)
+    delays = [policy.delay(3) for _ in range(100)]
+    assert all(4 <= delay <= 8 for delay in delays)
+
+
+@pytest.mark.parametrize(
+    ("options", "message"),
+    [
+        ({"base_delay": -1}, "delays must be positive numbers"),
+        ({"max_delay": -1}, "delays must be positive numbers"),
+        ({"multiplier": 0.5}, "multiplier must be at least 1"),
+    ],
+)
+def test_exponential_retry_invalid(options, message):
+    with pytest.raises(ValueError, match=message):
+        ExponentialRetry(**options)
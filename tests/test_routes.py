@@ -1,9 +1,19 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from unittest import mock
 
 import pytest
 
-from loafer.message_translators import StringMessageTranslator
+from loafer.deduplication import MemoryDeduplicationStore
+from loafer.exceptions import DeleteMessage
+from loafer.executors import RouteThreadPoolExecutor
+from loafer.ext.aws.message_translators import SQSMessageTranslator
+from loafer.ext.aws.providers import SQSProvider
+from loafer.message_translators import LazyTranslatedMessage, StringMessageTranslator
 from loafer.routes import Route
+from loafer.tracing import MessageTrace, current_trace
 
 
 def test_provider(dummy_provider):
@@ -27,6 +37,42 @@ def test_message_translator(dummy_provider):
     assert isinstance(route.message_translator, StringMessageTranslator)
 
 
+def test_max_concurrency(dummy_provider):
+    route = Route(dummy_provider, handler=mock.Mock(), max_concurrency=3)
+    assert route.max_concurrency == 3
+
+
+def test_max_concurrency_invalid(dummy_provider):
+    with pytest.raises(ValueError, match="max_concurrency must be a positive integer"):
+        Route(dummy_provider, handler=mock.Mock(), max_concurrency=0)
+
+
+def test_weight(dummy_provider):
+    assert Route(dummy_provider, handler=mock.Mock()).weight == 1
+    assert Route(dummy_provider, handler=mock.Mock(), weight=3).weight == 3
+
+
+def test_weight_invalid(dummy_provider):
+    with pytest.raises(ValueError, match="weight must be a positive integer"):
+        Route(dummy_provider, handler=mock.Mock(), weight=0)
+
+
+def test_pollers(dummy_provider):
+    route = Route(dummy_provider, handler=mock.Mock())
+    assert route.pollers == 1
+    assert route.max_pollers == 1
+
+    route = Route(dummy_provider, handler=mock.Mock(), pollers=2, max_pollers=5)
+    assert route.pollers == 2
+    assert route.max_pollers == 5
+
+
+@pytest.mark.parametrize(("pollers", "max_pollers"), [(0, None), (2, 1)])
+def test_pollers_invalid(dummy_provider, pollers, max_pollers):
+    with pytest.raises(ValueError, match="pollers must be"):
+        Route(dummy_provider, handler=mock.Mock(), pollers=pollers, max_pollers=max_pollers)
+
+
 def test_default_message_translator(dummy_provider):
     route = Route(dummy_provider, handler=mock.Mock())
     assert route.message_translator is None
@@ -197,3 +243,463 @@ async def test_deliver_with_message_translator(dummy_provider):
     assert route.apply_message_translator.called
     assert mock_handler.called
     mock_handler.assert_called_once_with("whatever", {})
+
+
+@pytest.mark.asyncio
+async def test_route_warmup(dummy_provider):
+    dummy_provider.warmup = mock.AsyncMock()
+    route = Route(dummy_provider, handler=mock.Mock())
+    await route.warmup()
+
+    dummy_provider.warmup.assert_awaited_once_with()
+
+
+@pytest.mark.asyncio
+async def test_route_warmup_with_handler_warmup(dummy_provider):
+    class Handler:
+        def handle(self, *args):
+            pass
+
+    dummy_provider.warmup = mock.AsyncMock()
+    handler = Handler()
+    handler.warmup = mock.AsyncMock()
+    route = Route(dummy_provider, handler)
+    await route.warmup()
+
+    dummy_provider.warmup.assert_awaited_once_with()
+    handler.warmup.assert_awaited_once_with()
+
+
+@pytest.mark.asyncio
+async def test_route_close_with_handler_close(dummy_provider):
+    class Handler:
+        def handle(self, *args):
+            pass
+
+    dummy_provider.close = mock.AsyncMock()
+    handler = Handler()
+    handler.close = mock.AsyncMock()
+    route = Route(dummy_provider, handler)
+    await route.close()
+
+    dummy_provider.close.assert_awaited_once_with()
+    handler.close.assert_awaited_once_with()
+
+
+def process_handler(message, metadata):  # noqa: ARG001
+    return os.getpid() != int(message)
+
+
+def process_error_handler(exc_info, message):  # noqa: ARG001
+    return exc_info[2] is None and isinstance(exc_info[1], TypeError)
+
+
+@pytest.mark.asyncio
+async def test_deliver_with_process_executor(dummy_provider):
+    dummy_provider.stop = mock.Mock()
+    route = Route(dummy_provider, handler=process_handler, executor="process")
+    try:
+        assert await route.deliver(str(os.getpid())) is True
+    finally:
+        route.stop()
+
+
+@pytest.mark.asyncio
+async def test_error_handler_with_process_executor(dummy_provider):
+    dummy_provider.stop = mock.Mock()
+    route = Route(dummy_provider, handler=mock.Mock(), error_handler=process_error_handler, executor="process")
+    try:
+        exc = TypeError()
+        assert await route.error_handler((TypeError, exc, exc.__traceback__), "whatever") is True
+    finally:
+        route.stop()
+
+
+@pytest.mark.asyncio
+async def test_deliver_with_custom_executor(dummy_provider):
+    dummy_provider.stop = mock.Mock()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="custom")
+    handler = mock.Mock(return_value=True)
+    route = Route(dummy_provider, handler=handler, executor=executor)
+
+    assert await route.deliver("message") is True
+    handler.assert_called_once_with("message", {})
+
+    # executors given to the route are not shut down by it
+    route.stop()
+    assert executor.submit(lambda: True).result() is True
+    executor.shutdown()
+
+
+def test_executor_invalid(dummy_provider):
+    with pytest.raises(TypeError, match="executor must be"):
+        Route(dummy_provider, handler=mock.Mock(), executor="invalid")
+
+
+def test_route_stop_shutdown_executor(dummy_provider):
+    dummy_provider.stop = mock.Mock()
+    route = Route(dummy_provider, handler=mock.Mock(), executor="process")
+    route._executor = mock.Mock()  # noqa: SLF001
+    route.stop()
+
+    route._executor.shutdown.assert_called_once_with(wait=False, cancel_futures=True)  # noqa: SLF001
+
+
+@pytest.mark.asyncio
+async def test_deliver_with_max_threads(dummy_provider):
+    dummy_provider.stop = mock.Mock()
+    route = Route(dummy_provider, handler=lambda *_: threading.current_thread().name, name="route", max_threads=2)
+    try:
+        assert (await route.deliver("message")).startswith("loafer-route")
+        assert isinstance(route.executor, RouteThreadPoolExecutor)
+    finally:
+        route.stop()
+
+    assert route.executor._shutdown  # noqa: SLF001
+
+
+@pytest.mark.asyncio
+async def test_deliver_with_max_threads_metrics(dummy_provider, metrics):
+    dummy_provider.stop = mock.Mock()
+    route = Route(dummy_provider, handler=lambda *_: True, name="route", max_threads=2)
+    try:
+        assert await route.deliver("message") is True
+    finally:
+        route.stop()
+
+    assert metrics.gauge_value("route.executor.queue_depth", route.labels) == 0
+    assert metrics.gauge_value("route.executor.active", route.labels) == 0
+
+
+def test_lazy_translation_with_translate_threshold(dummy_provider):
+    with pytest.raises(ValueError, match="translate_threshold does not apply to lazy translation"):
+        Route(dummy_provider, handler=mock.Mock(), lazy_translation=True, translate_threshold=1024)
+
+
+@pytest.mark.asyncio
+async def test_deliver_lazy_translation(dummy_provider):
+    translator = SQSMessageTranslator()
+    translator.translate = mock.Mock(wraps=translator.translate)
+    raw_message = {"Body": '{"foo": "bar"}', "MessageId": "uuid"}
+    handler = mock.AsyncMock(return_value=True)
+    route = Route(dummy_provider, handler=handler, message_translator=translator, lazy_translation=True)
+
+    assert await route.deliver(raw_message) is True
+
+    # the handler didn't read the message, it was not translated
+    (message, metadata), _ = handler.await_args
+    assert isinstance(message, LazyTranslatedMessage)
+    assert metadata is raw_message
+    assert not translator.translate.called
+
+    assert message.content == {"foo": "bar"}
+    assert message.metadata == {"MessageId": "uuid"}
+    translator.translate.assert_called_once_with(raw_message)
+
+
+@pytest.mark.asyncio
+async def test_deliver_lazy_translation_error(dummy_provider):
+    async def handler(message, metadata):  # noqa: ARG001
+        return bool(message.content)
+
+    route = Route(dummy_provider, handler=handler, message_translator=SQSMessageTranslator(), lazy_translation=True)
+
+    with pytest.raises(ValueError, match="failed to translate"):
+        await route.deliver({"Body": "invalid json"})
+
+
+@pytest.mark.asyncio
+async def test_deliver_batch_lazy_translation(dummy_provider):
+    handler = mock.AsyncMock(return_value=True)
+    route = Route(dummy_provider, handler=handler, batch_size=2, batch_max_wait=60, lazy_translation=True)
+
+    assert await asyncio.gather(route.deliver("first"), route.deliver("second")) == [True, True]
+
+    (messages, metadata), _ = handler.await_args
+    assert [message.content for message in messages] == ["first", "second"]
+    assert metadata == ["first", "second"]
+
+
+@pytest.mark.parametrize(
+    ("options", "error"),
+    [
+        ({"batch_size": 0}, "batch_size"),
+        ({"batch_max_wait": -1}, "batch_max_wait"),
+        ({"batch_size": 10, "max_concurrency": 5}, "batch_size must not be greater than max_concurrency"),
+    ],
+)
+def test_batch_options_invalid(dummy_provider, options, error):
+    with pytest.raises(ValueError, match=error):
+        Route(dummy_provider, handler=mock.Mock(), **options)
+
+
+@pytest.mark.asyncio
+async def test_deliver_batch(dummy_provider):
+    handler = mock.AsyncMock(return_value=[True, False])
+    route = Route(dummy_provider, handler=handler, batch_size=2, batch_max_wait=60)
+
+    results = await asyncio.gather(route.deliver("first"), route.deliver("second"))
+
+    assert results == [True, False]
+    handler.assert_awaited_once_with(["first", "second"], [{}, {}])
+
+
+@pytest.mark.asyncio
+async def test_deliver_batch_after_max_wait(dummy_provider):
+    handler = mock.AsyncMock(return_value=True)
+    route = Route(dummy_provider, handler=handler, batch_size=10, batch_max_wait=0)
+
+    assert await route.deliver("message") is True
+    handler.assert_awaited_once_with(["message"], [{}])
+
+
+@pytest.mark.asyncio
+async def test_deliver_batch_delete_message(dummy_provider):
+    handler = mock.AsyncMock(side_effect=DeleteMessage)
+    route = Route(dummy_provider, handler=handler, batch_size=2, batch_max_wait=0)
+
+    assert await asyncio.gather(route.deliver("first"), route.deliver("second")) == [True, True]
+
+
+@pytest.mark.asyncio
+async def test_deliver_batch_invalid_results(dummy_provider):
+    handler = mock.AsyncMock(return_value=[True])
+    route = Route(dummy_provider, handler=handler, batch_size=2, batch_max_wait=0)
+
+    results = await asyncio.gather(route.deliver("first"), route.deliver("second"), return_exceptions=True)
+
+    assert [type(result) for result in results] == [ValueError, ValueError]
+
+
+@pytest.mark.asyncio
+async def test_deliver_batch_sync_handler(dummy_provider):
+    route = Route(dummy_provider, handler=lambda contents, _: [len(c) > 1 for c in contents], batch_size=2)
+
+    assert await asyncio.gather(route.deliver("a"), route.deliver("bb")) == [False, True]
+
+
+def test_message_filter_invalid(dummy_provider):
+    with pytest.raises(TypeError, match="message_filter must be a callable"):
+        Route(dummy_provider, handler=mock.Mock(), message_filter="invalid")
+
+
+@pytest.mark.asyncio
+async def test_deliver_with_message_filter(dummy_provider):
+    translator = StringMessageTranslator()
+    translator.translate = mock.Mock(wraps=translator.translate)
+    handler = mock.AsyncMock(return_value=False)
+    route = Route(
+        dummy_provider, handler=handler, message_translator=translator, message_filter=lambda message: message == "keep"
+    )
+
+    assert await route.deliver("drop") is True
+    assert not translator.translate.called
+    assert not handler.called
+    assert route.filtered_messages == 1
+
+    assert await route.deliver("keep") is False
+    handler.assert_awaited_once_with("keep", {})
+    assert route.filtered_messages == 1
+
+
+def test_deduplication_invalid(dummy_provider):
+    with pytest.raises(TypeError, match="invalid deduplication store"):
+        Route(dummy_provider, handler=mock.Mock(), deduplication="invalid")
+
+    with pytest.raises(TypeError, match="deduplication_key must be a callable"):
+        Route(dummy_provider, handler=mock.Mock(), deduplication=MemoryDeduplicationStore(), deduplication_key="key")
+
+
+@pytest.mark.asyncio
+async def test_deliver_with_deduplication(dummy_provider, metrics):
+    handler = mock.AsyncMock(side_effect=[False, True, True])
+    route = Route(
+        dummy_provider,
+        handler=handler,
+        name="route",
+        message_translator=StringMessageTranslator(),
+        deduplication=MemoryDeduplicationStore(),
+        deduplication_key=lambda message: message.split(":")[0],
+    )
+
+    # not processed, it will be delivered again
+    assert await route.deliver("a:1") is False
+    assert await route.deliver("a:2") is True
+    # duplicates are acknowledged without calling the handler
+    assert await route.deliver("a:3") is True
+    assert await route.deliver("b:1") is True
+
+    assert handler.await_args_list == [mock.call("a:1", {}), mock.call("a:2", {}), mock.call("b:1", {})]
+    assert route.duplicate_messages == 1
+    assert route.unique_messages == 3
+    assert metrics.counter_value("deduplication.hits", {"route": "route"}) == 1
+    assert metrics.counter_value("deduplication.misses", {"route": "route"}) == 3
+
+
+@pytest.mark.asyncio
+async def test_deliver_with_deduplication_message_id():
+    provider = SQSProvider("queue-name")
+    handler = mock.AsyncMock(return_value=True)
+    route = Route(provider, handler=handler, deduplication=MemoryDeduplicationStore())
+
+    assert await route.deliver({"MessageId": "id", "Body": "1"}) is True
+    assert await route.deliver({"MessageId": "id", "Body": "1"}) is True
+    # without a key, messages are not deduplicated
+    assert await route.deliver({"Body": "2"}) is True
+    assert await route.deliver({"Body": "2"}) is True
+
+    assert handler.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_deliver_with_deduplication_delete_message(dummy_provider):
+    handler = mock.AsyncMock(side_effect=DeleteMessage)
+    route = Route(
+        dummy_provider, handler=handler, deduplication=MemoryDeduplicationStore(), deduplication_key=lambda m: m
+    )
+
+    with pytest.raises(DeleteMessage):
+        await route.deliver("message")
+
+    assert await route.deliver("message") is True
+    assert handler.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_deliver_with_deduplication_concurrent_duplicates(dummy_provider):
+    processing = asyncio.Event()
+    finish = asyncio.Event()
+
+    async def handler(message, metadata):  # noqa: ARG001
+        processing.set()
+        await finish.wait()
+        return True
+
+    route = Route(
+        dummy_provider, handler=handler, deduplication=MemoryDeduplicationStore(), deduplication_key=lambda m: m
+    )
+    first = asyncio.create_task(route.deliver("message"))
+    await processing.wait()
+
+    # the same message is being processed, the duplicate is not acknowledged yet
+    assert await route.deliver("message") is False
+
+    finish.set()
+    assert await first is True
+    assert await route.deliver("message") is True
+
+
+class YieldingDeduplicationStore(MemoryDeduplicationStore):
+    # like stores doing I/O, every call suspends
+    async def contains(self, key):
+        await asyncio.sleep(0)
+        return await super().contains(key)
+
+    async def add(self, key):
+        await asyncio.sleep(0)
+        await super().add(key)
+
+
+@pytest.mark.asyncio
+async def test_deliver_with_deduplication_concurrent_duplicates_yielding_store(dummy_provider):
+    handler = mock.AsyncMock(return_value=True)
+    route = Route(
+        dummy_provider, handler=handler, deduplication=YieldingDeduplicationStore(), deduplication_key=lambda m: m
+    )
+
+    results = await asyncio.gather(route.deliver("message"), route.deliver("message"))
+
+    handler.assert_awaited_once()
+    assert sorted(results) == [False, True]
+    assert await route.deliver("message") is True
+    handler.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_route_close_deduplication(dummy_provider):
+    dummy_provider.close = mock.AsyncMock()
+    store = MemoryDeduplicationStore()
+    store.close = mock.AsyncMock()
+    route = Route(dummy_provider, handler=mock.AsyncMock(), deduplication=store)
+
+    await route.close()
+
+    store.close.assert_awaited_once_with()
+
+
+def test_translate_threshold_invalid(dummy_provider):
+    with pytest.raises(ValueError, match="translate_threshold"):
+        Route(dummy_provider, handler=mock.Mock(), translate_threshold=-1)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(("message", "offloaded"), [("small", False), ("large message", True)])
+async def test_deliver_translate_threshold(dummy_provider, message, offloaded):
+    translated_in = []
+
+    class Translator(StringMessageTranslator):
+        def translate(self, message):
+            translated_in.append(threading.current_thread())
+            return super().translate(message)
+
+    handler = mock.AsyncMock(return_value=True)
+    route = Route(dummy_provider, handler=handler, message_translator=Translator(), translate_threshold=10)
+
+    assert await route.deliver(message) is True
+    handler.assert_awaited_once_with(message, {})
+    assert (translated_in[0] is not threading.current_thread()) is offloaded
+
+
+@pytest.mark.asyncio
+async def test_deliver_translate_in_process_executor(dummy_provider):
+    dummy_provider.stop = mock.Mock()
+    route = Route(
+        dummy_provider,
+        handler=mock.AsyncMock(return_value=True),
+        message_translator=SQSMessageTranslator(),
+        translate_threshold=0,
+        translate_executor="process",
+    )
+    try:
+        translated = await route.apply_message_translator_in_executor({"Body": '{"key": "value"}', "MessageId": "id"})
+    finally:
+        route.stop()
+
+    assert translated == {"content": {"key": "value"}, "metadata": {"MessageId": "id"}}
+
+
+@pytest.mark.asyncio
+async def test_deliver_metrics(dummy_provider, metrics):
+    route = Route(
+        dummy_provider, handler=mock.AsyncMock(return_value=True), name="route", message_filter=lambda m: m == "keep"
+    )
+
+    await route.deliver("keep")
+    await route.deliver("drop")
+
+    assert route.labels == {"route": "route"}
+    assert metrics.timing_histogram("handler.duration", {"route": "route"}).count == 1
+    assert metrics.counter_value("messages.filtered", {"route": "route"}) == 1
+
+
+def test_slow_message_threshold_invalid(dummy_provider):
+    with pytest.raises(ValueError, match="slow_message_threshold"):
+        Route(dummy_provider, handler=mock.Mock(), slow_message_threshold=-1)
+
+
+@pytest.mark.asyncio
+async def test_deliver_records_trace(dummy_provider):
+    async def handler(*_):
+        await asyncio.sleep(0.01)
+        return True
+
+    route = Route(dummy_provider, handler=handler)
+    trace = MessageTrace()
+    token = current_trace.set(trace)
+    try:
+        assert await route.deliver("message") is True
+    finally:
+        current_trace.reset(token)
+
+    assert trace.handle >= 0.01
+    assert 0 <= trace.translate < trace.handle
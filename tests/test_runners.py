@@ -1,10 +1,16 @@
 import asyncio
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
 from contextlib import nullcontext as does_not_raise
 from unittest import mock
 
 import pytest
 
-from loafer.runners import LoaferRunner
+from loafer.runners import LoaferProcessRunner, LoaferRunner, _watch_parent
 
 
 @mock.patch("loafer.runners.LoaferRunner.loop", new_callable=mock.PropertyMock)
@@ -29,12 +35,70 @@ def test_runner_start_with_debug(loop_mock):
 def test_runner_start_and_stop(loop_mock):
     runner = LoaferRunner()
     runner.stop = mock.Mock()
+    runner.close = mock.Mock()
 
     runner.start()
 
     assert runner.stop.called
     assert loop_mock.return_value.run_forever.called
-    assert loop_mock.return_value.close.called
+    assert runner.close.called
+
+
+def test_runner_lifecycle():
+    async def stop_soon():
+        await asyncio.sleep(0)
+        runner.prepare_stop()
+
+    runner = LoaferRunner()
+    loop = runner.loop
+    assert runner.loop is loop
+    loop.create_task(stop_soon())
+
+    runner.start()
+
+    assert loop.is_closed()
+    # a new loop is created on the next use
+    assert runner.loop is not loop
+    runner.close()
+    runner.close()
+
+
+def test_runner_loop_factory():
+    loop_factory = mock.Mock(side_effect=asyncio.new_event_loop)
+    runner = LoaferRunner(loop_factory=loop_factory)
+
+    loop = runner.loop
+    runner.close()
+
+    loop_factory.assert_called_once_with()
+    assert loop.is_closed()
+
+
+@pytest.mark.skipif(sys.version_info < (3, 12), reason="eager tasks require Python 3.12")
+def test_runner_eager_tasks():
+    runner = LoaferRunner(eager_tasks=True)
+    started = []
+
+    async def task():
+        started.append(True)
+
+    async def create_task():
+        created = asyncio.create_task(task())
+        # the task ran until completion when created
+        assert created.done()
+        assert started == [True]
+
+    assert runner.eager_tasks is True
+    runner.loop.run_until_complete(create_task())
+    runner.close()
+
+
+@pytest.mark.skipif(sys.version_info >= (3, 12), reason="eager tasks are available")
+def test_runner_eager_tasks_not_available(caplog):
+    runner = LoaferRunner(eager_tasks=True)
+
+    assert runner.eager_tasks is False
+    assert "eager tasks require Python 3.12 or later" in caplog.text
 
 
 @mock.patch("loafer.runners.LoaferRunner.loop", new_callable=mock.PropertyMock)
@@ -47,10 +111,10 @@ def test_runner_prepare_stop(loop_mock):
     loop_mock.return_value.stop.assert_called_once_with()
 
 
-@mock.patch("loafer.runners.asyncio.get_event_loop")
-def test_runner_prepare_stop_already_stopped(get_loop_mock):
+@mock.patch("loafer.runners.LoaferRunner.loop", new_callable=mock.PropertyMock)
+def test_runner_prepare_stop_already_stopped(loop_mock):
     loop = mock.Mock(is_running=mock.Mock(return_value=False))
-    get_loop_mock.return_value = loop
+    loop_mock.return_value = loop
     runner = LoaferRunner()
 
     runner.prepare_stop()
@@ -59,6 +123,59 @@ def test_runner_prepare_stop_already_stopped(get_loop_mock):
     assert loop.stop.called is False
 
 
+def test_runner_prepare_stop_while_stopping():
+    # a signal (or a cancelled task callback) while closing resources must not stop the loop
+    runner = LoaferRunner(on_stop_callback=lambda: runner.loop.run_until_complete(close()))
+
+    async def close():
+        runner.prepare_stop()
+        await asyncio.sleep(0)
+
+    runner.loop.call_soon(runner.loop.stop)
+    runner.loop.run_forever()
+    with does_not_raise():
+        runner.stop()
+    runner.close()
+
+
+@mock.patch("loafer.runners.LoaferRunner.loop", new_callable=mock.PropertyMock)
+def test_runner_prepare_drain_without_callback(loop_mock):
+    loop_mock.return_value.is_running.return_value = True
+    runner = LoaferRunner()
+
+    runner.prepare_drain()
+
+    loop_mock.return_value.stop.assert_called_once_with()
+
+
+def test_runner_prepare_drain():
+    loop = asyncio.new_event_loop()
+    drained = []
+
+    async def drain():
+        drained.append(True)
+
+    runner = LoaferRunner(on_drain_callback=drain)
+    with mock.patch("loafer.runners.LoaferRunner.loop", new_callable=mock.PropertyMock, return_value=loop):
+        loop.call_soon(runner.prepare_drain)
+        # the loop stops once the drain is done
+        loop.run_forever()
+    loop.close()
+
+    assert drained == [True]
+
+
+@mock.patch("loafer.runners.LoaferRunner.loop", new_callable=mock.PropertyMock)
+def test_runner_prepare_drain_twice(loop_mock):
+    loop_mock.return_value.is_running.return_value = True
+    runner = LoaferRunner(on_drain_callback=mock.AsyncMock())
+    runner._drain_task = mock.Mock()  # noqa: SLF001
+
+    runner.prepare_drain()
+
+    loop_mock.return_value.stop.assert_called_once_with()
+
+
 def test_runner_stop_with_callback():
     callback = mock.Mock()
     runner = LoaferRunner(on_stop_callback=callback)
@@ -95,3 +212,122 @@ def test_runner_stop_dont_raise_runtime_error(cancel_all_tasks_mock):
     with does_not_raise():
         runner.loop.stop()
         runner.stop()
+
+
+def _exit_with(code):
+    def target():
+        return code
+
+    return target
+
+
+def test_process_runner_invalid_processes():
+    with pytest.raises(ValueError, match="processes must be a positive integer"):
+        LoaferProcessRunner(0)
+
+
+def test_process_runner_start():
+    runner = LoaferProcessRunner(2)
+
+    assert runner.start(_exit_with(0)) == 0
+
+
+def test_process_runner_aggregated_exit_code():
+    def target():
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(3))
+        time.sleep(30)
+
+    runner = LoaferProcessRunner(2)
+    timer = threading.Timer(0.5, runner.prepare_stop)
+    timer.start()
+
+    assert runner.start(target) == 3
+    timer.join()
+
+
+def test_process_runner_restarts_crashed_worker():
+    attempts = multiprocessing.get_context("fork").Value("i", 0)
+
+    def target():
+        with attempts.get_lock():
+            attempts.value += 1
+            return 1 if attempts.value == 1 else 0
+
+    runner = LoaferProcessRunner(1, restart_backoff=0.01)
+
+    assert runner.start(target) == 0
+    assert attempts.value == 2
+
+
+def test_process_runner_forwards_stop_to_workers():
+    def target():
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        time.sleep(30)
+        return 1
+
+    runner = LoaferProcessRunner(2)
+    timer = threading.Timer(0.5, runner.prepare_stop)
+    timer.start()
+
+    assert runner.start(target) == 0
+    timer.join()
+
+
+def test_process_runner_kills_workers_after_shutdown_timeout():
+    def target():
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        time.sleep(30)
+
+    runner = LoaferProcessRunner(1, shutdown_timeout=0.1)
+    timer = threading.Timer(0.5, runner.prepare_stop)
+    timer.start()
+
+    assert runner.start(target) == 128 + signal.SIGKILL
+    timer.join()
+
+
+def test_process_runner_workers_process_group():
+    def target():
+        return 0 if os.getpgrp() == os.getpid() else 1
+
+    runner = LoaferProcessRunner(2)
+
+    assert runner.start(target) == 0
+
+
+def test_process_runner_orphaned_workers_stop():
+    context = multiprocessing.get_context("fork")
+    worker_started = context.Event()
+    worker_stopped = context.Event()
+
+    def stop(*_):
+        worker_stopped.set()
+        sys.exit(0)
+
+    def target():
+        signal.signal(signal.SIGTERM, stop)
+        worker_started.set()
+        time.sleep(30)
+
+    def supervisor():
+        LoaferProcessRunner(1, parent_check_interval=0.01).start(target)
+
+    process = context.Process(target=supervisor)
+    process.start()
+    assert worker_started.wait(5)
+
+    # the supervisor dies without stopping its worker
+    process.kill()
+    process.join()
+
+    assert worker_stopped.wait(5)
+
+
+def test_watch_parent():
+    with (
+        mock.patch("loafer.runners.os.getppid", side_effect=[1234, 1234, 1]),
+        mock.patch("loafer.runners.os.kill") as kill,
+    ):
+        _watch_parent(1234, 0)
+
+    kill.assert_called_once_with(os.getpid(), signal.SIGTERM)
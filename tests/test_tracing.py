@@ -0,0 +1,31 @@
+import pytest
+
+from loafer.tracing import PHASES, LatencyHistograms, MessageTrace, current_trace
+
+
+def test_message_trace():
+    trace = MessageTrace(wait=0.5)
+    assert trace.wait == 0.5
+    assert trace.total == 0
+    assert "wait=0.500s" in repr(trace)
+
+
+def test_current_trace_default():
+    assert current_trace.get() is None
+
+
+def test_latency_histograms():
+    histograms = LatencyHistograms()
+    trace = MessageTrace(wait=0.1)
+    trace.handle = 0.2
+    trace.total = 0.3
+
+    histograms.record(trace)
+
+    for phase in PHASES:
+        assert histograms[phase].count == 1
+    assert histograms["wait"].sum == 0.1
+    assert histograms["handle"].sum == 0.2
+    assert histograms["total"].sum == 0.3
+    with pytest.raises(KeyError):
+        histograms["unknown"]